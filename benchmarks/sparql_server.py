@@ -0,0 +1,123 @@
+"""A local rdflib-backed SPARQL endpoint standing in for the Laces hub in benchmarks.
+
+Every graph is served at /<name>. Queries come as GET ?query=, as form posts (the
+shared client) or as application/sparql-query bodies (LacesRequest). SELECT
+results are CSV when the Accept header asks for it, else SPARQL JSON; graphs
+are N-Triples when asked for, else Turtle. Responses are gzipped for clients
+that accept it. With a bandwidth, response bodies are sent at that many bytes
+per second, like a remote endpoint behind a slow link.
+
+Usage: python benchmarks/sparql_server.py [--port 8000] [--delay 0.05] [--bandwidth 1000000] name=file.ttl ...
+"""
+import argparse
+import contextlib
+import gzip
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from rdflib import Graph
+from rdflib.plugins.sparql import prepareQuery
+
+SEND_INTERVAL = 0.05  # seconds of throttled output written at a time
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        self._answer(url.path, urllib.parse.parse_qs(url.query).get("query", [None])[0])
+
+    def do_POST(self):
+        url = urllib.parse.urlparse(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+        if self.headers.get("Content-Type", "").startswith("application/sparql-query"):
+            query = body
+        else:
+            query = urllib.parse.parse_qs(body).get("query", urllib.parse.parse_qs(url.query).get("query", [None]))[0]
+        self._answer(url.path, query)
+
+    def _answer(self, path, query):
+        name = path.strip("/")
+        graph = self.server.graphs.get(name)
+        if graph is None or not query:
+            return self._send(404 if graph is None else 400, b"Unknown graph or missing query", "text/plain")
+        time.sleep(self.server.delay)  # network and engine latency of a remote endpoint
+        accept = self.headers.get("Accept", "")
+        try:
+            # rdflib's SPARQL parser is not thread-safe, and neither are its graphs; each graph
+            # is its own endpoint, so queries on different graphs are evaluated concurrently.
+            with self.server.parse_lock:
+                prepared = prepareQuery(query)
+            with self.server.locks[name]:
+                result = graph.query(prepared)
+                if result.type == "SELECT" and "text/csv" in accept:
+                    body, content_type = result.serialize(format="csv"), "text/csv"
+                elif result.type in ("SELECT", "ASK"):
+                    body, content_type = result.serialize(format="json"), "application/sparql-results+json"
+                elif "application/n-triples" in accept:
+                    body, content_type = result.serialize(format="nt"), "application/n-triples"
+                else:
+                    body, content_type = result.serialize(format="turtle"), "text/turtle"
+        except Exception as e:
+            return self._send(400, str(e).encode("utf-8"), "text/plain")
+        self._send(200, body if isinstance(body, bytes) else body.encode("utf-8"), content_type)
+
+    def _send(self, status, body, content_type):
+        gzipped = "gzip" in self.headers.get("Accept-Encoding", "")
+        if gzipped:
+            body = gzip.compress(body, compresslevel=1)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        if not self.server.bandwidth:
+            self.wfile.write(body)
+            return
+        chunk = max(1, int(self.server.bandwidth * SEND_INTERVAL))
+        for start in range(0, len(body), chunk):
+            self.wfile.write(body[start:start + chunk])
+            time.sleep(len(body[start:start + chunk]) / self.server.bandwidth)
+
+def server(graphs, host="127.0.0.1", port=0, delay=0.0, bandwidth=None) -> ThreadingHTTPServer:
+    """Returns an unstarted endpoint serving `graphs` ({name: Graph}); port 0 picks a free port."""
+    httpd = ThreadingHTTPServer((host, port), _Handler)
+    httpd.daemon_threads = True
+    httpd.graphs, httpd.delay, httpd.bandwidth = dict(graphs), delay, bandwidth
+    httpd.parse_lock, httpd.locks = threading.Lock(), {name: threading.Lock() for name in httpd.graphs}
+    return httpd
+
+@contextlib.contextmanager
+def serve(graphs, delay=0.0, bandwidth=None):
+    """Serves `graphs` on a free local port in a background thread and yields the base URL."""
+    httpd = server(graphs, delay=delay, bandwidth=bandwidth)
+    thread = threading.Thread(target=httpd.serve_forever, name="sparql-server", daemon=True)
+    thread.start()
+    try:
+        yield f"http://{httpd.server_address[0]}:{httpd.server_address[1]}"
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+        thread.join()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serves RDF files as SPARQL endpoints at /<name>.")
+    parser.add_argument("graphs", nargs="+", metavar="name=file")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--bandwidth", type=float, help="bytes per second at which responses are sent (default: unthrottled)")
+    args = parser.parse_args()
+    graphs = {}
+    for spec in args.graphs:
+        name, path = spec.split("=", 1)
+        graphs[name] = Graph().parse(path)
+    httpd = server(graphs, port=args.port, delay=args.delay, bandwidth=args.bandwidth)
+    print(f"Serving {', '.join(graphs)} at http://127.0.0.1:{args.port}/<name>")
+    httpd.serve_forever()
+
+if __name__ == "__main__":
+    main()
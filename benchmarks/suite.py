@@ -0,0 +1,190 @@
+"""Times the main code paths on synthetic data and writes the results to JSON.
+
+Scenarios (n is the scale):
+    delta_checker              DeltaChecker.run on two OTL versions of n concepts, served by a local endpoint
+    delta_checker_fingerprint  the same in fingerprint diff mode
+    compare_results            compare_results on the objects query rows of those versions
+    delta_checker_slow_link    DeltaChecker.run on concepts with long definitions, over a slow link (SLOW_LINK)
+    delta_checker_fingerprint_slow_link  the same in fingerprint diff mode
+    validate_graph             validate_graph on n assets with geometry and 2% violations of each kind
+    gis_prep                   the display_gis_map data preparation for those assets
+    docgen                     LacesEngine.generate_report for n/100 specifications
+    graph_diff                 the triple-level graph_diff of the two OTL versions, streamed from a local endpoint
+
+Fingerprint mode trades server-side hashing for transfer. On the local link it is
+about 3x slower than a full diff at 10k concepts; with 200-word definitions over
+SLOW_LINK it is about 2.4x faster (13s against 32s).
+
+Only the scenario itself is timed, not generating its data. With --baseline the
+run is compared with an earlier results file.
+
+Usage: python benchmarks/suite.py [--scale 10k 100k 1M] [--scenario ...] [--repeat 3]
+                                  [--output results.json] [--baseline earlier.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from rdflib.namespace import RDF, SH
+from synthetic import DATA, docgen_graph, otl_frame, otl_graph, otl_versions, project_data
+from sparql_server import serve
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1M": 1_000_000}
+QUERY_DIR = os.path.join(ROOT, "queries")
+BENCHMARK_DIR = os.path.join(ROOT, "benchmarks")
+# A remote endpoint behind a 1.6 Mbit/s link (a VPN or a busy hub). The stand-in hashes rows in
+# Python under one GIL, far slower than a triple store, so fingerprint mode only wins when transfer dominates.
+SLOW_LINK = {"delay": 0.05, "bandwidth": 200_000}
+DEFINITION_WORDS = 200
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+def _timed(run, repeat):
+    """Returns the fastest of `repeat` runs in seconds and the last result."""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def delta_checker(n, repeat, diff_mode="full", slow_link=False):
+    from version_comparator import DeltaChecker
+    old, new = otl_versions(n)
+    words = DEFINITION_WORDS if slow_link else 0
+    query = os.path.join(BENCHMARK_DIR, "definitions.sparql") if slow_link else os.path.join(QUERY_DIR, "objects.sparql")
+    with serve({"old": otl_graph(old, "1.0", words), "new": otl_graph(new, "1.1", words)}, **(SLOW_LINK if slow_link else {})) as url:
+        config = {
+            "endpoints": {"old": {"url": f"{url}/old"}, "new": {"url": f"{url}/new"}},
+            "queries": {"General": {"file": query, "columns": ["conceptUri"]}},
+            "summary": {"query": os.path.join(QUERY_DIR, "summary.sparql")},
+            "diff_mode": diff_mode,
+        }
+        seconds, report = _timed(lambda: DeltaChecker(config).run(), repeat)
+    return {"seconds": seconds, "concepts": n, "report_bytes": len(report.getvalue()) if report else 0}
+
+def delta_checker_fingerprint(n, repeat):
+    return delta_checker(n, repeat, diff_mode="fingerprint")
+
+def delta_checker_slow_link(n, repeat):
+    return delta_checker(n, repeat, slow_link=True)
+
+def delta_checker_fingerprint_slow_link(n, repeat):
+    return delta_checker(n, repeat, diff_mode="fingerprint", slow_link=True)
+
+def compare_results(n, repeat):
+    from version_comparator import compare_results as compare
+    old, new = (otl_frame(table) for table in otl_versions(n))
+    seconds, (new_items, old_items, changed, same, *_) = _timed(lambda: compare(old, new, ["conceptUri"]), repeat)
+    return {"seconds": seconds, "rows": len(old) + len(new), "new": len(new_items), "deleted": len(old_items),
+            "modified": len(changed), "unchanged": len(same)}
+
+def validate_graph(n, repeat):
+    # pySHACL is only needed here, so the other scenarios run without it.
+    from validation_scaling import shapes_graph
+    from validator import validate_graph as validate
+    shapes, data = shapes_graph(), project_data(n)
+    seconds, (conforms, results_graph, _) = _timed(lambda: validate(data, shapes), repeat)
+    return {"seconds": seconds, "assets": n, "triples": len(data), "conforms": conforms,
+            "results": len(set(results_graph.subjects(RDF.type, SH.ValidationResult)))}
+
+def gis_prep(n, repeat):
+    from gis_visualization import _styled, geometry_frame, parse_wkt
+    from spatial_index import SpatialIndex
+    data = project_data(n)
+    violating_nodes = {str(DATA[f"asset/{i}"]) for i in random.Random(0).sample(range(n), n // 50)}
+    def prepare():
+        geo_df = geometry_frame(data)
+        geo_df = geo_df[["subject"]].join(parse_wkt(geo_df["wkt"]), how="inner")
+        index = SpatialIndex(_styled(geo_df, violating_nodes))
+        return index, index.view()
+    seconds, (index, (shown, frame)) = _timed(prepare, repeat)
+    return {"seconds": seconds, "geometries": len(index), "shown": shown, "shown_rows": len(frame)}
+
+def docgen(n, repeat):
+    from laces_engine import LacesEngine
+    specifications = max(1, n // 100)
+    queries = [open(os.path.join(QUERY_DIR, f"docgen_{name}.sparql"), encoding="utf-8").read() for name in ("specs", "subjects", "plans")]
+    with serve({"docgen": docgen_graph(specifications)}) as url:
+        seconds, md = _timed(lambda: LacesEngine.generate_report(f"{url}/docgen", "", "", *queries), repeat)
+    if not md:
+        raise RuntimeError("The report is empty.")
+    return {"seconds": seconds, "specifications": specifications, "characters": len(md)}
+
+def graph_diff(n, repeat):
+    from graph_diff import graph_diff as diff
+    old, new = otl_versions(n)
+    with serve({"old": otl_graph(old, "1.0"), "new": otl_graph(new, "1.1")}) as url:
+        seconds, changes = _timed(lambda: list(diff(f"{url}/old", f"{url}/new")), repeat)
+    return {"seconds": seconds, "concepts": n, "subjects": len(changes),
+            "removed": sum(len(removed) for _, removed, _ in changes), "added": sum(len(added) for _, _, added in changes)}
+
+SCENARIOS = {
+    "delta_checker": delta_checker,
+    "delta_checker_fingerprint": delta_checker_fingerprint,
+    "delta_checker_slow_link": delta_checker_slow_link,
+    "delta_checker_fingerprint_slow_link": delta_checker_fingerprint_slow_link,
+    "compare_results": compare_results,
+    "validate_graph": validate_graph,
+    "gis_prep": gis_prep,
+    "docgen": docgen,
+    "graph_diff": graph_diff,
+}
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["scenario"], r["scale"]): r for r in json.load(f)["results"]}
+    for result in results:
+        before = baseline.get((result["scenario"], result["scale"]))
+        if before and before.get("seconds") and result.get("seconds"):
+            ratio = result["seconds"] / before["seconds"]
+            print(f"{result['scenario']:26s} {result['scale']:>5s}  {before['seconds']:8.2f}s -> {result['seconds']:8.2f}s  ({ratio:5.2f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the benchmark scenarios and writes the timings to JSON.")
+    parser.add_argument("--scale", nargs="+", default=["10k"], choices=list(SCALES))
+    parser.add_argument("--scenario", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=1, help="report the fastest of this many runs")
+    parser.add_argument("--output", help=f"results file (default: {os.path.relpath(RESULTS_DIR, ROOT)}/<time>.json)")
+    parser.add_argument("--baseline", help="an earlier results file to compare with")
+    args = parser.parse_args()
+
+    started = datetime.datetime.now()
+    results = []
+    for scale in args.scale:
+        for name in args.scenario:
+            try:
+                result = SCENARIOS[name](SCALES[scale], args.repeat)
+            except Exception as e:
+                result = {"error": f"{type(e).__name__}: {e}"}
+            results.append({"scenario": name, "scale": scale, **result})
+            print(f"{name:26s} {scale:>5s}  " + (f"{result['seconds']:8.2f}s" if "seconds" in result else result["error"]), flush=True)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{started:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "started": started.isoformat(timespec="seconds"), "commit": _commit(), "python": platform.python_version(),
+            "platform": platform.platform(), "cpu_count": os.cpu_count(), "repeat": args.repeat, "results": results,
+        }, f, indent=2)
+    print(f"Wrote {output}")
+    if args.baseline:
+        _compare(results, args.baseline)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Synthetic OTL versions, project data and docgen content for the benchmarks.
+
+Everything is generated from a seed, so runs with the same sizes see the same data.
+"""
+import random
+from decimal import Decimal
+
+import pandas as pd
+from rdflib import Graph, Literal, Namespace, URIRef
+from rdflib.namespace import OWL, RDF, RDFS, SKOS, XSD
+
+EX = Namespace("https://example.org/otl#")
+DATA = Namespace("https://example.org/project/")
+NEN2660 = Namespace("https://w3id.org/nen2660/def#")
+OTL = Namespace("https://example.org/otl/concept/")
+GEO = Namespace("http://www.opengis.net/ont/geosparql#")
+CM = Namespace("http://models.laces.tech/contractmanager/def/")
+SEM = Namespace("http://data.semmtech.com/sem/def/")
+DOC = Namespace("https://example.org/docgen/")
+OBJECT_COLUMNS = ["conceptUri", "conceptName", "conceptAltName"]
+WORDS = ["brug", "weg", "kunstwerk", "fundering", "ligger", "pijler", "dek", "voeg", "leuning", "asfalt", "beton", "staal"]
+
+def otl_concepts(concepts, seed=42, branching=8):
+    """Returns `concepts` concepts below nen2660:RealObject as {uri: (parent, prefLabel, altLabels)}.
+
+    The hierarchy is a tree with `branching` children per concept, so
+    `rdfs:subClassOf+` paths get longer as the OTL grows.
+    """
+    rnd = random.Random(seed)
+    table = {}
+    for i in range(concepts):
+        parent = NEN2660.RealObject if i < branching else OTL[f"c{(i - branching) // branching}"]
+        table[OTL[f"c{i}"]] = (parent, f"Concept {i}", tuple(f"Alias {i}.{k}" for k in range(rnd.randint(0, 2))))
+    return table
+
+def otl_versions(concepts, churn=0.05, seed=42):
+    """Returns the concept tables of an old and a new OTL version.
+
+    A `churn` fraction of the concepts changes: a third is deleted, a third is
+    relabelled and a third is added as new leaves.
+    """
+    rnd = random.Random(seed + 1)
+    old = otl_concepts(concepts, seed)
+    new = dict(old)
+    changed = rnd.sample(sorted(old), int(concepts * churn * 2 / 3))
+    deleted, relabelled = changed[::2], changed[1::2]
+    # Only leaves are deleted, so the rest of the hierarchy stays reachable.
+    parents = {parent for parent, _, _ in old.values()}
+    for uri in deleted:
+        if uri not in parents:
+            del new[uri]
+    for uri in relabelled:
+        parent, label, alt_labels = new[uri]
+        new[uri] = (parent, f"{label} (revised)", alt_labels[1:] if alt_labels else ("New alias",))
+    kept = list(new)
+    for i in range(concepts, concepts + int(concepts * churn / 3)):
+        new[OTL[f"c{i}"]] = (rnd.choice(kept), f"Concept {i}", ())
+    return old, new
+
+def definition(uri, words):
+    """Returns a `words` long skos:definition for a concept; the same in every version."""
+    rnd = random.Random(str(uri))
+    return " ".join(rnd.choice(WORDS) + str(rnd.randrange(100)) for _ in range(words))
+
+def otl_graph(table, version="1.0", definition_words=0):
+    """Returns an OTL version as a graph that queries/objects.sparql and queries/summary.sparql can read.
+
+    With `definition_words`, every concept also gets a skos:definition of that many words.
+    """
+    g = Graph()
+    g.bind("nen2660", NEN2660)
+    g.bind("skos", SKOS)
+    ontology = URIRef("https://example.org/otl")
+    g.add((ontology, RDF.type, OWL.Ontology))
+    g.add((ontology, RDFS.comment, Literal("Synthetic OTL")))
+    g.add((ontology, OWL.versionInfo, Literal(version)))
+    g.add((ontology, OWL.versionIRI, URIRef(f"https://example.org/otl/{version}")))
+    for uri, (parent, label, alt_labels) in table.items():
+        g.add((uri, RDFS.subClassOf, parent))
+        g.add((uri, SKOS.prefLabel, Literal(label, lang="nl")))
+        for alt_label in alt_labels:
+            g.add((uri, SKOS.altLabel, Literal(alt_label, lang="nl")))
+        if definition_words:
+            g.add((uri, SKOS.definition, Literal(definition(uri, definition_words), lang="nl")))
+    return g
+
+def otl_frame(table) -> pd.DataFrame:
+    """Returns the rows queries/objects.sparql would select from an OTL version, as DeltaChecker reads them."""
+    rows = [(str(uri), label, alt_label) for uri, (_, label, alt_labels) in table.items() for alt_label in alt_labels or (None,)]
+    return pd.DataFrame(rows, columns=OBJECT_COLUMNS)
+
+def project_data(objects, violation_rate=0.02, seed=42):
+    """Returns project data for `shapes_graph()` with GeoSPARQL geometry on every asset.
+
+    Each of the four kinds of violation (missing label, negative length, missing
+    location WKT, second location) is made with probability `violation_rate`.
+    Geometries are 80% points, 15% lines and 5% polygons.
+    """
+    rnd = random.Random(seed)
+    g = Graph()
+    g.add((EX.Bridge, RDFS.subClassOf, EX.Asset))
+    g.add((EX.Road, RDFS.subClassOf, EX.Asset))
+    for i in range(objects):
+        node, location, geometry = DATA[f"asset/{i}"], DATA[f"location/{i}"], DATA[f"geometry/{i}"]
+        lon, lat = rnd.uniform(4, 6), rnd.uniform(51, 53)
+        g.add((node, RDF.type, EX.Bridge if i % 3 else EX.Road))
+        if rnd.random() >= violation_rate:
+            g.add((node, RDFS.label, Literal(f"Asset {i}")))
+        length = rnd.uniform(-100, -1) if rnd.random() < violation_rate else rnd.uniform(0, 100)
+        g.add((node, EX.length, Literal(Decimal(f"{length:.2f}"))))
+        g.add((node, EX.location, location))
+        g.add((location, RDF.type, EX.Location))
+        if rnd.random() >= violation_rate:
+            g.add((location, EX.wkt, Literal(f"POINT ({lon:.5f} {lat:.5f})")))
+        if rnd.random() < violation_rate:
+            g.add((node, EX.location, DATA[f"location/{i}b"]))
+        kind = rnd.random()
+        if kind < 0.8:
+            wkt = f"POINT({lon:.6f} {lat:.6f})"
+        elif kind < 0.95:
+            wkt = f"LINESTRING({lon:.6f} {lat:.6f}, {lon + 0.001:.6f} {lat + 0.001:.6f}, {lon + 0.002:.6f} {lat:.6f})"
+        else:
+            wkt = f"POLYGON(({lon:.6f} {lat:.6f}, {lon + 0.001:.6f} {lat:.6f}, {lon + 0.001:.6f} {lat + 0.001:.6f}, {lon:.6f} {lat:.6f}))"
+        g.add((node, GEO.hasGeometry, geometry))
+        g.add((geometry, GEO.asWKT, Literal(wkt, datatype=GEO.wktLiteral)))
+    return g
+
+def docgen_graph(specifications, subjects=5, plans=2, seed=42):
+    """Returns specifications with their subjects and verification plans, shaped for queries/docgen_*.sparql."""
+    rnd = random.Random(seed)
+    g = Graph()
+    classifiers = [DOC[f"classifier/{k}"] for k in range(20)]
+    for k, classifier in enumerate(classifiers):
+        g.add((classifier, SEM.name, Literal(f"Type {k}")))
+    methods, phases = [DOC[f"method/{k}"] for k in range(5)], [DOC[f"phase/{k}"] for k in range(4)]
+    for k, node in enumerate(methods + phases):
+        g.add((node, SEM.name, Literal(f"{'Method' if node in methods else 'Phase'} {k}")))
+    for i in range(specifications):
+        spec, text, role = DOC[f"spec/{i}"], DOC[f"text/{i}"], DOC[f"role/{i}"]
+        g.add((spec, RDF.type, CM.IndividualSpecification))
+        g.add((spec, SEM.name, Literal(f"specification {i:06d}")))
+        g.add((spec, CM.isDescribedIn, text))
+        g.add((text, SEM.value, Literal(f"Requirement text {i}", datatype=XSD.string)))
+        g.add((role, SEM.roleFor, spec))
+        for k in range(subjects):
+            number = rnd.randrange(specifications * subjects)
+            subject = DOC[f"object/{number}"]
+            g.add((subject, CM.shallBeCompliantWith, role))
+            g.add((subject, SEM.classifiedAs, classifiers[number % len(classifiers)]))
+            g.add((subject, SEM.name, Literal(f"Object {number}")))
+        for k in range(plans):
+            plan = DOC[f"plan/{i}/{k}"]
+            g.add((role, CM.isVerifiedBy, plan))
+            g.add((plan, CM.isASpecializationOf, rnd.choice(methods)))
+            g.add((plan, SEM.name, Literal(f"Plan {i}.{k}")))
+            g.add((plan, CM.occursWithin, rnd.choice(phases)))
+    return g
@@ -0,0 +1,105 @@
+"""Times unmodified pySHACL against validate_graph on one worker and sharded over 2..N workers.
+
+Usage: python benchmarks/validation_scaling.py [objects,objects,...] [max_workers]
+
+Every run checks that the report matches pySHACL's, and the script prints the
+smallest size at which sharding beats one worker.
+
+The data is synthetic.project_data. Sharding only pays off with spare cores,
+which is why validate_graph defaults to workers=1. These numbers were measured on
+a single core only: at 1000/5000/20000 objects (about 8k/40k/160k triples)
+pySHACL took 3.5/17/75s, one worker within 15% of it either way, and two
+workers 6.0/21.5/74.5s. Two workers cannot run in parallel on one core, so this
+shows the overhead of spawning and loading the shards, not a speedup; the
+parallel speedup has not been measured. Run the script on a machine with free
+cores to find where sharding starts to pay off.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rdflib import BNode, Graph, Literal
+from rdflib.namespace import RDF, RDFS, SH, XSD
+from pyshacl import validate
+from synthetic import EX, project_data
+from validator import validate_graph
+
+def shapes_graph():
+    g = Graph()
+    g.bind("ex", EX)
+    g.bind("sh", SH)
+    for name in ("Asset", "Bridge", "Road", "Location"):
+        g.add((EX[name], RDF.type, RDFS.Class))
+    g.add((EX.Bridge, RDFS.subClassOf, EX.Asset))
+    g.add((EX.Road, RDFS.subClassOf, EX.Asset))
+
+    location = EX.LocationShape
+    g.add((location, RDF.type, SH.NodeShape))
+    prop = BNode()
+    g.add((location, SH.property, prop))
+    g.add((prop, SH.path, EX.wkt))
+    g.add((prop, SH.datatype, XSD.string))
+    g.add((prop, SH.minCount, Literal(1)))
+
+    asset = EX.AssetShape
+    g.add((asset, RDF.type, SH.NodeShape))
+    g.add((asset, SH.targetClass, EX.Asset))
+    for path, constraints in (
+        (RDFS.label, [(SH.minCount, Literal(1)), (SH.maxCount, Literal(1)), (SH.datatype, XSD.string)]),
+        (EX.length, [(SH.datatype, XSD.decimal), (SH.minInclusive, Literal(0))]),
+        (EX.location, [(SH["class"], EX.Location), (SH.node, location), (SH.maxCount, Literal(1))]),
+    ):
+        prop = BNode()
+        g.add((asset, SH.property, prop))
+        g.add((prop, SH.path, path))
+        for parameter, value in constraints:
+            g.add((prop, parameter, value))
+    return g
+
+def result_keys(results_graph):
+    return sorted(
+        tuple(str(results_graph.value(r, p)) for p in (SH.focusNode, SH.resultPath, SH.sourceConstraintComponent, SH.resultMessage))
+        for r in results_graph.subjects(RDF.type, SH.ValidationResult)
+    )
+
+def pyshacl_baseline(data, shapes):
+    # The call validate_graph replaced: unmodified pySHACL over the whole graph.
+    return validate(data_graph=data, shacl_graph=shapes, inference='rdfs', abort_on_error=False,
+                    meta_shacl=True, advanced=True, debug=False)
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def main():
+    sizes = [int(n) for n in sys.argv[1].split(",")] if len(sys.argv) > 1 else [1000, 5000, 20000]
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    shapes = shapes_graph()
+    print(f"{os.cpu_count()} cores")
+    pays_off = {}
+    for objects in sizes:
+        data = project_data(objects)
+        print(f"{objects} objects, {len(data)} triples")
+        (conforms, report, _), baseline = timed(pyshacl_baseline, data, shapes)
+        expected = result_keys(report)
+        print(f"  pySHACL:    {baseline:7.2f}s  conforms={conforms} results={len(expected)}")
+        workers = 1
+        while workers <= max(max_workers, 2):
+            (cut_conforms, cut_report, _), elapsed = timed(validate_graph, data, shapes, workers=workers)
+            same = cut_conforms == conforms and result_keys(cut_report) == expected
+            print(f"  {workers:2d} workers: {elapsed:7.2f}s  speedup={baseline / elapsed:4.2f}x  identical={same}")
+            if workers == 1:
+                single = elapsed
+            elif elapsed < single:
+                pays_off.setdefault(workers, objects)
+            workers *= 2
+    for workers, objects in sorted(pays_off.items()):
+        print(f"Sharding over {workers} workers beats one worker from {objects} objects.")
+    if not pays_off:
+        print("Sharding did not beat one worker at these sizes.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Command line entry point for batch jobs: comparisons, validations and docgen reports.
+
+    python cli.py compare config.yaml --format parquet
+    python cli.py validate data.nt.gz --shapes otl.ttl --report results.csv
+    python cli.py docgen --endpoint https://hub.laces.tech/groups/repo/sparql -o report.pdf
+    python cli.py graphdiff https://.../otl-1.0/sparql https://.../otl-1.1/sparql -o otl.diff
+
+Modules are imported by the subcommand that needs them, so light jobs do not
+load Streamlit, pydeck, pyshacl or fpdf.
+"""
+import argparse
+import datetime
+import logging
+import os
+import sys
+
+QUERY_DIR = "queries"
+# The same caches as the app, so nightly runs warm them for interactive use and the other way round.
+RESULT_CACHE_DIR = os.path.join(".cache", "query_results")
+SHAPES_CACHE_DIR = os.path.join(".cache", "shapes")
+GRAPH_CACHE_DIR = os.path.join(".cache", "graphs")
+DOCGEN_QUERIES = {name: os.path.join(QUERY_DIR, f"docgen_{name}.sparql") for name in ("specs", "subjects", "plans")}
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read().strip()
+
+def _write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    logging.info(f"Wrote {path}.")
+
+def compare(args):
+    import yaml
+    from version_comparator import EXPORT_FORMATS, comparison_checker
+
+    with open(args.config, encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    config.setdefault("cache", {"dir": RESULT_CACHE_DIR})
+    def progress(fraction, text):
+        logging.info(f"{fraction:4.0%} {text}")
+    report = comparison_checker(config).run(progress_callback=progress, output_format=args.format)
+    if not report:
+        logging.error("Comparison finished, but no data was generated. Check endpoint responses.")
+        return 1
+    suffix = "" if args.format == "xlsx" else f"_{args.format}"
+    _write(args.output or f"changelog_{datetime.date.today()}{suffix}.{EXPORT_FORMATS[args.format][0]}", report.getvalue())
+    return 0
+
+def validate(args):
+    from rdflib import Graph
+    from rdf_loader import GraphCache, load_rdf
+    from shapes_cache import ShapesCache
+    from validation_report import report_frame, write_report
+    from validator import validate_graph
+
+    shapes_cache = ShapesCache(SHAPES_CACHE_DIR)
+    if args.shapes:
+        with open(args.shapes, "rb") as f:
+            otl_data = f.read()
+        shacl_graph = shapes_cache.prepare(ShapesCache.content_key(otl_data), lambda: Graph().parse(data=otl_data, format="turtle"))
+    else:
+        from shapes_source import fetch_shapes, ontology_version
+        version = ontology_version(args.endpoint)
+        key = ShapesCache.version_key(args.endpoint, version) if version else None
+        shacl_graph = shapes_cache.prepare(key, lambda: fetch_shapes(args.endpoint))
+
+    with open(args.data, "rb") as f:
+        data_graph = load_rdf(f.read(), args.data, cache=None if args.no_cache else GraphCache(GRAPH_CACHE_DIR))
+    conforms, results_graph, _ = validate_graph(data_graph, shacl_graph, workers=args.workers)
+    report = report_frame(results_graph)
+    print(f"{args.data}: {'conforms' if conforms else 'does NOT conform'} ({len(report)} violations)")
+    if args.report:
+        write_report(report, args.report, "parquet" if args.report.endswith(".parquet") else "csv")
+        logging.info(f"Wrote {args.report}.")
+    return 0 if conforms else 1
+
+def docgen(args):
+    from laces_engine import LacesEngine
+
+    md = LacesEngine.generate_report(args.endpoint, args.user, args.password, _read(args.specs), _read(args.subjects),
+                                     _read(args.plans), batched=not args.unbatched, page_size=args.page_size)
+    if not md:
+        logging.error("No report generated: no specifications were found or the endpoint failed.")
+        return 1
+    if args.output.lower().endswith(".pdf"):
+        from laces_pdf import LacesPDF
+        pdf = LacesPDF()
+        pdf.add_page()
+        pdf.add_markdown(md)
+        _write(args.output, pdf.output(dest='S').encode('latin-1', 'replace'))
+    else:
+        _write(args.output, md.encode("utf-8"))
+    return 0
+
+def graphdiff(args):
+    from requests.auth import HTTPBasicAuth
+    from graph_diff import graph_diff, write_diff
+
+    auth = HTTPBasicAuth(args.user, args.password) if args.user else None
+    with open(args.output, "w", encoding="utf-8") as f:
+        subjects, removed, added = write_diff(graph_diff(args.old, args.new, directory=args.tmp, auth=auth), f)
+    logging.info(f"Wrote {args.output}.")
+    print(f"{subjects} subjects changed: {removed} triples removed, {added} added")
+    return 0
+
+def parser():
+    main = argparse.ArgumentParser(prog="cli.py", description=__doc__.split("\n")[0])
+    main.add_argument("-v", "--verbose", action="store_true", help="log progress")
+    commands = main.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("compare", help="compare two OTL versions, or a chain of them, from a YAML config")
+    command.add_argument("config", help="YAML file with the DeltaChecker config (endpoints, or an ordered list of versions; queries, summary, ...)")
+    command.add_argument("--format", default="xlsx", choices=("xlsx", "parquet", "arrow", "csv"))
+    command.add_argument("-o", "--output", help="report file (default: changelog_<date>.<extension>)")
+    command.set_defaults(run=compare)
+
+    command = commands.add_parser("validate", help="validate project data against SHACL shapes; exits 1 when it does not conform")
+    command.add_argument("data", help="Turtle, N-Triples or N-Quads file, optionally gzipped")
+    shapes = command.add_mutually_exclusive_group(required=True)
+    shapes.add_argument("--shapes", help="SHACL shapes file (Turtle)")
+    shapes.add_argument("--endpoint", help="SPARQL endpoint to fetch the shapes from")
+    command.add_argument("--workers", type=int, default=1, help="validate in shards on this many processes (0: all cores)")
+    command.add_argument("--report", help="write the violations to this .csv or .parquet file")
+    command.add_argument("--no-cache", action="store_true", help="do not cache the parsed project data")
+    command.set_defaults(run=validate)
+
+    command = commands.add_parser("docgen", help="generate the requirements report")
+    command.add_argument("--endpoint", required=True)
+    command.add_argument("--user", default=os.environ.get("LDP_USERNAME"))
+    command.add_argument("--password", default=os.environ.get("LDP_PASSWORD"), help="default: $LDP_PASSWORD")
+    command.add_argument("--specs", default=DOCGEN_QUERIES["specs"], help="specifications query file")
+    command.add_argument("--subjects", default=DOCGEN_QUERIES["subjects"], help="subjects query template file")
+    command.add_argument("--plans", default=DOCGEN_QUERIES["plans"], help="plans query template file")
+    command.add_argument("--unbatched", action="store_true", help="run two queries per specification")
+    command.add_argument("--page-size", type=int, help="fetch every query in pages of this many rows (default: unpaged)")
+    command.add_argument("-o", "--output", default="report.md", help="a .md or .pdf file")
+    command.set_defaults(run=docgen)
+
+    command = commands.add_parser("graphdiff", help="diff every triple of two OTL versions, grouped by subject")
+    command.add_argument("old", help="SPARQL endpoint or N-Triples file (optionally gzipped) of the old version")
+    command.add_argument("new", help="SPARQL endpoint or N-Triples file of the new version")
+    command.add_argument("--user", default=os.environ.get("LDP_USERNAME"))
+    command.add_argument("--password", default=os.environ.get("LDP_PASSWORD"), help="default: $LDP_PASSWORD")
+    command.add_argument("--tmp", help="directory for the sort runs (default: the system temporary directory)")
+    command.add_argument("-o", "--output", default="graph.diff", help="text file with the removed (-) and added (+) triples")
+    command.set_defaults(run=graphdiff)
+    return main
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(levelname)s %(message)s")
+    if getattr(args, "workers", None) == 0:
+        args.workers = None
+    return args.run(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
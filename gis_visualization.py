@@ -1,63 +1,199 @@
+import re
 import streamlit as st
+import numpy as np
 import pandas as pd
 import pydeck as pdk
-import re
+from rdflib import Namespace
+from perf_trace import stage
+from spatial_index import SpatialIndex
+
+GEO = Namespace("http://www.opengis.net/ont/geosparql#")
+VIOLATION_COLOR = (255, 0, 0)
+CONFORMING_COLOR = (0, 128, 0)
+_NUMBER = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+# An optional CRS IRI (GeoSPARQL wktLiteral), the geometry type, Z/M flags and the coordinate body.
+_WKT = r"^\s*(?:<[^>]*>\s*)?(?P<kind>POINT|LINESTRING|POLYGON)\s*(?:ZM|Z|M)?\s*\((?P<body>.*)\)\s*$"
+_COORDINATE = rf"^\s*\(?\s*(?P<lon>{_NUMBER})\s+(?P<lat>{_NUMBER})"
+
+def geometry_frame(data_graph) -> pd.DataFrame:
+    """Returns the subject and WKT of every geo:hasGeometry/geo:asWKT pair, read straight from the triple index."""
+    has_geometry = pd.DataFrame(data_graph.subject_objects(GEO.hasGeometry), columns=["subject", "geometry"])
+    as_wkt = pd.DataFrame(data_graph.subject_objects(GEO.asWKT), columns=["geometry", "wkt"])
+    frame = has_geometry.merge(as_wkt, on="geometry")
+    return pd.DataFrame({"subject": frame["subject"].astype(str), "wkt": frame["wkt"].astype(str)})
+
+def _shapes(parts: pd.DataFrame) -> pd.Series:
+    """Returns the vertex lists of lines and the ring lists of polygons, indexed like `parts`."""
+    # One row per ring (a line is one ring), then one row per vertex, keyed by the ring's position.
+    rings = parts["body"].where(parts["kind"] != "POLYGON", parts["body"].str.split(r"\)\s*,\s*\(")).explode()
+    ring_owner = rings.index.to_numpy()
+    vertices = pd.Series(rings.to_numpy()).str.split(",").explode().str.extract(_COORDINATE).astype(float)
+    valid = vertices.notna().all(axis=1).to_numpy()
+    ring_ids, values = vertices.index.to_numpy()[valid], vertices.to_numpy()[valid]
+    if not len(values):
+        return pd.Series(dtype=object)
+    starts = np.flatnonzero(np.r_[True, ring_ids[1:] != ring_ids[:-1]])
+    ring_list = [ring.tolist() for ring in np.split(values, starts[1:])]
+    ring_rows = ring_owner[ring_ids[starts]]
+    owners = np.flatnonzero(np.r_[True, ring_rows[1:] != ring_rows[:-1]])
+    shapes = pd.Series([ring_list[a:b] for a, b in zip(owners, np.r_[owners[1:], len(ring_list)])], index=ring_rows[owners])
+    lines = parts.loc[shapes.index, "kind"].to_numpy() == "LINESTRING"
+    shapes[lines] = shapes[lines].str[0]
+    return shapes
+
+def parse_wkt(wkt: pd.Series) -> pd.DataFrame:
+    """Parses POINT, LINESTRING and POLYGON WKT.
+
+    Returns `kind`, `lon`/`lat` (the point, or the first vertex) and `coordinates`:
+    the vertices of a line, or the rings of a polygon. Anything else is dropped.
+    """
+    parts = wkt.str.extract(_WKT, flags=re.IGNORECASE).dropna()
+    parts["kind"] = parts["kind"].str.upper()
+    frame = parts[["kind"]].join(parts["body"].str.extract(_COORDINATE).astype(float)).dropna()
+    frame["coordinates"] = _shapes(parts[parts["kind"] != "POINT"])
+    return frame
+
+def _styled(frame, violating_nodes):
+    violation = frame["subject"].isin(violating_nodes).to_numpy()
+    for channel, (bad, good) in zip("rgb", zip(VIOLATION_COLOR, CONFORMING_COLOR)):
+        frame[channel] = np.where(violation, bad, good)
+    frame["status"] = np.where(violation, "Violation", "Conforming")
+    frame["violation"] = violation
+    return frame
+
+def _cluster_styled(clusters):
+    # Colour runs from conforming to violation with the share of violating assets; the tooltip shows the counts.
+    share = (clusters["violations"] / clusters["count"]).to_numpy()
+    clusters = clusters.assign(subject=clusters["count"].astype(str) + " assets",
+                               status=clusters["violations"].astype(str) + " violations",
+                               radius=6 + 3 * np.log2(clusters["count"].to_numpy()))
+    for channel, (bad, good) in zip("rgb", zip(VIOLATION_COLOR, CONFORMING_COLOR)):
+        clusters[channel] = np.round(good + share * (bad - good)).astype(int)
+    return clusters
+
+def map_index(data_graph, violating_nodes):
+    """Returns the SpatialIndex of the styled geometries, or None when there are none.
+
+    Kept in the session for the given graph and violations, so zooming through the map
+    does not parse the geometries again.
+    """
+    cached = st.session_state.get("gis_index")
+    if cached and cached[0] is data_graph and cached[1] is violating_nodes:
+        return cached[2]
+    with stage("collect geometries") as current:
+        geo_df = geometry_frame(data_graph)
+        current.rows = len(geo_df)
+    with stage("parse WKT") as current:
+        geo_df = geo_df[["subject"]].join(parse_wkt(geo_df["wkt"]), how="inner")
+        current.rows = len(geo_df)
+    with stage("spatial index"):
+        index = SpatialIndex(_styled(geo_df, violating_nodes)) if len(geo_df) else None
+    st.session_state["gis_index"] = (data_graph, violating_nodes, index)
+    return index
+
+def _set_tile(tile):
+    st.session_state["gis_tile"] = tile
+
+def _select_tile(key):
+    clusters = st.session_state[key].selection["objects"].get("clusters")
+    if clusters:
+        _set_tile((int(clusters[0]["level"]), int(clusters[0]["code"])))
+
+def _cluster_layers(clusters):
+    return [pdk.Layer(
+        'ScatterplotLayer',
+        id="clusters",
+        data=_cluster_styled(clusters)[["level", "code", "subject", "status", "lon", "lat", "radius", "r", "g", "b"]],
+        get_position='[lon, lat]',
+        get_fill_color='[r, g, b, 160]',
+        get_radius='radius',
+        radius_units='pixels',
+        pickable=True,
+        auto_highlight=True
+    )]
+
+def _geometry_layers(geo_df):
+    layers = []
+    points = geo_df[geo_df["kind"] == "POINT"]
+    if len(points):
+        layers.append(pdk.Layer(
+            'ScatterplotLayer',
+            id="points",
+            data=points[["subject", "status", "lon", "lat", "r", "g", "b"]],
+            get_position='[lon, lat]',
+            get_fill_color='[r, g, b, 160]',
+            get_radius=25,
+            pickable=True,
+            auto_highlight=True
+        ))
+    lines = geo_df[geo_df["kind"] == "LINESTRING"]
+    if len(lines):
+        layers.append(pdk.Layer(
+            'PathLayer',
+            id="lines",
+            data=lines[["subject", "status", "coordinates", "r", "g", "b"]],
+            get_path='coordinates',
+            get_color='[r, g, b, 200]',
+            width_min_pixels=2,
+            pickable=True,
+            auto_highlight=True
+        ))
+    polygons = geo_df[geo_df["kind"] == "POLYGON"]
+    if len(polygons):
+        layers.append(pdk.Layer(
+            'PolygonLayer',
+            id="polygons",
+            data=polygons[["subject", "status", "coordinates", "r", "g", "b"]],
+            get_polygon='coordinates',
+            get_fill_color='[r, g, b, 90]',
+            get_line_color='[r, g, b, 200]',
+            line_width_min_pixels=1,
+            pickable=True,
+            auto_highlight=True
+        ))
+    return layers
 
 def display_gis_map(data_graph, violating_nodes):
+    """Draws the geometries of the project data, coloured by validation status.
+
+    Large projects are drawn as clusters with violation counts; clicking a cluster
+    zooms into it, down to the individual geometries of the area.
+    """
     st.info("Building the map.....")
     try:
-        # SPARQL query to extract WKT Pounts from project data
-        geo_query = """
-        PREFIX geo: <http://www.opengis.net/ont/geosparql#>
-        SELECT ?subject ?wkt
-        WHERE {
-          ?subject geo:hasGeometry ?geom .
-          ?geom geo:asWKT ?wkt .
-        }
-        """
-        qres = data_graph.query(geo_query)
-        geo_data = [{"subject": str(r["subject"]), "wkt": str(r["wkt"])} for r in qres]
-
-        if not geo_data:
+        if not any(True for _ in data_graph.triples((None, GEO.hasGeometry, None))):
             st.info("No geometry data (geo:hasGeometry/geo:asWKT) found in the project data file.")
             return
 
-        geo_df = pd.DataFrame(geo_data)
-
-        # Function to parse WKT "POINT(lon lat)"
-        def parse_point(wkt_str):
-            match = re.search(r"POINT\s*\(\s*(-?\d+\.?\d*)\s+(-?\d+\.?\d*)\s*\)", wkt_str, re.IGNORECASE)
-            if match:
-                return pd.Series([float(match.group(1)), float(match.group(2))])
-            return pd.Series([None, None])
-
-        geo_df[['lon', 'lat']] = geo_df['wkt'].apply(parse_point)
-        geo_df.dropna(subset=['lon', 'lat'], inplace=True)
+        index = map_index(data_graph, violating_nodes)
 
-        if geo_df.empty:
-            st.info("Could not find any valid POINT geometries in the project data.")
+        if index is None:
+            st.info("Could not find any valid POINT, LINESTRING or POLYGON geometries in the project data.")
             return
-        
-        # Green for conforming, Red for violation
-        geo_df['color'] = geo_df['subject'].apply(
-            lambda x: [255, 0, 0, 160] if x in violating_nodes else [0, 128, 0, 160]
-        )
-        geo_df['tooltip_text'] = geo_df.apply(
-            lambda row: f"<b>Object:</b> {row['subject']}<br/><b>Status:</b> {'Violation' if row['subject'] in violating_nodes else 'Conforming'}",
-            axis=1
-        )
+
+        tile = st.session_state.get("gis_tile", (0, 0))
+        if tile != (0, 0):
+            back_col, reset_col, _ = st.columns([1, 1, 4])
+            back_col.button("Zoom out", on_click=_set_tile, args=((tile[0] - 1, tile[1] >> 2),))
+            reset_col.button("Whole project", on_click=_set_tile, args=((0, 0),))
+        with stage("map view") as current:
+            shown, geo_df = index.view(tile)
+            current.rows = len(geo_df)
+        if shown == "clusters":
+            st.caption(f"{len(index)} geometries in {len(geo_df)} clusters. Click a cluster to zoom in.")
 
          # Set initial view
         initial_view_state = pdk.ViewState(
             latitude=geo_df['lat'].mean(),
             longitude=geo_df['lon'].mean(),
-            zoom=12,
+            zoom=12 if tile == (0, 0) else tile[0] + 1,
             pitch=50
         )
 
         # OSM tile layer
         tile_layer = pdk.Layer(
             "TileLayer",
+            id="tiles",
             data=None,
             min_zoom=0,
             max_zoom=19,
@@ -67,19 +203,10 @@ def display_gis_map(data_graph, violating_nodes):
             url_template="https://tile.openstreetmap.org/{z}/{x}/{y}.png"
         )
 
-        # Scatter plot layer
-        points_layer = pdk.Layer(
-            'ScatterplotLayer',
-            data=geo_df,
-            get_position='[lon, lat]',
-            get_color='color',
-            get_radius=25,
-            pickable=True,
-            auto_highlight=True
-        )
+        layers = [tile_layer] + (_cluster_layers(geo_df) if shown == "clusters" else _geometry_layers(geo_df))
 
         tooltip = {
-            "html": "{tooltip_text}",
+            "html": "<b>Object:</b> {subject}<br/><b>Status:</b> {status}",
             "style": {
                 "backgroundColor": "black",
                 "color": "white",
@@ -89,15 +216,17 @@ def display_gis_map(data_graph, violating_nodes):
             }
         }
 
-        # Create map with OSM + points
+        # Create map with OSM + geometries
         r = pdk.Deck(
-            layers=[tile_layer, points_layer],
+            layers=layers,
             initial_view_state=initial_view_state,
             map_style=None,  # Needed so we can add our own tile layer
             tooltip=tooltip
         )
 
-        st.pydeck_chart(r)
+        # A new key per tile drops the previous selection.
+        key = f"gis_map_{tile[0]}_{tile[1]}"
+        st.pydeck_chart(r, on_select=lambda: _select_tile(key), selection_mode="single-object", key=key)
 
     except Exception as e:
-        st.error(f"An error occurred during GIS map generation: {e}")
\ No newline at end of file
+        st.error(f"An error occurred during GIS map generation: {e}")
@@ -0,0 +1,84 @@
+import hashlib
+from collections import defaultdict
+from rdflib import BNode
+
+def _digest(lines):
+    return hashlib.sha1("\n".join(sorted(lines)).encode("utf-8")).hexdigest()
+
+def blank_node_keys(graph):
+    """Keys every blank node by its description and the triples that reference it.
+
+    A blank node's signature hashes its outgoing triples (nested blank nodes by
+    their own signature); its key adds the referencing subjects (IRIs, or the keys
+    of referencing blank nodes) and predicates. Two parses of the same file give
+    the same keys, whatever labels the parser picked. Returns None if blank nodes
+    form a cycle.
+    """
+    outgoing, incoming = defaultdict(list), defaultdict(list)
+    for s, p, o in graph:
+        if isinstance(s, BNode): outgoing[s].append((p, o))
+        if isinstance(o, BNode): incoming[o].append((s, p))
+    nodes = set(outgoing) | set(incoming)
+
+    signatures = {}
+    for root in nodes:
+        if root in signatures: continue
+        # Iterative post-order walk; RDF lists nest far deeper than the recursion limit.
+        stack, on_stack = [(root, False)], {root}
+        while stack:
+            node, expanded = stack.pop()
+            if expanded:
+                on_stack.discard(node)
+                signatures[node] = _digest(f"{p.n3()} {signatures[o] if isinstance(o, BNode) else o.n3()}" for p, o in outgoing[node])
+                continue
+            stack.append((node, True))
+            for _, o in outgoing[node]:
+                if not isinstance(o, BNode) or o in signatures: continue
+                if o in on_stack:
+                    return None
+                on_stack.add(o)
+                stack.append((o, False))
+
+    keys = {}
+    for root in nodes:
+        if root in keys: continue
+        # Referencing blank nodes need their key first; references are acyclic once signatures are.
+        stack = [root]
+        while stack:
+            node = stack[-1]
+            pending = [s for s, _ in incoming[node] if isinstance(s, BNode) and s not in keys]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            if node in keys: continue
+            referrers = (f"{keys[s] if isinstance(s, BNode) else s.n3()} {p.n3()}" for s, p in incoming[node])
+            keys[node] = _digest([signatures[node], *referrers])
+    return keys
+
+def relabel_blank_nodes(graph, keys, previous_keys):
+    """Renames, in place, the blank nodes of `graph` whose key identifies a single blank node of the previous revision.
+
+    Returns the keys of `graph` after renaming. Blank nodes whose key is ambiguous
+    on either side keep their label and so show up as changed.
+    """
+    def unique(mapping):
+        counts = defaultdict(int)
+        for key in mapping.values():
+            counts[key] += 1
+        return {key: node for node, key in mapping.items() if counts[key] == 1}
+    previous = unique(previous_keys)
+    renames = {node: previous[key] for key, node in unique(keys).items() if key in previous and previous[key] != node}
+    if not renames:
+        return keys
+    triples = {t for node in renames for t in graph.triples((node, None, None))}
+    triples.update(t for node in renames for t in graph.triples((None, None, node)))
+    for s, p, o in triples:
+        graph.remove((s, p, o))
+    graph.addN((renames.get(s, s), p, renames.get(o, o), graph) for s, p, o in triples)
+    return {renames.get(node, node): key for node, key in keys.items()}
+
+def graph_delta(previous, current):
+    """Returns the (removed, added) triples between two revisions of a graph."""
+    previous_triples, current_triples = set(previous), set(current)
+    return previous_triples - current_triples, current_triples - previous_triples
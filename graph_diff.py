@@ -0,0 +1,252 @@
+"""Triple-level diff of two full graphs, with memory bounded by a sort run instead of the graph size.
+
+Both versions are streamed as N-Triples and every triple is written as one
+canonical N-Triples line, prefixed with a hash of its subject and a hash of the
+line. The lines are sorted in runs of `run_records` on disk and merged back, so
+both versions come out in (subject hash, triple hash) order. One merge walk
+over the two streams then yields the removed and added triples, grouped by
+subject.
+
+Blank node labels differ between exports, so they are replaced by a hash of
+their neighbourhood (see TripleSorter._label_blank_nodes). Blank nodes whose
+neighbourhoods match up to BLANK_NODE_ROUNDS hops get the same label and are
+compared as one node.
+"""
+import contextlib
+import gzip
+import hashlib
+import heapq
+import io
+import itertools
+import logging
+import os
+import sqlite3
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from rdflib import BNode, Graph, Literal
+from rdflib.plugins.parsers.ntriples import W3CNTriplesParser
+from rdflib.plugins.serializers.nt import _quoteLiteral
+from perf_trace import propagate, stage
+from sparql_client import ChunkReader, get_client
+
+ALL_TRIPLES = "CONSTRUCT { ?s ?p ?o } WHERE { ?s ?p ?o }"
+NTRIPLES_ACCEPT = "application/n-triples, text/plain;q=0.9, text/turtle;q=0.5"
+DEFAULT_RUN_RECORDS = 250_000  # triples sorted in memory at a time
+MERGE_FAN_IN = 64  # runs merged at once; more runs are merged in several passes
+BLANK_NODE_ROUNDS = 3
+BLANK_NODE_BATCH = 10_000
+SUBJECT_HASH_LEN = 16
+KEY_LEN = 40  # subject hash and triple hash, in hex
+
+def _hash(text, size):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=size).hexdigest()
+
+def _term(node):
+    # Literals are quoted the way rdflib writes N-Triples, so newlines are escaped and a triple stays on one line.
+    return _quoteLiteral(node) if isinstance(node, Literal) else node.n3()
+
+def _record(subject, line):
+    return f"{_hash(subject, SUBJECT_HASH_LEN // 2)}{_hash(line, (KEY_LEN - SUBJECT_HASH_LEN) // 2)}\t{line}\n"
+
+class _Neighbourhood():
+    """SQLite aggregate: hashes the sorted descriptions of a blank node's edges into its label."""
+    def __init__(self) -> None:
+        self.parts = []
+
+    def step(self, part):
+        self.parts.append(part)
+
+    def finalize(self):
+        return "_:b" + _hash("\n".join(sorted(self.parts)), 16)
+
+def _label_round(previous, current):
+    # A blank node is described by its outgoing and incoming edges, with neighbouring
+    # blank nodes shown by their label of the previous round (or as "_:" in the first).
+    neighbour = "COALESCE(l.label, CASE WHEN substr(t.{0}, 1, 2) = '_:' THEN '_:' ELSE t.{0} END)"
+    return f"""INSERT INTO {current} SELECT node, neighbourhood(part) FROM (
+        SELECT t.s AS node, '> ' || t.p || ' ' || {neighbour.format("o")} AS part
+            FROM triples t LEFT JOIN {previous} l ON l.node = t.o WHERE substr(t.s, 1, 2) = '_:'
+        UNION ALL
+        SELECT t.o, '< ' || {neighbour.format("s")} || ' ' || t.p
+            FROM triples t LEFT JOIN {previous} l ON l.node = t.s WHERE substr(t.o, 1, 2) = '_:'
+    ) GROUP BY node"""
+
+class TripleSorter():
+    """Collects the triples of one graph version into sorted runs in `directory`.
+
+    Usable as the sink of rdflib's N-Triples parser. Triples with blank nodes are
+    kept in a SQLite table until all triples are in, then labelled and sorted too.
+    """
+    def __init__(self, directory, run_records=DEFAULT_RUN_RECORDS) -> None:
+        self.directory = directory
+        self.run_records = run_records
+        self.triples = 0
+        self._buffer = []
+        self._blank = []
+        self._runs = []
+        self._db = sqlite3.connect(os.path.join(directory, "blank_nodes.sqlite3"), check_same_thread=False)
+        self._db.execute("CREATE TABLE triples (s TEXT, p TEXT, o TEXT)")
+
+    def triple(self, s, p, o):
+        self.triples += 1
+        terms = (_term(s), _term(p), _term(o))
+        if isinstance(s, BNode) or isinstance(o, BNode):
+            self._blank.append(terms)
+            if len(self._blank) >= BLANK_NODE_BATCH:
+                self._flush_blank()
+            return
+        self._add(terms[0], f"{terms[0]} {terms[1]} {terms[2]} .")
+
+    def _add(self, subject, line):
+        self._buffer.append(_record(subject, line))
+        if len(self._buffer) >= self.run_records:
+            self._flush()
+
+    def _flush_blank(self):
+        self._db.executemany("INSERT INTO triples VALUES (?, ?, ?)", self._blank)
+        self._blank = []
+
+    def _flush(self):
+        if not self._buffer: return
+        self._buffer.sort()
+        path = os.path.join(self.directory, f"run{len(self._runs)}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(self._buffer)
+        self._runs.append(path)
+        self._buffer = []
+
+    def _label_blank_nodes(self):
+        """Relabels blank nodes by BLANK_NODE_ROUNDS rounds of neighbourhood hashing and sorts their triples."""
+        self._flush_blank()
+        self._db.create_aggregate("neighbourhood", 1, _Neighbourhood)
+        previous = "labels0"
+        self._db.execute(f"CREATE TABLE {previous} (node TEXT PRIMARY KEY, label TEXT)")
+        for i in range(1, BLANK_NODE_ROUNDS + 1):
+            current = f"labels{i}"
+            self._db.execute(f"CREATE TABLE {current} (node TEXT PRIMARY KEY, label TEXT)")
+            self._db.execute(_label_round(previous, current))
+            previous = current
+        rows = self._db.execute(f"""SELECT COALESCE(ls.label, t.s), t.p, COALESCE(lo.label, t.o) FROM triples t
+            LEFT JOIN {previous} ls ON ls.node = t.s LEFT JOIN {previous} lo ON lo.node = t.o""")
+        for s, p, o in rows:
+            self._add(s, f"{s} {p} {o} .")
+
+    def records(self):
+        """Finishes the runs and returns an iterator over the distinct records in sort order."""
+        with stage("external sort") as current:
+            current.rows = self.triples
+            self._label_blank_nodes()
+            self._db.close()
+            self._flush()
+            runs = self._runs
+            # Merge passes keep the number of open files at MERGE_FAN_IN.
+            while len(runs) > MERGE_FAN_IN:
+                merged = []
+                for i in range(0, len(runs), MERGE_FAN_IN):
+                    path = os.path.join(self.directory, f"merge{len(self._runs)}.txt")
+                    self._runs.append(path)
+                    with open(path, "w", encoding="utf-8") as f:
+                        f.writelines(_merged(runs[i:i + MERGE_FAN_IN]))
+                    merged.append(path)
+                runs = merged
+        return _merged(runs)
+
+def _merged(paths):
+    """Yields the distinct lines of sorted files in order."""
+    with contextlib.ExitStack() as files:
+        previous = None
+        for record in heapq.merge(*(files.enter_context(open(path, encoding="utf-8")) for path in paths)):
+            if record != previous:
+                yield record
+            previous = record
+
+def _parse_stream(stream, sorter):
+    W3CNTriplesParser(sorter).parse(io.BufferedReader(stream, buffer_size=1 << 20))
+
+def load_endpoint(endpoint, sorter, query=ALL_TRIPLES, auth=None):
+    """Streams the result of a CONSTRUCT `query` (all triples by default) into `sorter`.
+
+    An endpoint that answers in another syntax than N-Triples is parsed from
+    the complete response into memory first.
+    """
+    client = get_client()
+    with stage("stream triples", endpoint):
+        response = client.query(endpoint, query, accept=NTRIPLES_ACCEPT, auth=auth, stream=True)
+        with response:
+            response.raise_for_status()
+            content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+            if content_type in ("application/n-triples", "text/plain"):
+                _parse_stream(ChunkReader(client.iter_content(response)), sorter)
+                return
+            logging.warning(f"{endpoint} does not return N-Triples; parsing its {content_type or 'response'} in memory.")
+            graph = Graph().parse(data=b"".join(client.iter_content(response)), format="turtle")
+        for triple in graph:
+            sorter.triple(*triple)
+
+def load_file(path, sorter):
+    """Streams an N-Triples file, optionally gzipped, into `sorter`."""
+    with stage("stream triples", path):
+        with open(path, "rb") as f:
+            gzipped = f.read(2) == b"\x1f\x8b"
+        with (gzip.open(path, "rb") if gzipped else open(path, "rb")) as f:
+            _parse_stream(f, sorter)
+
+def load(source, sorter, auth=None):
+    """Loads an endpoint URL or an N-Triples file path into `sorter`."""
+    if source.startswith(("http://", "https://")):
+        load_endpoint(source, sorter, auth=auth)
+    else:
+        load_file(source, sorter)
+
+def _changes(old_records, new_records):
+    """Merge-walks two sorted record streams and yields ("-", record) for removed and ("+", record) for added triples."""
+    old, new = next(old_records, None), next(new_records, None)
+    while old is not None or new is not None:
+        if new is None or (old is not None and old[:KEY_LEN] < new[:KEY_LEN]):
+            yield "-", old
+            old = next(old_records, None)
+        elif old is None or new[:KEY_LEN] < old[:KEY_LEN]:
+            yield "+", new
+            new = next(new_records, None)
+        else:
+            old, new = next(old_records, None), next(new_records, None)
+
+def graph_diff(old, new, directory=None, auth=None, run_records=DEFAULT_RUN_RECORDS):
+    """Yields (subject, removed, added) per subject whose triples differ between the graphs `old` and `new`.
+
+    Sources are endpoint URLs or N-Triples files (see load); both are loaded
+    concurrently. `removed` and `added` are lists of N-Triples lines. Sort runs
+    are written to a temporary directory in `directory`, removed afterwards.
+    """
+    with tempfile.TemporaryDirectory(prefix="graph_diff_", dir=directory) as workdir:
+        sorters = []
+        for side in ("old", "new"):
+            os.makedirs(os.path.join(workdir, side))
+            sorters.append(TripleSorter(os.path.join(workdir, side), run_records))
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="graph-diff") as executor:
+            futures = [executor.submit(propagate(load), source, sorter, auth) for source, sorter in zip((old, new), sorters)]
+            for future in futures:
+                future.result()
+        changes = _changes(sorters[0].records(), sorters[1].records())
+        for _, group in itertools.groupby(changes, key=lambda change: change[1][:SUBJECT_HASH_LEN]):
+            removed, added = [], []
+            for sign, record in group:
+                (removed if sign == "-" else added).append(record[KEY_LEN + 1:-1])
+            yield (removed or added)[0].split(" ", 1)[0], removed, added
+
+def write_diff(changes, output):
+    """Writes graph_diff changes to the text file `output` and returns (subjects, removed, added) counts.
+
+    Each changed subject gets a "# <subject>" header followed by its removed
+    triples prefixed with "- " and its added triples prefixed with "+ ".
+    """
+    subjects = removed_count = added_count = 0
+    for subject, removed, added in changes:
+        output.write(f"# {subject}\n")
+        output.writelines(f"- {line}\n" for line in removed)
+        output.writelines(f"+ {line}\n" for line in added)
+        output.write("\n")
+        subjects += 1
+        removed_count += len(removed)
+        added_count += len(added)
+    return subjects, removed_count, added_count
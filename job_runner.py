@@ -0,0 +1,256 @@
+"""Runs long comparisons and validations in background processes, tracked in a SQLite job store.
+
+A job is keyed by the hash of its inputs (see job_key). Submitting inputs that
+are already queued, running or finished less than `ttl` seconds ago returns the
+existing job instead of starting another, so sessions asking for the same work
+share one run and its result. Jobs report progress to the store, where any
+session (or a reloaded page) can read it back by key.
+
+Inputs that cannot be identified by content, such as a SPARQL endpoint that
+publishes no ontology version, should be given a unique value in the key: what
+they serve may change at any time, so those jobs are never shared.
+"""
+import contextlib
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_JOB_WORKERS = 2
+DEFAULT_RESULT_TTL = 3600  # seconds a finished job is shared; endpoints change, so results go stale
+DEFAULT_RETENTION = 7 * 24 * 3600
+PROGRESS_INTERVAL = 0.5  # seconds between progress writes
+ACTIVE = ("queued", "running")
+# The same caches as the app and the command line.
+SHAPES_CACHE_DIR = os.path.join(".cache", "shapes")
+GRAPH_CACHE_DIR = os.path.join(".cache", "graphs")
+
+_SCHEMA = """CREATE TABLE IF NOT EXISTS jobs (
+    key TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, progress REAL NOT NULL DEFAULT 0,
+    message TEXT, error TEXT, owner INTEGER, created REAL NOT NULL, updated REAL NOT NULL)"""
+
+def job_key(kind, inputs) -> str:
+    """Returns the key of a `kind` job on `inputs`, a JSON-serializable description of everything the result depends on."""
+    payload = json.dumps({"kind": kind, "inputs": inputs}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class JobStore():
+    """The job table and the pickled results of finished jobs, in `directory`. Safe to open from several processes."""
+    def __init__(self, directory) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "jobs.sqlite3")
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(_SCHEMA)
+
+    def _connect(self):
+        # One short-lived connection per call, so the store can be used from any thread.
+        return contextlib.closing(sqlite3.connect(self.path, timeout=30, isolation_level=None))
+
+    def _result_path(self, key):
+        return os.path.join(self.directory, f"{key}.result")
+
+    def claim(self, key, kind, ttl=DEFAULT_RESULT_TTL) -> bool:
+        """Queues job `key` and returns True, or returns False when an active or fresh finished job can be shared.
+
+        Failed, interrupted and stale jobs are replaced.
+        """
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT status, owner, updated FROM jobs WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                status, owner, updated = row
+                if (status in ACTIVE and _alive(owner)) or (status == "done" and now - updated < ttl and os.path.exists(self._result_path(key))):
+                    db.execute("COMMIT")
+                    return False
+            db.execute("INSERT OR REPLACE INTO jobs (key, kind, status, progress, message, error, owner, created, updated) "
+                       "VALUES (?, ?, 'queued', 0, NULL, NULL, ?, ?, ?)", (key, kind, os.getpid(), now, now))
+            db.execute("COMMIT")
+            return True
+
+    def _update(self, key, **values):
+        values["updated"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in values)
+        with self._connect() as db:
+            db.execute(f"UPDATE jobs SET {columns} WHERE key = ?", (*values.values(), key))
+
+    def progress(self, key, fraction, message=None):
+        self._update(key, status="running", progress=min(max(float(fraction), 0.0), 1.0), message=message)
+
+    def finish(self, key, result):
+        path = self._result_path(key)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except BaseException:
+            self._remove(tmp)
+            raise
+        self._update(key, status="done", progress=1.0, message=None)
+
+    def fail(self, key, error):
+        self._update(key, status="failed", error=error)
+
+    def get(self, key):
+        """Returns job `key` as a dict (status, progress, message, error, ...), or None if it is unknown.
+
+        An active job whose owning process has gone (e.g. the server restarted) is reported as failed.
+        """
+        with self._connect() as db:
+            db.row_factory = sqlite3.Row
+            row = db.execute("SELECT * FROM jobs WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        if job["status"] in ACTIVE and not _alive(job["owner"]):
+            job.update(status="failed", error="The job was interrupted (the server stopped before it finished).")
+            self.fail(key, job["error"])
+        return job
+
+    def result(self, key):
+        with open(self._result_path(key), "rb") as f:
+            return pickle.load(f)
+
+    def purge(self, retention=DEFAULT_RETENTION):
+        """Deletes finished and failed jobs, and their results, last updated more than `retention` seconds ago."""
+        with self._connect() as db:
+            keys = [key for key, in db.execute("SELECT key FROM jobs WHERE status NOT IN (?, ?) AND updated < ?",
+                                               (*ACTIVE, time.time() - retention))]
+            db.executemany("DELETE FROM jobs WHERE key = ?", [(key,) for key in keys])
+        for key in keys:
+            self._remove(self._result_path(key))
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def _run(directory, key, fn, args, kwargs):
+    """Runs one job in a worker process and records its progress, result or error in the store."""
+    store = JobStore(directory)
+    last = 0.0
+    def progress(fraction, text=None):
+        nonlocal last
+        now = time.monotonic()
+        if now - last >= PROGRESS_INTERVAL or fraction >= 1.0:
+            last = now
+            store.progress(key, fraction, text)
+    store.progress(key, 0.0, "Started...")
+    try:
+        store.finish(key, fn(*args, progress=progress, **kwargs))
+    except Exception as e:
+        logging.exception(f"Job {key} failed")
+        store.fail(key, f"{type(e).__name__}: {e}")
+
+class JobRunner():
+    """Submits jobs to a process pool and reads their state from a JobStore.
+
+    Workers are spawned rather than forked, so they do not inherit the threads
+    and sockets of a running server. Job functions must be importable module
+    level functions that take a `progress(fraction, text)` keyword argument.
+    """
+    def __init__(self, directory, max_workers=DEFAULT_JOB_WORKERS, ttl=DEFAULT_RESULT_TTL) -> None:
+        self.store = JobStore(directory)
+        self.store.purge()
+        self.ttl = ttl
+        self._executor = ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def submit(self, kind, key, fn, *args, **kwargs) -> str:
+        """Runs `fn(*args, **kwargs)` as job `key` unless an identical job can be shared; returns the key."""
+        if self.store.claim(key, kind, self.ttl):
+            future = self._executor.submit(_run, self.store.directory, key, fn, args, kwargs)
+            future.add_done_callback(lambda future: self._check(key, future))
+        return key
+
+    def _check(self, key, future):
+        # _run records its own errors; this catches workers that died (e.g. out of memory).
+        e = future.exception()
+        if e is not None:
+            self.store.fail(key, f"{type(e).__name__}: {e}")
+
+    def status(self, key):
+        return self.store.get(key)
+
+    def result(self, key):
+        return self.store.result(key)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+def comparison_job(config, output_format="xlsx", profile=False, progress=None):
+    """Runs DeltaChecker (or ChainChecker) on `config`; returns the report bytes and format, the result cache statistics and the trace."""
+    from perf_trace import Trace
+    from version_comparator import comparison_checker
+
+    checker = comparison_checker(config)
+    trace = Trace("Comparison", profile=profile)
+    with trace.activate():
+        report = checker.run(progress_callback=progress, output_format=output_format)
+    return {"report": report.getvalue() if report else None, "format": output_format,
+            "cache_stats": checker.cache.stats() if checker.cache else None, "trace": trace}
+
+_shapes_cache = None
+
+def _worker_shapes_cache():
+    # One cache per worker process, so its in-memory entries serve every validation the worker runs.
+    global _shapes_cache
+    if _shapes_cache is None:
+        from shapes_cache import ShapesCache
+        _shapes_cache = ShapesCache(SHAPES_CACHE_DIR)
+    return _shapes_cache
+
+def validation_job(data, name, shapes=None, endpoint=None, workers=1, profile=False, progress=None):
+    """Validates the RDF file `data` against the Turtle `shapes` or the shapes of `endpoint`.
+
+    Returns the conformance, the report table, the trace and the GraphCache key
+    under which the parsed data graph can be loaded for the map.
+    """
+    from rdflib import Graph
+    from perf_trace import Trace, stage
+    from rdf_loader import GraphCache, load_rdf
+    from shapes_cache import ShapesCache
+    from validation_report import report_frame
+    from validator import validate_graph
+
+    progress = progress or (lambda fraction, text=None: None)
+    trace = Trace("Validation", profile=profile)
+    with trace.activate():
+        progress(0.05, "Loading shapes...")
+        shapes_cache = _worker_shapes_cache()
+        with stage("load shapes"):
+            if shapes is not None:
+                shacl_graph = shapes_cache.prepare(ShapesCache.content_key(shapes), lambda: Graph().parse(data=shapes, format="turtle"))
+            else:
+                from shapes_source import fetch_shapes, ontology_version
+                version = ontology_version(endpoint)
+                key = ShapesCache.version_key(endpoint, version) if version else None
+                shacl_graph = shapes_cache.prepare(key, lambda: fetch_shapes(endpoint))
+        progress(0.2, "Loading project data...")
+        graph_cache = GraphCache(GRAPH_CACHE_DIR)
+        data_graph = load_rdf(data, name, cache=graph_cache)
+        progress(0.35, f"Validating {len(data_graph)} triples...")
+        conforms, results_graph, _ = validate_graph(data_graph, shacl_graph, workers=workers)
+        progress(0.9, "Building the report...")
+        with stage("report table") as current:
+            report = report_frame(results_graph)
+            current.rows = len(report)
+    return {"conforms": conforms, "report": report, "graph_key": GraphCache.key(data), "trace": trace}
@@ -1,100 +1,155 @@
-import streamlit as st
-from SPARQLWrapper import SPARQLWrapper2, JSON
-from fpdf import FPDF
 import re
+import sys
+import requests
+from requests.auth import HTTPBasicAuth
+from perf_trace import stage
+from pagination import fetch_paginated
+from sparql_client import get_client
+from sparql_rewrite import bind_values, project_variable, to_term
+import logging
 
-class LacesPDF(FPDF):
-    """Custom FPDF class with automatic Unicode character cleaning and Markdown parsing."""
-    def header(self):
-        self.set_font('Arial', 'I', 8)
-        self.cell(0, 10, 'Laces Requirements Report', 0, 0, 'R')
-        self.ln(10)
+DEFAULT_MAX_QUERY_LENGTH = 16000
+DEFAULT_BATCH_SIZE = 250
+QUERY_TOO_LARGE_STATUSES = (413, 414)
+_QUERY_TOO_LARGE = re.compile(r"too (?:long|large|big)|(?:length|size) (?:limit|exceeded)", re.IGNORECASE)
 
-    def sanitize_text(self, text):
-        """Replaces problematic Unicode characters with Latin-1 equivalents."""
-        if not text: return ""
-        replacements = {
-            '\ufb01': 'fi', '\ufb02': 'fl', '\u2013': '-', '\u2014': '-',
-            '\u2018': "'", '\u2019': "'", '\u201c': '"', '\u201d': '"', '\u2022': '*',
-        }
-        for unicode_char, replacement in replacements.items():
-            text = text.replace(unicode_char, replacement)
-        return text.encode('latin-1', 'replace').decode('latin-1')
+def _report_error(message):
+    # Shown in the app when it runs under Streamlit; streamlit itself is not imported for scripts.
+    st = sys.modules.get("streamlit")
+    if st is not None:
+        st.error(message)
+    else:
+        logging.error(message)
 
-    def add_markdown(self, markdown_text):
-        lines = markdown_text.split('\n')
-        in_table = False
-        table_data = []
-        for line in lines:
-            line = line.strip()
-            if line.startswith('|'):
-                if ':---' in line or '|---' in line: continue
-                cells = [self.sanitize_text(c.strip()) for c in line.split('|') if c.strip()]
-                if cells:
-                    table_data.append(cells)
-                    in_table = True
-                continue
-            else:
-                if in_table:
-                    self.draw_table(table_data)
-                    table_data = []; in_table = False
-            
-            clean_line = self.sanitize_text(line)
-            if clean_line.startswith('###'):
-                self.ln(5); self.set_font('Arial', 'B', 12)
-                self.multi_cell(0, 8, clean_line.replace('###', '').strip())
-                self.set_font('Arial', '', 10)
-            elif clean_line.startswith('##'):
-                self.ln(7); self.set_font('Arial', 'B', 14)
-                self.multi_cell(0, 10, clean_line.replace('##', '').strip())
-                self.set_font('Arial', '', 10)
-            elif clean_line.startswith('#'):
-                self.ln(10); self.set_font('Arial', 'B', 18)
-                self.multi_cell(0, 12, clean_line.replace('#', '').strip())
-                self.ln(5); self.set_font('Arial', '', 10)
-            elif clean_line == '---':
-                self.line(10, self.get_y(), 200, self.get_y()); self.ln(5)
-            elif clean_line:
-                self.set_font('Arial', '', 10)
-                if '**' in clean_line:
-                    parts = re.split(r'(\*\*.*?\*\*)', clean_line)
-                    for part in parts:
-                        if part.startswith('**') and part.endswith('**'):
-                            self.set_font('Arial', 'B', 10); self.write(6, part.replace('**', ''))
-                        else:
-                            self.set_font('Arial', '', 10); self.write(6, part)
-                    self.ln(6)
-                else: self.multi_cell(0, 6, clean_line)
-        if in_table: self.draw_table(table_data)
-
-    def draw_table(self, data):
-        if not data: return
-        self.set_font('Arial', 'B', 9)
-        col_width = 190 / len(data[0])
-        for col in data[0]: self.cell(col_width, 7, col, border=1)
-        self.ln()
-        self.set_font('Arial', '', 9)
-        for row in data[1:]:
-            for col in row: self.cell(col_width, 7, col, border=1)
-            self.ln()
-        self.ln(5)
+def _query_too_large(e):
+    # Errors a smaller VALUES chunk can avoid: 413/414, a 400 that says the query is too long, or a timeout.
+    if isinstance(e, requests.exceptions.Timeout):
+        return True
+    response = getattr(e, "response", None)
+    if not isinstance(e, requests.exceptions.HTTPError) or response is None:
+        return False
+    return response.status_code in QUERY_TOO_LARGE_STATUSES or (response.status_code == 400 and bool(_QUERY_TOO_LARGE.search(response.text)))
 
 class LacesEngine:
     @staticmethod
-    def retrieve_objects(endpoint, user, password, query, keys: tuple):
-        """Standard SPARQL retrieval logic."""
-        sparql = SPARQLWrapper2(endpoint)
-        if user and password: sparql.setCredentials(user, password)
-        sparql.setQuery(query)
-        sparql.setReturnFormat(JSON)
-        try:
-            response = sparql.query()
+    def _select(endpoint, user, password, query):
+        auth = HTTPBasicAuth(user, password) if user and password else None
+        response = get_client().query(endpoint, query, "application/sparql-results+json", auth=auth)
+        response.raise_for_status()
+        results = response.json()
+        return results.get("head", {}).get("vars", []), results.get("results", {}).get("bindings", [])
+
+    @staticmethod
+    def _bindings(endpoint, user, password, query, keys: tuple, page_size=None):
+        variables = []
+        def run(q):
+            page_vars, bindings = LacesEngine._select(endpoint, user, password, q)
+            variables[:] = page_vars
+            return bindings
+        def count(q):
+            return int(LacesEngine._select(endpoint, user, password, q)[1][0]["_count"]["value"])
+        with stage("SPARQL select", endpoint) as current:
+            pages = fetch_paginated(query, run, count, page_size)
             objects = []
-            if response and keys in response:
-                bindings = response[list(keys)]
-                for b in bindings:
-                    objects.append({k: b[k].value for k in keys})
-            return objects
+            # Like SPARQLWrapper2, only keep bindings in which every requested key is bound.
+            if set(keys) <= set(variables):
+                for bindings in pages:
+                    for b in bindings:
+                        if all(k in b for k in keys):
+                            objects.append({k: b[k]["value"] for k in keys})
+            current.rows = len(objects)
+        return objects
+
+    @staticmethod
+    def retrieve_objects(endpoint, user, password, query, keys: tuple, page_size=None):
+        """Standard SPARQL retrieval logic; with a `page_size` the query is fetched in LIMIT/OFFSET pages."""
+        try:
+            return LacesEngine._bindings(endpoint, user, password, query, keys, page_size)
         except Exception as e:
-            st.error(f"SPARQL Error: {e}")
-            return None
\ No newline at end of file
+            _report_error(f"SPARQL Error: {e}")
+            return None
+
+    @staticmethod
+    def retrieve_grouped(endpoint, user, password, template, keys: tuple, uris, placeholder="{spec_uri}",
+                         group_var="spec_uri", max_query_length=DEFAULT_MAX_QUERY_LENGTH, batch_size=DEFAULT_BATCH_SIZE,
+                         page_size=None):
+        """Runs a per-URI template query for many URIs at once and groups the rows per URI.
+
+        The `<{spec_uri}>` placeholder becomes ?spec_uri, which is projected and bound
+        through a VALUES block. Chunks stay below `max_query_length` characters and
+        are halved whenever the endpoint rejects one as too large or times out, so
+        the chunk size settles on what the endpoint accepts. Other errors (e.g.
+        authentication or connection errors) are raised. Each chunk is paged by
+        `page_size`, like retrieve_objects.
+        """
+        base = project_variable(template.replace(f"<{placeholder}>", f"?{group_var}"), group_var)
+        overhead = len(bind_values(base, group_var, []))
+        terms = list(dict.fromkeys(to_term(uri) for uri in uris))
+        grouped = {uri: [] for uri in uris}
+        i = 0
+        while i < len(terms):
+            chunk, length = [], overhead
+            for term in terms[i:i + batch_size]:
+                if chunk and length + len(term) + 1 > max_query_length: break
+                chunk.append(term)
+                length += len(term) + 1
+            try:
+                rows = LacesEngine._bindings(endpoint, user, password, bind_values(base, group_var, chunk), keys + (group_var,), page_size)
+            except Exception as e:
+                if not _query_too_large(e):
+                    raise
+                if len(chunk) > 1:
+                    batch_size = len(chunk) // 2
+                    logging.info(f"Batch of {len(chunk)} rejected ({e}); retrying with {batch_size}.")
+                    continue
+                _report_error(f"SPARQL Error: {e}")
+                i += 1
+                continue
+            for row in rows:
+                grouped.setdefault(row.pop(group_var), []).append(row)
+            i += len(chunk)
+        return grouped
+
+    @staticmethod
+    def spec_markdown(spec, subs, plans):
+        md = f"## {spec['name'].capitalize()}\n**Specification:** {spec['text']}\n\n"
+        if subs:
+            md += "| **Subject Name** | **Type** |\n|:---|:---|\n"
+            for s in subs: md += f"| {s['name']} | {s['type']} |\n"
+            md += "\n"
+        if plans:
+            md += "| **Phase** | **Method** | **Plan** |\n|:---|:---|:---|\n"
+            for p in plans: md += f"| {p['phase']} | {p['method']} | {p['plan']} |\n"
+            md += "\n"
+        return md + "---\n\n"
+
+    @staticmethod
+    def generate_report(endpoint, user, password, q_specs, q_sub_template, q_plan_template, batched=True, page_size=None):
+        """Builds the requirements report markdown, or returns None when no specifications were found or a batched query failed.
+
+        In batched mode the subjects and plans of all specifications are fetched in
+        VALUES chunks instead of two queries per specification. Every query is
+        paged by `page_size` (see pagination.fetch_paginated); without one it is
+        sent as is.
+        """
+        specs = LacesEngine.retrieve_objects(endpoint, user, password, q_specs, ("uri", "name", "text"), page_size)
+        if not specs:
+            return None
+        sub_keys, plan_keys = ("uri", "name", "type"), ("plan", "method", "phase")
+        if batched:
+            uris = [spec['uri'] for spec in specs]
+            try:
+                subs_by_spec = LacesEngine.retrieve_grouped(endpoint, user, password, q_sub_template, sub_keys, uris, page_size=page_size)
+                plans_by_spec = LacesEngine.retrieve_grouped(endpoint, user, password, q_plan_template, plan_keys, uris, page_size=page_size)
+            except Exception as e:
+                _report_error(f"SPARQL Error: {e}")
+                return None
+        md = "# Requirements Report\n\n"
+        for spec in specs:
+            if batched:
+                subs, plans = subs_by_spec.get(spec['uri']), plans_by_spec.get(spec['uri'])
+            else:
+                subs = LacesEngine.retrieve_objects(endpoint, user, password, q_sub_template.replace("{spec_uri}", spec['uri']), sub_keys, page_size)
+                plans = LacesEngine.retrieve_objects(endpoint, user, password, q_plan_template.replace("{spec_uri}", spec['uri']), plan_keys, page_size)
+            md += LacesEngine.spec_markdown(spec, subs, plans)
+        return md
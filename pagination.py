@@ -0,0 +1,68 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from perf_trace import propagate
+from sparql_rewrite import count_query, page_query, pageable
+
+DEFAULT_PAGE_SIZE = 10000  # rows per page for `page_size: true` and for listing shapes
+DEFAULT_PAGE_WORKERS = 4
+DEFAULT_PAGE_RETRIES = 3
+DEFAULT_RETRY_BACKOFF = 1.0
+
+def _with_retries(run, query, retries, backoff):
+    for attempt in range(retries + 1):
+        try:
+            return run(query)
+        except Exception as e:
+            if attempt == retries:
+                raise
+            logging.warning(f"Page request failed ({e}); retrying ({attempt + 1}/{retries}).")
+            time.sleep(backoff * 2 ** attempt)
+
+def fetch_paginated(query, run, count, page_size=None, max_workers=DEFAULT_PAGE_WORKERS,
+                    retries=DEFAULT_PAGE_RETRIES, backoff=DEFAULT_RETRY_BACKOFF, max_rows=None):
+    """Fetches the results of a SELECT query page by page and returns the pages in order.
+
+    `run(query)` returns one page (anything with a length) and `count(query)` the
+    integer result of a COUNT query. Without a `page_size` the query is sent as is.
+    The first page is fetched on its own. Unless it is empty, or shorter than a
+    page that fits under the endpoint's known result cap `max_rows`, the total is
+    counted: a first page short of the count means the endpoint capped it below
+    `page_size`. The remaining LIMIT/OFFSET pages are fetched in parallel, each
+    retried on its own. A page that comes back short of what the count promised
+    is followed up with smaller pages for the missing rows.
+    """
+    if not page_size or page_size <= 0 or not pageable(query):
+        return [run(query)]
+    if max_rows:
+        page_size = min(page_size, max_rows)
+    first = _with_retries(run, page_query(query, page_size, 0), retries, backoff)
+    if len(first) == 0 or (max_rows and len(first) < page_size):
+        return [first]
+    total = _with_retries(count, count_query(query), retries, backoff)
+    if len(first) >= total:
+        if len(first) > total:
+            logging.warning(f"Received {len(first)} rows but the endpoint counted {total}.")
+        return [first]
+    # A short first page is the endpoint's result cap; fetch the rest in pages of that size.
+    page_size = min(page_size, len(first))
+    pages = {0: first}
+    ranges = [(offset, min(page_size, total - offset)) for offset in range(len(first), total, page_size)]
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="page") as executor:
+        while ranges:
+            futures = {executor.submit(propagate(_with_retries), run, page_query(query, limit, offset), retries, backoff): (offset, limit) for offset, limit in ranges}
+            ranges = []
+            for future in as_completed(futures):
+                offset, limit = futures[future]
+                page = future.result()
+                pages[offset] = page
+                if 0 < len(page) < limit:
+                    # Endpoint capped the page: fetch the rest of this range in pages of the size it returned.
+                    rest = offset + len(page)
+                    ranges += [(o, min(len(page), offset + limit - o)) for o in range(rest, offset + limit, len(page))]
+                elif len(page) == 0:
+                    logging.warning(f"Expected {limit} rows at offset {offset} but the endpoint returned none; result may be incomplete.")
+    received = sum(len(page) for page in pages.values())
+    if received != total:
+        logging.warning(f"Received {received} rows but the endpoint counted {total}.")
+    return [pages[offset] for offset in sorted(pages)]
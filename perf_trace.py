@@ -0,0 +1,146 @@
+import contextlib
+import contextvars
+import cProfile
+import io
+import json
+import logging
+import pstats
+import sys
+import threading
+import time
+try:
+    import resource
+except ImportError:
+    resource = None
+
+_trace = contextvars.ContextVar("perf_trace", default=None)
+_stage = contextvars.ContextVar("perf_stage", default=None)
+# ru_maxrss is in bytes on macOS and in KiB elsewhere.
+_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+def _peak_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_UNIT if resource is not None else None
+
+class Stage():
+    """One timed stage. Code inside it may set `rows`; bytes are added by the SPARQL client."""
+    def __init__(self, name, detail, parent, start) -> None:
+        self.name = name
+        self.detail = detail
+        self.parent = parent
+        self.start = start
+        self.seconds = None
+        self.peak_rss_delta = None
+        self.bytes = 0
+        self.rows = None
+
+    def as_dict(self):
+        return {"stage": self.name, "detail": self.detail, "parent": self.parent.name if self.parent else None,
+                "start": round(self.start, 6), "seconds": round(self.seconds, 6), "peak_rss_delta": self.peak_rss_delta,
+                "bytes": self.bytes, "rows": self.rows}
+
+class Trace():
+    """Collects the stages of one run (a comparison, a validation, ...).
+
+    Stages are recorded while the trace is active (see activate) in the running
+    thread and in threads started through `propagate`. A trace can be activated
+    again to add later stages of the same run. With `profile` the activating
+    thread also runs under cProfile. Traces pickle (e.g. to come back from a
+    background job) with the profile reduced to its profile_text().
+    """
+    def __init__(self, name, profile=False) -> None:
+        self.name = name
+        self.stages = []
+        self.seconds = None
+        self.profile = cProfile.Profile() if profile else None
+        self._started = None
+        self._profile_text = ""
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        return dict(self.__dict__, profile=None, _profile_text=self.profile_text(), _lock=None)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state, _lock=threading.Lock())
+
+    @contextlib.contextmanager
+    def activate(self):
+        token = _trace.set(self)
+        if self._started is None:
+            self._started = time.perf_counter()
+        profiling = False
+        if self.profile is not None:
+            try:
+                self.profile.enable()
+                profiling = True
+            except ValueError as e:  # only one profiler can run at a time
+                logging.warning(f"Not profiling {self.name}: {e}")
+        try:
+            yield self
+        finally:
+            if profiling:
+                self.profile.disable()
+            self.seconds = time.perf_counter() - self._started
+            _trace.reset(token)
+
+    def _add(self, stage):
+        with self._lock:
+            self.stages.append(stage)
+
+    def _add_bytes(self, stage, size):
+        with self._lock:
+            while stage is not None:
+                stage.bytes += size
+                stage = stage.parent
+
+    def rows(self):
+        """Returns one dict per finished stage, in order of start."""
+        with self._lock:
+            return [stage.as_dict() for stage in sorted(self.stages, key=lambda stage: stage.start)]
+
+    def to_json(self) -> str:
+        return json.dumps({"name": self.name, "seconds": self.seconds, "stages": self.rows()}, indent=2)
+
+    def profile_text(self, limit=40, sort="cumulative") -> str:
+        """Returns the `limit` most expensive functions of the cProfile capture, or "" without one."""
+        if self.profile is None or not self.profile.getstats():
+            return self._profile_text
+        out = io.StringIO()
+        pstats.Stats(self.profile, stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+@contextlib.contextmanager
+def stage(name, detail=None):
+    """Times the enclosed block as a stage of the active trace; does nothing without one.
+
+    Records wall time, the growth of the peak RSS, bytes the SPARQL client
+    received and, when the block sets it, a row count.
+    """
+    trace = _trace.get()
+    if trace is None:
+        yield Stage(name, detail, None, 0.0)
+        return
+    current = Stage(name, detail, _stage.get(), time.perf_counter() - trace._started)
+    token = _stage.set(current)
+    peak = _peak_rss()
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.seconds = time.perf_counter() - start
+        if peak is not None:
+            current.peak_rss_delta = _peak_rss() - peak
+        _stage.reset(token)
+        trace._add(current)
+
+def add_bytes(size):
+    """Counts `size` received bytes towards the stages open in this thread."""
+    current = _stage.get()
+    if current is not None:
+        trace = _trace.get()
+        if trace is not None:
+            trace._add_bytes(current, size)
+
+def propagate(fn):
+    """Returns `fn` bound to the caller's trace and stage, for running in a worker thread."""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
@@ -0,0 +1,178 @@
+import gzip
+import hashlib
+import logging
+import multiprocessing
+import os
+import pickle
+import re
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+from rdflib import Dataset, Graph
+from perf_trace import stage
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+CHUNK_BYTES = 4 * 1024 ** 2
+PARALLEL_MIN_BYTES = 16 * 1024 ** 2  # below this a process pool costs more than it saves
+GZIP_MAGIC = b"\x1f\x8b"
+CACHE_FORMAT = 1
+
+# File extensions and the rdflib parser for each; N-Triples and N-Quads are parsed in parallel chunks.
+FORMATS = {"ttl": "turtle", "turtle": "turtle", "nt": "nt", "nq": "nquads"}
+LINE_FORMATS = ("nt", "nquads")
+
+def rdf_format(name, default="turtle"):
+    """Returns the rdflib format of a file name like data.nt or data.nq.gz."""
+    extension = re.sub(r"\.gz$", "", name.lower()).rsplit(".", 1)[-1]
+    return FORMATS.get(extension, default)
+
+class _LabelContext(dict):
+    # Maps every blank node label to the same id in every chunk of one document.
+    def __init__(self, salt) -> None:
+        super().__init__()
+        self.salt = salt
+
+    def get(self, label, default=None):
+        return f"{self.salt}{label}"
+
+    def __setitem__(self, label, node):
+        pass
+
+def _parse_graph(data, fmt, salt=None):
+    options = {} if salt is None else {"bnode_context": _LabelContext(salt)}
+    graph = Graph()
+    if fmt == "nquads":
+        # Named graphs are merged: the validator checks one graph.
+        dataset = Dataset()
+        dataset.parse(data=data, format=fmt, **options)
+        graph.addN((s, p, o, graph) for s, p, o, _ in dataset.quads())
+    else:
+        graph.parse(data=data, format=fmt, **options)
+    return graph
+
+def _encode(triples):
+    """Dictionary-encodes triples as a term table and an (n, 3) array of indexes into it."""
+    index = {}
+    ids = np.fromiter((index.setdefault(term, len(index)) for triple in triples for term in triple), dtype=np.int32)
+    return list(index), ids.reshape(-1, 3)
+
+def _decode(graph, terms, ids):
+    graph.addN((terms[s], terms[p], terms[o], graph) for s, p, o in ids.tolist())
+
+def _parse_chunk(data, fmt, salt):
+    return _encode(_parse_graph(data, fmt, salt))
+
+def _chunks(data, size):
+    # Splits at line ends, which for N-Triples and N-Quads are statement ends.
+    start = 0
+    while start < len(data):
+        end = data.find(b"\n", start + size)
+        end = len(data) if end < 0 else end + 1
+        yield data[start:end]
+        start = end
+
+def parse_rdf(data: bytes, fmt="turtle", workers=None) -> Graph:
+    """Parses RDF bytes (gzipped or not) into a Graph.
+
+    Large N-Triples and N-Quads documents are split into line-aligned chunks that
+    a process pool (workers None: one per core) parses in parallel; blank node
+    labels keep their identity across chunks. Workers are spawned rather than
+    forked, so they do not inherit the threads and sockets of a running server.
+    """
+    if data[:2] == GZIP_MAGIC:
+        data = gzip.decompress(data)
+    workers = workers or os.cpu_count() or 1
+    if fmt not in LINE_FORMATS or workers < 2 or len(data) < PARALLEL_MIN_BYTES:
+        return _parse_graph(data, fmt)
+    graph = Graph()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        for terms, ids in pool.map(partial(_parse_chunk, fmt=fmt, salt=uuid.uuid4().hex), _chunks(data, CHUNK_BYTES)):
+            _decode(graph, terms, ids)
+    return graph
+
+class GraphCache():
+    """Keeps parsed data graphs on disk, keyed by the hash of the uploaded bytes, evicting least recently used entries.
+
+    Entries hold the dictionary-encoded triples (see _encode) and prefixes, which
+    load several times faster than the source parses.
+    """
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.graph")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+            os.utime(path)  # the modification time doubles as the LRU clock
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Discarding unreadable graph cache entry {path}: {e}")
+            self._remove(path)
+            return None
+        if entry.get("format") != CACHE_FORMAT:
+            return None
+        graph = Graph()
+        for prefix, namespace in entry["namespaces"]:
+            graph.bind(prefix, namespace, replace=True)
+        _decode(graph, entry["terms"], entry["ids"])
+        return graph
+
+    def put(self, key, graph):
+        terms, ids = _encode(graph)
+        entry = {"format": CACHE_FORMAT, "namespaces": list(graph.namespaces()), "terms": terms, "ids": ids}
+        path = self._path(key)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except Exception as e:
+            logging.warning(f"Could not cache data graph: {e}")
+            self._remove(tmp)
+            return
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not re.fullmatch(r"[0-9a-f]{64}\.graph", name): continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes: break
+            self._remove(os.path.join(self.directory, name))
+            total -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def load_rdf(data: bytes, name="", fmt=None, cache=None, workers=None) -> Graph:
+    """Loads an uploaded RDF file (Turtle, N-Triples or N-Quads, optionally gzipped) through `cache`."""
+    with stage("load RDF", name) as current:
+        key = GraphCache.key(data) if cache is not None else None
+        graph = cache.get(key) if key is not None else None
+        if graph is None:
+            graph = parse_rdf(data, fmt or rdf_format(name), workers)
+            if key is not None:
+                cache.put(key, graph)
+        current.rows = len(graph)
+    return graph
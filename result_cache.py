@@ -0,0 +1,91 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import uuid
+import pandas as pd
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+def normalize_query(query):
+    """Drops comment lines and collapses whitespace, so formatting changes do not miss the cache."""
+    lines = [line for line in query.splitlines() if not line.lstrip().startswith("#")]
+    return " ".join(" ".join(lines).split())
+
+class ResultCache():
+    """On-disk Parquet cache of query results, evicting least recently used entries by size.
+
+    Entries are keyed by endpoint URL, normalized query text and OTL version, so only
+    results of a published (immutable) version should be stored.
+    """
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(endpoint, query, version) -> str:
+        payload = json.dumps([endpoint, normalize_query(query), version])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.parquet")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            frame = pd.read_parquet(path)
+            os.utime(path)  # the modification time doubles as the LRU clock
+        except FileNotFoundError:
+            frame = None
+        except Exception as e:
+            logging.warning(f"Discarding unreadable cache entry {path}: {e}")
+            self._remove(path)
+            frame = None
+        with self._lock:
+            if frame is None: self.misses += 1
+            else: self.hits += 1
+        return frame
+
+    def put(self, key, frame):
+        path = self._path(key)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            frame.to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+        except Exception as e:
+            logging.warning(f"Could not cache query result: {e}")
+            self._remove(tmp)
+            return
+        self.evict()
+
+    def evict(self):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if not re.fullmatch(r"[0-9a-f]{64}\.parquet", name): continue
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes: break
+                self._remove(os.path.join(self.directory, name))
+                total -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,211 @@
+from collections import deque
+from rdflib import BNode, Literal, URIRef
+from rdflib.collection import Collection
+from rdflib.namespace import OWL, RDF, RDFS, SH
+
+# Parameters whose shapes are evaluated against the same node as the shape they appear on
+# (or against the value nodes, when they appear on a property shape).
+_SHAPE_PARAMETERS = (SH.node, SH.property, SH.qualifiedValueShape, SH["not"])
+_SHAPE_LIST_PARAMETERS = (SH["and"], SH["or"], SH.xone)
+# SPARQL-based and SHACL-AF features can reach anywhere in the data graph.
+_UNBOUNDED_PARAMETERS = (SH.sparql, SH.target, SH.rule, SH.expression, SH.js)
+# The triples RDFS entailment reasons with; every cut of a data graph keeps all of them.
+SCHEMA_PREDICATES = (RDFS.subClassOf, RDFS.subPropertyOf, RDFS.domain, RDFS.range)
+
+class ShapesProfile():
+    """Summarizes what a shapes graph needs from a data graph.
+
+    Collects every target declaration and the longest chain of property paths
+    (through nested shapes) a focus node's validation can follow. `depth` is None
+    when that reach cannot be bounded (recursive shapes, `*`/`+` paths, SPARQL
+    constraints or SHACL-AF features); `unbounded` then says why.
+    """
+    def __init__(self, shacl_graph) -> None:
+        self.graph = shacl_graph
+        self.target_classes = set(shacl_graph.objects(None, SH.targetClass))
+        self.target_nodes = set(shacl_graph.objects(None, SH.targetNode))
+        self.target_subjects_of = set(shacl_graph.objects(None, SH.targetSubjectsOf))
+        self.target_objects_of = set(shacl_graph.objects(None, SH.targetObjectsOf))
+        self.inverse_predicates = set()
+        self.unbounded = None
+        self.shapes = self._targeted_shapes()
+        # Implicit class targets: a shape that is also a class targets its instances.
+        self.target_classes.update(s for s in self.shapes if self._is_class(s))
+        self.depth = self._depth()
+
+    def _is_class(self, node):
+        return (node, RDF.type, RDFS.Class) in self.graph or (node, RDF.type, OWL.Class) in self.graph
+
+    def _targeted_shapes(self):
+        g = self.graph
+        shapes = set()
+        for predicate in (SH.targetClass, SH.targetNode, SH.targetSubjectsOf, SH.targetObjectsOf):
+            shapes.update(g.subjects(predicate, None))
+        for shape_type in (SH.NodeShape, SH.PropertyShape):
+            shapes.update(s for s in g.subjects(RDF.type, shape_type) if self._is_class(s))
+        return shapes
+
+    def _depth(self):
+        g = self.graph
+        if any(True for _ in g.subjects(RDF.type, SH.ConstraintComponent)):
+            self.unbounded = "the shapes graph declares custom constraint components"
+            return None
+        for parameter in _UNBOUNDED_PARAMETERS:
+            if any(True for _ in g.subject_objects(parameter)):
+                self.unbounded = f"the shapes graph uses {g.qname(parameter)}"
+                return None
+        depth = 0
+        for shape in self.shapes:
+            shape_depth = self._shape_depth(shape, set())
+            if shape_depth is None:
+                return None
+            depth = max(depth, shape_depth)
+        # One more hop for the rdf:type (sh:class) and outgoing triples (sh:closed) of the last value nodes.
+        return depth + 1
+
+    def _nested_shapes(self, shape):
+        g = self.graph
+        for parameter in _SHAPE_PARAMETERS:
+            yield from g.objects(shape, parameter)
+        for parameter in _SHAPE_LIST_PARAMETERS:
+            for members in g.objects(shape, parameter):
+                yield from Collection(g, members)
+
+    def _shape_depth(self, shape, visiting):
+        if shape in visiting:
+            self.unbounded = f"shape {shape} is recursive"
+            return None
+        path = self.graph.value(shape, SH.path)
+        own = 0 if path is None else self._path_length(path, inverse=False)
+        if own is None:
+            return None
+        nested = 0
+        for member in self._nested_shapes(shape):
+            member_depth = self._shape_depth(member, visiting | {shape})
+            if member_depth is None:
+                return None
+            nested = max(nested, member_depth)
+        return own + nested
+
+    def _path_length(self, path, inverse):
+        g = self.graph
+        if isinstance(path, URIRef):
+            if inverse: self.inverse_predicates.add(path)
+            return 1
+        if (path, RDF.first, None) in g:
+            lengths = [self._path_length(step, inverse) for step in Collection(g, path)]
+            return None if None in lengths else sum(lengths)
+        alternatives = g.value(path, SH.alternativePath)
+        if alternatives is not None:
+            lengths = [self._path_length(step, inverse) for step in Collection(g, alternatives)]
+            return None if None in lengths else max(lengths, default=0)
+        inner = g.value(path, SH.inversePath)
+        if inner is not None:
+            return self._path_length(inner, not inverse)
+        inner = g.value(path, SH.zeroOrOnePath)
+        if inner is not None:
+            return self._path_length(inner, inverse)
+        self.unbounded = "the shapes graph uses sh:zeroOrMorePath or sh:oneOrMorePath"
+        return None
+
+class GraphCut():
+    """Cuts a data graph into the parts needed to validate given nodes against a ShapesProfile.
+
+    The closure of the candidates is all a validation reads; whatever lies outside
+    every shape's reach (geometry, provenance) can be left out.
+
+    A closure keeps the data graph's RDFS schema, so pySHACL's own RDFS
+    pre-inference on the closure entails every rdf:type and super-property triple
+    the validated nodes have in the whole graph.
+    """
+    def __init__(self, profile, data_graph) -> None:
+        if profile.depth is None:
+            raise ValueError(f"Cannot cut a data graph for these shapes: {profile.unbounded}.")
+        self.profile = profile
+        self.graph = data_graph
+        self.schema = {t for p in SCHEMA_PREDICATES for t in data_graph.triples((None, p, None))}
+        self._inverse = self.sub_properties(profile.inverse_predicates)
+        # Incoming triples that can entail a node's types, its inverse path values or an sh:targetObjectsOf target.
+        self.incoming = self._inverse | self.sub_properties(set(data_graph.subjects(RDFS.range, None)) | profile.target_objects_of)
+
+    def sub_properties(self, predicates) -> set:
+        return {sub for p in set(predicates) for sub in self.graph.transitive_subjects(RDFS.subPropertyOf, p)}
+
+    def candidates(self) -> list:
+        """Returns every node RDFS entailment could turn into a focus node, IRIs first, in sorted order.
+
+        These are the target nodes, the (entailed) instances of target classes and
+        the subjects or objects of the target predicates, sub-properties included.
+        """
+        g, profile = self.graph, self.profile
+        classes = {c for target in profile.target_classes for c in g.transitive_subjects(RDFS.subClassOf, target)}
+        if any(str(c).startswith((str(RDF), str(RDFS))) for c in classes):
+            # RDFS entails rdfs:Resource, rdf:Property and the like for nearly every node.
+            nodes = set(g.subjects(unique=True))
+            for predicate in self.incoming:
+                nodes.update(g.objects(None, predicate))
+        else:
+            nodes = set()
+            for predicate in self.sub_properties({RDF.type}):
+                nodes.update(s for c in classes for s in g.subjects(predicate, c))
+            domain = {p for c in classes for p in g.subjects(RDFS.domain, c)}
+            for predicate in self.sub_properties(domain | profile.target_subjects_of):
+                nodes.update(g.subjects(predicate, None, unique=True))
+            range_ = {p for c in classes for p in g.subjects(RDFS.range, c)}
+            for predicate in self.sub_properties(range_ | profile.target_objects_of):
+                nodes.update(g.objects(None, predicate, unique=True))
+        nodes |= profile.target_nodes
+        return sorted(nodes, key=lambda n: (not isinstance(n, URIRef), type(n).__name__, str(n)))
+
+    def closure(self, nodes) -> set:
+        """Returns the triples validating `nodes` can touch.
+
+        Walks outgoing triples `depth` hops from every node (blank nodes are always
+        expanded completely) and adds the incoming triples of every visited node that
+        can entail its types or feed an inverse path.
+        """
+        g, depth = self.graph, self.profile.depth
+        triples = set(self.schema)
+        seen = {}
+        queue = deque((node, 0) for node in nodes)
+        while queue:
+            node, hops = queue.popleft()
+            remaining = depth - hops
+            if node in seen and seen[node] >= remaining: continue
+            if node not in seen:
+                for predicate in self.incoming:
+                    for triple in g.triples((None, predicate, node)):
+                        triples.add(triple)
+                        if predicate in self._inverse: queue.append((triple[0], hops + 1))
+            seen[node] = remaining
+            if isinstance(node, Literal) or (remaining <= 0 and not isinstance(node, BNode)): continue
+            for triple in g.triples((node, None, None)):
+                triples.add(triple)
+                queue.append((triple[2], hops + 1))
+        return triples
+
+    def reaching(self, triples) -> set:
+        """Returns every node whose closure can contain one of `triples`, i.e. whose validation they can affect.
+
+        Walks the closure's edges backwards: a triple is read from a node at most
+        depth - 1 hops out (any distance for blank nodes), or as an incoming triple of
+        a node at most depth hops out.
+        """
+        g, depth = self.graph, self.profile.depth
+        queue = deque()
+        for s, p, o in triples:
+            queue.append((s, depth - 1))
+            if p in self.incoming: queue.append((o, depth))
+        seen = {}
+        while queue:
+            node, budget = queue.popleft()
+            if budget < 0 or (node in seen and seen[node] >= budget): continue
+            seen[node] = budget
+            # Blank nodes are expanded however far out they are, so any node reaching one within depth - 1 hops reads it.
+            step = depth - 1 if isinstance(node, BNode) else budget - 1
+            for subject in g.subjects(None, node, unique=True):
+                queue.append((subject, step))
+            for predicate in self._inverse:
+                for obj in g.objects(node, predicate):
+                    queue.append((obj, step))
+        return set(seen)
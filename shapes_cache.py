@@ -0,0 +1,124 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from validator import PreparedShapes
+
+DEFAULT_MAX_BYTES = 1024 ** 3
+DEFAULT_MEMORY_ENTRIES = 2
+
+class ShapesCache():
+    """Keeps PreparedShapes in memory and pickled on disk, evicting least recently used entries.
+
+    Entries are keyed by the content hash of an uploaded shapes file, or by an
+    endpoint URL plus the OTL version it publishes.
+    """
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, memory_entries=DEFAULT_MEMORY_ENTRIES) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def content_key(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def version_key(endpoint, version) -> str:
+        return hashlib.sha256(json.dumps([endpoint, version]).encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pickle")
+
+    def _remember(self, key, shapes):
+        with self._lock:
+            self._memory[key] = shapes
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            shapes = self._memory.get(key)
+            if shapes is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return shapes
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                shapes = pickle.load(f)
+            os.utime(path)  # the modification time doubles as the LRU clock
+        except FileNotFoundError:
+            shapes = None
+        except Exception as e:
+            logging.warning(f"Discarding unreadable shapes cache entry {path}: {e}")
+            self._remove(path)
+            shapes = None
+        with self._lock:
+            if shapes is None: self.misses += 1
+            else: self.hits += 1
+        if shapes is not None:
+            self._remember(key, shapes)
+        return shapes
+
+    def put(self, key, shapes):
+        self._remember(key, shapes)
+        path = self._path(key)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                pickle.dump(shapes, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except Exception as e:
+            logging.warning(f"Could not cache shapes graph: {e}")
+            self._remove(tmp)
+            return
+        self.evict()
+
+    def prepare(self, key, load):
+        """Returns the cached PreparedShapes for `key`, or loads, prepares and caches the graph from `load()`.
+
+        With key None (the source has no stable identity) nothing is cached.
+        """
+        shapes = self.get(key) if key is not None else None
+        if shapes is None:
+            shapes = PreparedShapes(load())
+            if key is not None:
+                self.put(key, shapes)
+        return shapes
+
+    def evict(self):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if not re.fullmatch(r"[0-9a-f]{64}\.pickle", name): continue
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes: break
+                self._remove(os.path.join(self.directory, name))
+                total -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,161 @@
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from rdflib import BNode, Graph, URIRef
+from rdflib.namespace import OWL, RDF, RDFS, SH
+from pagination import DEFAULT_PAGE_SIZE, DEFAULT_PAGE_WORKERS, fetch_paginated
+from sparql_client import ChunkReader, get_client
+from sparql_rewrite import values_batches, values_chunks
+
+DEFAULT_SHAPES_BATCH_SIZE = 200
+DEFAULT_MAX_QUERY_LENGTH = 16000
+GRAPH_ACCEPT = "application/n-triples, text/plain;q=0.9, text/turtle;q=0.5"
+# Response types parsed in one piece, for endpoints that ignore the N-Triples preference.
+_GRAPH_FORMATS = {"text/turtle": "turtle", "application/x-turtle": "turtle", "application/rdf+xml": "xml",
+                  "application/ld+json": "json-ld", "text/n3": "n3"}
+
+VERSION_QUERY = """PREFIX owl: <http://www.w3.org/2002/07/owl#>
+SELECT ?version WHERE {
+    ?ontology a owl:Ontology .
+    OPTIONAL { ?ontology owl:versionIRI ?versionIRI }
+    OPTIONAL { ?ontology owl:versionInfo ?versionInfo }
+    BIND(COALESCE(?versionIRI, ?versionInfo) AS ?version)
+    FILTER(BOUND(?version))
+}
+ORDER BY ?version"""
+
+# Parameters whose values can be blank nodes that belong to the shape (nested shapes, paths, lists, SPARQL).
+_NESTING_PREDICATES = (
+    SH.property, SH.node, SH["and"], SH["or"], SH.xone, SH["not"], SH.qualifiedValueShape,
+    SH.path, SH.inversePath, SH.alternativePath, SH.zeroOrMorePath, SH.oneOrMorePath, SH.zeroOrOnePath,
+    SH["in"], SH.languageIn, SH.ignoredProperties, SH.sparql, SH.target, SH.rule, SH.parameter,
+    SH.declare, SH.prefixes, SH.validator, SH.nodeValidator, SH.propertyValidator, SH.expression,
+    RDF.first, RDF.rest,
+)
+# Any subject of one of these is a shape (or something a shape points to, like a prefix declaration).
+_SHAPE_PREDICATES = _NESTING_PREDICATES + (
+    SH.targetClass, SH.targetNode, SH.targetSubjectsOf, SH.targetObjectsOf, SH.deactivated, SH.severity,
+    SH.message, SH["class"], SH.datatype, SH.nodeKind, SH.minCount, SH.maxCount, SH.minLength, SH.maxLength,
+    SH.pattern, SH.hasValue, SH.closed, SH.equals, SH.disjoint, SH.lessThan, SH.lessThanOrEquals,
+    SH.uniqueLang, SH.minInclusive, SH.maxInclusive, SH.minExclusive, SH.maxExclusive, SH.qualifiedMinCount,
+    SH.qualifiedMaxCount,
+)
+
+_PROLOGUE = f"PREFIX sh: <{SH}>\nPREFIX rdf: <{RDF}>\nPREFIX rdfs: <{RDFS}>\n"
+# Alternative paths rather than VALUES ?p: engines look each predicate up in their index.
+_SHAPE_PATH = "|".join(p.n3() for p in _SHAPE_PREDICATES)
+_NESTING_PATH = "|".join(p.n3() for p in _NESTING_PREDICATES)
+
+SHAPE_ROOTS_QUERY = f"""{_PROLOGUE}SELECT DISTINCT ?shape WHERE {{
+    {{ ?shape {_SHAPE_PATH} ?o }}
+    UNION {{ ?shape a sh:NodeShape }} UNION {{ ?shape a sh:PropertyShape }} UNION {{ ?shape a sh:ConstraintComponent }}
+    FILTER(isIRI(?shape))
+}}"""
+
+SHAPES_QUERY = f"""{_PROLOGUE}CONSTRUCT {{ ?s ?p ?o }} WHERE {{
+    ?shape ({_NESTING_PATH})* ?s .
+    ?s ?p ?o
+}}"""
+
+# Shapes that are blank nodes cannot be named in a VALUES block; without a target they do nothing on their own.
+BLANK_SHAPES_QUERY = f"""{_PROLOGUE}CONSTRUCT {{ ?s ?p ?o }} WHERE {{
+    ?shape sh:targetClass|sh:targetNode|sh:targetSubjectsOf|sh:targetObjectsOf|sh:target ?target .
+    FILTER(isBlank(?shape))
+    ?shape ({_NESTING_PATH})* ?s .
+    ?s ?p ?o
+}}"""
+
+HIERARCHY_QUERY = f"""{_PROLOGUE}PREFIX owl: <{OWL}>
+CONSTRUCT {{ ?sub rdfs:subClassOf ?super . ?sub a ?type }} WHERE {{
+    {{ ?sub rdfs:subClassOf* ?class }} UNION {{ ?class rdfs:subClassOf* ?sub }}
+    OPTIONAL {{ ?sub rdfs:subClassOf ?super }}
+    OPTIONAL {{ ?sub a ?type FILTER(?type IN (rdfs:Class, owl:Class)) }}
+}}"""
+
+def ontology_version(endpoint):
+    """Returns the owl:versionIRI (or owl:versionInfo) the endpoint publishes, or None."""
+    response = get_client().query(endpoint, VERSION_QUERY, accept="application/sparql-results+json")
+    response.raise_for_status()
+    bindings = response.json()["results"]["bindings"]
+    # A store can hold several ontologies; all of their versions identify its content.
+    return " ".join(b["version"]["value"] for b in bindings if "version" in b) or None
+
+def construct(endpoint, query, graph=None):
+    """Runs a CONSTRUCT query and parses the response into `graph` (a new Graph by default).
+
+    N-Triples is requested and parsed as it streams in; an endpoint that only
+    serializes Turtle is parsed from the complete response.
+    """
+    graph = Graph() if graph is None else graph
+    client = get_client()
+    response = client.query(endpoint, query, accept=GRAPH_ACCEPT, stream=True)
+    with response:
+        response.raise_for_status()
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+        if content_type in ("application/n-triples", "text/plain"):
+            graph.parse(io.BufferedReader(ChunkReader(client.iter_content(response)), buffer_size=1 << 20), format="nt")
+        else:
+            data = b"".join(client.iter_content(response))
+            graph.parse(data=data, format=_GRAPH_FORMATS.get(content_type, "turtle"))
+    return graph
+
+def _shape_roots(endpoint, page_size):
+    def select(query):
+        response = get_client().query(endpoint, query, accept="application/sparql-results+json")
+        response.raise_for_status()
+        return response.json()["results"]["bindings"]
+    def count(query):
+        return int(select(query)[0]["_count"]["value"])
+    pages = fetch_paginated(SHAPE_ROOTS_QUERY, select, count, page_size)
+    return [URIRef(b["shape"]["value"]) for bindings in pages for b in bindings]
+
+def _owned(batch, roots):
+    """Returns the triples of `roots` and of the blank nodes below them.
+
+    A batch also holds the descriptions of shapes it points to (via sh:node and the
+    like); those come with their own batch, and keeping both would duplicate their
+    blank nodes. Blank nodes nothing in the batch refers to are roots too.
+    """
+    roots = set(roots) | {s for s in batch.subjects(unique=True) if isinstance(s, BNode) and (None, None, s) not in batch}
+    triples, queue, seen = [], list(roots), set(roots)
+    while queue:
+        for triple in batch.triples((queue.pop(), None, None)):
+            triples.append(triple)
+            if isinstance(triple[2], BNode) and triple[2] not in seen:
+                seen.add(triple[2])
+                queue.append(triple[2])
+    return triples
+
+def fetch_shapes(endpoint, batch_size=DEFAULT_SHAPES_BATCH_SIZE, max_query_length=DEFAULT_MAX_QUERY_LENGTH,
+                 page_size=DEFAULT_PAGE_SIZE, max_workers=DEFAULT_PAGE_WORKERS):
+    """Downloads the SHACL shapes of a SPARQL endpoint, and the class hierarchy they reference.
+
+    Instead of the whole store, only shapes are fetched: their IRIs are listed
+    first, then each batch of shapes is fetched with the blank nodes nested below
+    them (property shapes, paths, lists). Targeted blank node shapes come with a
+    separate query. Finally the classes above and below every targeted or
+    referenced class are added, with their rdfs:subClassOf and class typing.
+    """
+    roots = _shape_roots(endpoint, page_size)
+    graph = Graph()
+
+    def fetch(query, terms):
+        return _owned(construct(endpoint, query), (URIRef(term[1:-1]) for term in terms))
+
+    terms = [root.n3() for root in roots]
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shapes") as executor:
+        futures = [executor.submit(fetch, BLANK_SHAPES_QUERY, ())]
+        futures += [executor.submit(fetch, query, chunk) for chunk, query in values_chunks(SHAPES_QUERY, "shape", terms, max_query_length, batch_size)]
+        for future in futures:
+            graph.addN(triple + (graph,) for triple in future.result())
+
+        # Shapes that are classes target their own instances (and subclasses).
+        shapes = set(roots)
+        classes = set(graph.objects(None, SH.targetClass)) | set(graph.objects(None, SH["class"]))
+        classes.update(s for t in (RDFS.Class, OWL.Class) for s in graph.subjects(RDF.type, t) if s in shapes)
+        class_terms = sorted(c.n3() for c in classes if isinstance(c, URIRef))
+        futures = [executor.submit(construct, endpoint, batch) for batch in values_batches(HIERARCHY_QUERY, "class", class_terms, max_query_length, batch_size)]
+        for future in futures:
+            graph += future.result()
+    logging.info(f"Fetched {len(roots)} shapes ({len(graph)} triples) from {endpoint}.")
+    return graph
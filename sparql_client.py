@@ -0,0 +1,197 @@
+import io
+import threading
+import time
+import weakref
+import requests
+import perf_trace
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
+from urllib3.util.retry import Retry
+
+DEFAULT_TIMEOUT = (10, 300)  # (connect, read) seconds
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_POOL_SIZE = 16
+DEFAULT_MAX_CONCURRENCY = 16
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+ACCEPT_ENCODING = "gzip, deflate"
+
+class SparqlClient():
+    """HTTP client shared by every SPARQL call in the app.
+
+    Keeps one pooled keep-alive session per endpoint host, negotiates gzip/deflate
+    responses, retries 429/5xx answers with exponential backoff (honouring
+    Retry-After) and caps the number of requests in flight. A streamed response
+    holds its slot until its body has been read or it is closed. Counters for
+    requests, bytes and latency are available through `stats()`.
+    """
+    def __init__(self, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, backoff_factor=DEFAULT_BACKOFF,
+                 pool_size=DEFAULT_POOL_SIZE, max_concurrency=DEFAULT_MAX_CONCURRENCY) -> None:
+        self.timeout = timeout
+        self.pool_size = pool_size
+        # SPARQL queries are read-only, so POSTs are as safe to retry as GETs.
+        self._retry = Retry(total=retries, backoff_factor=backoff_factor, status_forcelist=RETRY_STATUSES,
+                            allowed_methods=None, respect_retry_after_header=True, raise_on_status=False)
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._counters = {"requests": 0, "failures": 0, "bytes": 0, "latency_total": 0.0, "latency_max": 0.0}
+
+    def session(self, url) -> requests.Session:
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=self._retry)
+                session.mount(f"{parts.scheme}://", adapter)
+                session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+                self._sessions[key] = session
+        return session
+
+    def send(self, prepared, stream=False, timeout=None) -> requests.Response:
+        """Sends an already prepared request through the pooled session of its host."""
+        prepared.headers.setdefault("Accept-Encoding", ACCEPT_ENCODING)
+        session = self.session(prepared.url)
+        return self._timed(lambda: session.send(prepared, stream=stream, timeout=timeout or self.timeout), stream)
+
+    def request(self, method, url, stream=False, timeout=None, **kwargs) -> requests.Response:
+        session = self.session(url)
+        return self._timed(lambda: session.request(method, url, stream=stream, timeout=timeout or self.timeout, **kwargs), stream)
+
+    def get(self, url, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def query(self, url, query, accept, auth=None, params=None, stream=False, timeout=None) -> requests.Response:
+        """Runs a query with a form-encoded POST, as described by the SPARQL 1.1 protocol."""
+        return self.post(url, data={"query": query}, params=params, auth=auth, headers={"Accept": accept}, stream=stream, timeout=timeout)
+
+    def iter_content(self, response, chunk_size=1 << 16):
+        """Returns an iterator over the decoded body of a streamed response that counts its bytes.
+
+        The bytes count towards the caller's trace stage, also when a parser
+        consumes the iterator on another thread.
+        """
+        add_bytes = perf_trace.propagate(self._add_bytes)
+        def chunks():
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                add_bytes(len(chunk))
+                yield chunk
+        return chunks()
+
+    def _timed(self, send, stream):
+        start = time.perf_counter()
+        self._slots.acquire()
+        try:
+            response = send()
+            # A streamed body is counted as it is consumed through iter_content.
+            size = 0 if stream else len(response.content)
+        except BaseException:
+            self._slots.release()
+            self._record(time.perf_counter() - start, 0, failed=True)
+            raise
+        if stream:
+            self._hold_slot(response)
+        else:
+            self._slots.release()
+        self._record(time.perf_counter() - start, size, failed=not response.ok)
+        return response
+
+    def _hold_slot(self, response):
+        # Releases the slot once the body has been read (content, text and iter_content
+        # all read through iter_content) or the response is closed, whichever comes first.
+        # A response that is dropped unread releases it when it is garbage collected.
+        released = threading.Lock()
+        def release():
+            if released.acquire(blocking=False):
+                self._slots.release()
+        iter_content, close = response.iter_content, response.close
+        def held_iter_content(*args, **kwargs):
+            try:
+                yield from iter_content(*args, **kwargs)
+            finally:
+                release()
+        def held_close():
+            try:
+                close()
+            finally:
+                release()
+        response.iter_content, response.close = held_iter_content, held_close
+        weakref.finalize(response, release)
+
+    def _add_bytes(self, size):
+        with self._lock:
+            self._counters["bytes"] += size
+        perf_trace.add_bytes(size)
+
+    def _record(self, latency, size, failed=False):
+        with self._lock:
+            counters = self._counters
+            counters["requests"] += 1
+            counters["failures"] += int(failed)
+            counters["bytes"] += size
+            counters["latency_total"] += latency
+            counters["latency_max"] = max(counters["latency_max"], latency)
+        if size:
+            perf_trace.add_bytes(size)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        counters["latency_avg"] = counters["latency_total"] / counters["requests"] if counters["requests"] else 0.0
+        return counters
+
+    def reset_stats(self):
+        with self._lock:
+            for key in self._counters:
+                self._counters[key] = 0 if isinstance(self._counters[key], int) else 0.0
+
+    def close(self):
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            session.close()
+
+class ChunkReader(io.RawIOBase):
+    """Read-only file object over an iterator of byte chunks."""
+    def __init__(self, chunks) -> None:
+        self._chunks = iter(chunks)
+        self._buffer = memoryview(b"")
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer:
+            try:
+                self._buffer = memoryview(next(self._chunks))
+            except StopIteration:
+                return 0
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+_default_client = None
+_default_lock = threading.Lock()
+
+def get_client() -> SparqlClient:
+    """Returns the process-wide client, creating it on first use."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = SparqlClient()
+        return _default_client
+
+def configure(**kwargs) -> SparqlClient:
+    """Replaces the process-wide client, e.g. to change timeouts or the concurrency cap."""
+    global _default_client
+    with _default_lock:
+        previous, _default_client = _default_client, SparqlClient(**kwargs)
+    if previous is not None:
+        previous.close()
+    return _default_client
@@ -0,0 +1,175 @@
+import re
+
+_PROLOGUE = re.compile(r"^\s*(?:(?:PREFIX\s+[\w.-]*:\s*<[^>]*>|BASE\s+<[^>]*>)\s*|#[^\n]*\n\s*)*", re.IGNORECASE)
+_SELECT = re.compile(r"\bSELECT\s+(?:(DISTINCT|REDUCED)\s+)?", re.IGNORECASE)
+_WHERE = re.compile(r"\bWHERE\s*\{", re.IGNORECASE)
+_FROM = re.compile(r"\bFROM\b", re.IGNORECASE)
+_ABSOLUTE_IRI = re.compile(r"^[A-Za-z][A-Za-z0-9+.-]*:[^\s<>\"{}|\\^`]*$")
+XSD_STRING = "http://www.w3.org/2001/XMLSchema#string"
+
+def split_prologue(query):
+    """Splits a query into its PREFIX/BASE prologue and the remaining query text."""
+    match = _PROLOGUE.match(query)
+    return query[:match.end()], query[match.end():]
+
+def to_term(value):
+    """Renders a result value as a SPARQL term: absolute IRIs as <...>, anything else as a plain literal."""
+    value = str(value)
+    if _ABSOLUTE_IRI.match(value):
+        return f"<{value}>"
+    return _literal(value)
+
+def _literal(value):
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\r", "\\r")
+    return f'"{escaped}"'
+
+def term_expression(var):
+    """Returns a SPARQL expression that describes the term bound to ?var as text: its kind and its lexical form.
+
+    The kind is "<>" for IRIs, "@lang" for language-tagged and "^^<datatype>" for
+    other literals, e.g. `@nl naam` or `^^<...#integer> 5`. The text never reads
+    back from CSV as a number, so term_from_text can rebuild the exact term.
+    Blank nodes and unbound variables give no value.
+    """
+    return (f'CONCAT(IF(isIRI(?{var}), "<>", IF(LANG(?{var}) != "", CONCAT("@", LANG(?{var})), '
+            f'CONCAT("^^<", STR(DATATYPE(?{var})), ">"))), " ", STR(?{var}))')
+
+def term_from_text(text):
+    """Renders a term_expression value as a SPARQL term, or returns None when it cannot be expressed."""
+    if not isinstance(text, str) or " " not in text:
+        return None
+    kind, value = text.split(" ", 1)
+    if kind == "<>":
+        return f"<{value}>" if _ABSOLUTE_IRI.match(value) else None
+    if kind.startswith("@"):
+        return _literal(value) + kind
+    if kind == f"^^<{XSD_STRING}>":
+        return _literal(value)
+    if kind.startswith("^^<") and kind.endswith(">"):
+        return _literal(value) + kind
+    return None
+
+def project_variable(query, var):
+    """Adds ?var to the SELECT projection, unless it is already projected or the query uses SELECT *."""
+    match = _SELECT.search(query)
+    if not match:
+        raise ValueError("Query has no SELECT clause.")
+    where = _WHERE.search(query, match.end())
+    if not where:
+        raise ValueError("Query has no WHERE clause.")
+    projection = query[match.end():where.start()]
+    if projection.strip().startswith("*") or re.search(rf"\?{re.escape(var)}\b", projection):
+        return query
+    return f"{query[:match.end()]}?{var} {query[match.end():]}"
+
+def bind_values(query, variables, rows):
+    """Injects a VALUES block at the start of the outer WHERE clause.
+
+    `variables` is a single variable name or a sequence of names; `rows` holds one
+    rendered term (or tuple of terms) per binding.
+    """
+    match = _WHERE.search(query)
+    if not match:
+        raise ValueError("Query has no WHERE clause.")
+    if isinstance(variables, str):
+        block = f"VALUES ?{variables} {{ {' '.join(rows)} }}"
+    else:
+        heads = " ".join(f"?{v}" for v in variables)
+        block = f"VALUES ({heads}) {{ {' '.join('(' + ' '.join(row) + ')' for row in rows)} }}"
+    return f"{query[:match.end()]}\n    {block}\n{query[match.end():]}"
+
+def projected_variables(query):
+    """Returns the variable names a SELECT query projects, or None for SELECT *."""
+    match = _SELECT.search(query)
+    where = _WHERE.search(query, match.end()) if match else None
+    if not where:
+        raise ValueError("Query has no SELECT ... WHERE clause.")
+    projection = _FROM.split(query[match.end():where.start()])[0]
+    if projection.strip().startswith("*"):
+        return None
+    names, depth = [], 0
+    for token in re.finditer(r"[()]|\bAS\s+[?$](\w+)|[?$](\w+)", projection, re.IGNORECASE):
+        if token.group(0) == "(":
+            depth += 1
+        elif token.group(0) == ")":
+            depth -= 1
+        elif token.group(1):
+            names.append(token.group(1))
+        elif depth == 0:
+            names.append(token.group(2))
+    return names
+
+def fingerprint_query(query, key_vars, value_vars, fingerprint_var="_fingerprint", term_suffix="_term"):
+    """Wraps a SELECT so it only returns the key variables plus a SHA1 over the value variables.
+
+    Unbound values hash as "[NULL]" and values are joined with a unit separator, so
+    "a" + "bc" and "ab" + "c" do not collide. Every key variable also comes back
+    as a term_expression in ?<key><term_suffix>, so keys can be bound again exactly.
+    """
+    prologue, body = split_prologue(query)
+    parts = ', "\\u001F", '.join(f'COALESCE(STR(?{v}), "[NULL]")' for v in value_vars) or '""'
+    keys = " ".join(f"?{v}" for v in key_vars)
+    terms = " ".join(f"({term_expression(v)} AS ?{v}{term_suffix})" for v in key_vars)
+    return f"{prologue}SELECT {keys} {terms} (SHA1(CONCAT({parts})) AS ?{fingerprint_var})\nWHERE {{\n{{\n{body}\n}}\n}}"
+
+def values_batches(query, variables, rows, max_query_length, batch_size):
+    """Yields copies of `query` that bind `variables` to consecutive chunks of `rows`.
+
+    A chunk holds at most `batch_size` rows and keeps the query below
+    `max_query_length` characters (a single row is always sent).
+    """
+    for _, batch in values_chunks(query, variables, rows, max_query_length, batch_size):
+        yield batch
+
+def values_chunks(query, variables, rows, max_query_length, batch_size):
+    """Like values_batches, but yields (chunk of rows, query) pairs."""
+    overhead = len(bind_values(query, variables, []))
+    chunk, length = [], overhead
+    for row in rows:
+        size = len(row) + 1 if isinstance(variables, str) else sum(len(t) + 1 for t in row) + 2
+        if chunk and (len(chunk) >= batch_size or length + size > max_query_length):
+            yield chunk, bind_values(query, variables, chunk)
+            chunk, length = [], overhead
+        chunk.append(row)
+        length += size
+    if chunk:
+        yield chunk, bind_values(query, variables, chunk)
+
+def _modifiers(query):
+    # Solution modifiers after the closing brace of the outer WHERE group.
+    return query[query.rfind("}") + 1:]
+
+def top_level_order(query):
+    """Returns the ORDER BY expression of the outer query, or None."""
+    match = re.search(r"\bORDER\s+BY\s+(.+?)\s*(?:\bLIMIT\b|\bOFFSET\b|$)", _modifiers(query), re.IGNORECASE | re.DOTALL)
+    return match.group(1).strip() if match else None
+
+def pageable(query):
+    """True for SELECT queries with explicit variables and no LIMIT/OFFSET of their own."""
+    try:
+        variables = projected_variables(query)
+    except ValueError:
+        return False
+    return bool(variables) and not re.search(r"\b(?:LIMIT|OFFSET)\b", _modifiers(query), re.IGNORECASE)
+
+def page_query(query, limit, offset):
+    """Wraps a SELECT in an outer query that returns one page of its results.
+
+    Pages are ordered by the query's own ORDER BY followed by every projected
+    variable, so consecutive pages neither overlap nor skip rows. An ORDER BY
+    that uses variables the query does not project cannot be repeated outside
+    it, so the pages are then ordered by the projected variables only.
+    """
+    prologue, body = split_prologue(query)
+    variables = projected_variables(query)
+    projection = " ".join(f"?{v}" for v in variables)
+    inner = top_level_order(query)
+    if inner and not set(re.findall(r"[?$](\w+)", inner)) <= set(variables):
+        inner = None
+    order = " ".join(filter(None, [inner, projection]))
+    return f"{prologue}SELECT {projection}\nWHERE {{\n{{\n{body}\n}}\n}}\nORDER BY {order}\nLIMIT {limit} OFFSET {offset}"
+
+def count_query(query, count_var="_count"):
+    """Wraps a SELECT in an outer query that counts its results."""
+    prologue, body = split_prologue(query)
+    return f"{prologue}SELECT (COUNT(*) AS ?{count_var})\nWHERE {{\n{{\n{body}\n}}\n}}"
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+MAX_LEVEL = 24  # a level is a web map zoom level: 2**level tiles across the world
+MAX_LATITUDE = 85.05112878
+DEFAULT_MAX_POINTS = 20000
+DEFAULT_MAX_CLUSTERS = 2000
+
+def _spread(values):
+    # Interleaves zero bits between the low 24 bits of every value.
+    values = values.astype(np.uint64) & np.uint64(0xFFFFFF)
+    for shift, mask in ((16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF), (4, 0x0F0F0F0F0F0F0F0F),
+                        (2, 0x3333333333333333), (1, 0x5555555555555555)):
+        values = (values | (values << np.uint64(shift))) & np.uint64(mask)
+    return values
+
+def tile_codes(lon, lat) -> np.ndarray:
+    """Returns the Z-order (quadkey) code of the MAX_LEVEL web mercator tile of every coordinate.
+
+    The tiles of a coarser level are the codes shifted right by two bits per level,
+    so every tile is a contiguous range of codes.
+    """
+    size = 2 ** MAX_LEVEL
+    lat = np.radians(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE))
+    x = np.clip(((np.asarray(lon) + 180) / 360 * size).astype(np.int64), 0, size - 1)
+    y = np.clip(((1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / np.pi) / 2 * size).astype(np.int64), 0, size - 1)
+    return _spread(x) | (_spread(y) << np.uint64(1))
+
+def _code_range(level, code):
+    shift = np.uint64(2 * (MAX_LEVEL - level))
+    start = np.uint64(code) << shift
+    return start, start + (np.uint64(1) << shift)
+
+class SpatialIndex():
+    """A quadtree over a non-empty frame with `lon`/`lat` columns and a boolean violation column.
+
+    The rows are sorted by tile code, so the rows in a tile are a slice. Per zoom
+    level the clusters (row count, violations, mean position) are aggregated once
+    and kept. A tile is addressed as (level, code); (0, 0) is the world.
+    """
+    def __init__(self, frame: pd.DataFrame, violation="violation") -> None:
+        codes = tile_codes(frame["lon"].to_numpy(), frame["lat"].to_numpy())
+        order = np.argsort(codes, kind="stable")
+        self.codes = codes[order]
+        self.frame = frame.iloc[order].reset_index(drop=True)
+        self.violations = self.frame[violation].to_numpy(dtype=bool)
+        self._levels = {}
+
+    def __len__(self):
+        return len(self.codes)
+
+    def _slice(self, level, code):
+        start, stop = _code_range(level, code)
+        return np.searchsorted(self.codes, start), np.searchsorted(self.codes, stop)
+
+    def rows(self, tile=(0, 0)) -> pd.DataFrame:
+        """Returns the rows inside a tile."""
+        start, stop = self._slice(*tile)
+        return self.frame.iloc[start:stop]
+
+    def clusters(self, level, tile=(0, 0)) -> pd.DataFrame:
+        """Returns the non-empty tiles of `level` inside `tile`, with their row count, violations and mean position."""
+        if level not in self._levels:
+            cells = self.codes >> np.uint64(2 * (MAX_LEVEL - level))
+            starts = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1]])
+            counts = np.diff(np.r_[starts, len(cells)])
+            def mean(column):
+                return np.add.reduceat(self.frame[column].to_numpy(dtype=float), starts) / counts
+            self._levels[level] = pd.DataFrame({
+                "level": level, "code": cells[starts].astype(np.int64), "count": counts,
+                "violations": np.add.reduceat(self.violations.astype(np.int64), starts),
+                "lon": mean("lon"), "lat": mean("lat"),
+            })
+        aggregated = self._levels[level]
+        if tile == (0, 0):
+            return aggregated
+        shift = 2 * (level - tile[0])
+        codes = aggregated["code"].to_numpy()
+        return aggregated.iloc[np.searchsorted(codes, tile[1] << shift):np.searchsorted(codes, (tile[1] + 1) << shift)]
+
+    def view(self, tile=(0, 0), max_points=DEFAULT_MAX_POINTS, max_clusters=DEFAULT_MAX_CLUSTERS):
+        """Returns what to draw for a tile: ("rows", its rows) when there are at most
+        `max_points`, else ("clusters", the clusters of the finest level that has at most `max_clusters`)."""
+        rows = self.rows(tile)
+        if len(rows) <= max_points:
+            return "rows", rows
+        shown = self.clusters(tile[0], tile)
+        for finer in range(tile[0] + 1, MAX_LEVEL + 1):
+            clusters = self.clusters(finer, tile)
+            if len(clusters) > max_clusters:
+                break
+            shown = clusters
+        return "clusters", shown
@@ -1,14 +1,19 @@
 import streamlit as st
-from rdflib import Graph, Namespace
-from rdflib.namespace import RDF
-from validator import validate_graph
+from rdflib import Graph
+from validator import IncrementalValidator
+from shapes_cache import ShapesCache
+from rdf_loader import GraphCache, load_rdf
+from shapes_source import fetch_shapes, ontology_version
 from gis_visualization import display_gis_map
-import requests
+from job_runner import JobRunner, comparison_job, job_key, validation_job
+from perf_trace import Trace, stage
+from validation_report import pa, report_csv, report_frame, report_parquet, summarize_report
 import pandas as pd
 import os
 import datetime
-from version_comparator import DeltaChecker
-from laces_engine import LacesEngine, LacesPDF
+from version_comparator import EXPORT_FORMATS
+from laces_engine import LacesEngine
+from laces_pdf import LacesPDF
 import uuid
 
 # --- App Configuration ---
@@ -16,6 +21,15 @@ st.set_page_config(page_title="Laces Ontology Explorer", layout="wide")
 
 # --- Global Data & Constants ---
 QUERY_DIR = "queries"
+RESULT_CACHE_DIR = os.path.join(".cache", "query_results")
+SHAPES_CACHE_DIR = os.path.join(".cache", "shapes")
+GRAPH_CACHE_DIR = os.path.join(".cache", "graphs")
+JOB_DIR = os.path.join(".cache", "jobs")
+JOB_POLL_SECONDS = 1.0
+REPORT_PAGE_SIZES = [100, 1000, 10000]
+PROFILE_HELP = "Runs the next run under cProfile and shows its most expensive functions in the Performance panel. Slows the run down."
+# Default queries of the Document Generator; subjects and plans are templates with a <{spec_uri}> placeholder.
+DOCGEN_QUERIES = {name: os.path.join(QUERY_DIR, f"docgen_{name}.sparql") for name in ("specs", "subjects", "plans")}
 # This dictionary defines the available queries the user can select.
 QUERY_OPTIONS = {
     "General": {
@@ -25,6 +39,112 @@ QUERY_OPTIONS = {
 }
 
 
+def read_query(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read().strip()
+
+
+def performance_panel(trace, key):
+    """Shows the stages of a traced run, with the timings (and a cProfile capture, if any) as downloads."""
+    with st.expander("Performance"):
+        st.caption(f"{trace.name} took {trace.seconds:.2f}s. Bytes are received SPARQL response bytes; "
+                   "peak RSS delta is how much the process' peak memory grew during a stage.")
+        st.dataframe(pd.DataFrame(trace.rows()), use_container_width=True, hide_index=True)
+        json_col, profile_col = st.columns(2)
+        json_col.download_button("Download timings (JSON)", trace.to_json(), f"{key}_timings.json", "application/json", key=f"{key}_timings")
+        profile = trace.profile_text()
+        if profile:
+            profile_col.download_button("Download profile", profile, f"{key}_profile.txt", "text/plain", key=f"{key}_profile")
+            st.code(profile, language="")
+
+
+@st.cache_resource
+def get_shapes_cache():
+    # One cache per server process, so prepared shapes survive reruns and are shared between sessions.
+    return ShapesCache(SHAPES_CACHE_DIR)
+
+
+@st.cache_resource
+def get_graph_cache():
+    return GraphCache(GRAPH_CACHE_DIR)
+
+
+def endpoint_content(url):
+    """Identifies what an endpoint serves by its published ontology version, for job keys.
+
+    Without a published version (or an answer) its content cannot be told apart,
+    so a unique value is returned: a job on an unversioned endpoint never matches
+    an earlier one, even with the same query texts, and always runs anew.
+    """
+    try:
+        version = ontology_version(url)
+    except Exception:
+        version = None
+    return ShapesCache.version_key(url, version) if version else f"unversioned:{uuid.uuid4().hex}"
+
+
+@st.cache_resource
+def get_job_runner():
+    # Shared by all sessions, so identical comparisons and validations run once.
+    return JobRunner(JOB_DIR)
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def follow_job(param, finish):
+    """Shows the progress of the background job whose key is in query parameter `param`.
+
+    The key lives in the URL, so a reloaded page picks the job up again. When the
+    job has ended, `finish(result)` is called (or the error kept) and the page reruns.
+    """
+    key = st.query_params.get(param)
+    job = get_job_runner().status(key) if key else None
+    if job is not None and job["status"] in ("queued", "running"):
+        st.progress(job["progress"], text=job["message"] or "Waiting for a free worker...")
+        return
+    st.query_params.pop(param, None)
+    if job is None:
+        st.session_state[f"{param}_error"] = "The job is no longer known; please start it again."
+    elif job["status"] == "done":
+        finish(get_job_runner().result(key))
+    else:
+        st.session_state[f"{param}_error"] = job["error"]
+    st.rerun()
+
+
+def store_validation(conforms, report, data_graph, note, trace):
+    # Kept in the session so paging through the report does not re-run the validation.
+    st.session_state['validation'] = {
+        "conforms": conforms,
+        "report": report,
+        "summary": summarize_report(report),
+        "data_graph": data_graph,
+        "violating_nodes": set(report["Object"]),
+        "note": note,
+        "trace": trace,
+        "map_traced": False,
+    }
+    st.session_state.pop('report_page', None)
+    st.session_state.pop('gis_tile', None)
+
+
+def finish_validation(result):
+    # The worker parsed the project data into the graph cache, so this is a cache load.
+    store_validation(result["conforms"], result["report"], get_graph_cache().get(result["graph_key"]), None, result["trace"])
+
+
+def finish_comparison(result):
+    st.session_state['comparison_trace'] = result["trace"]
+    st.session_state['comparison_result'] = result["report"]
+    if result["report"]:
+        extension, mime = EXPORT_FORMATS[result["format"]]
+        suffix = "" if result["format"] == "xlsx" else f"_{result['format']}"
+        st.session_state['report_filename'] = f"changelog_{datetime.date.today()}{suffix}.{extension}"
+        st.session_state['report_mime'] = mime
+        st.session_state['comparison_cache_stats'] = result["cache_stats"]
+    else:
+        st.session_state['comparison_job_error'] = "Comparison finished, but no data was generated. Check endpoint responses."
+
+
 # --- UI Styling ---
 st.markdown("""
     <style>
@@ -71,135 +191,250 @@ with validator_tab:
 
     with col2:
         st.markdown('<div class="uploader-title">Upload Project Data</div>', unsafe_allow_html=True)
-        contractor_file = st.file_uploader("Data in RDF format", type=["ttl"], key="data_uploader")
+        contractor_file = st.file_uploader("Data in RDF format", type=["ttl", "nt", "nq", "gz"], key="data_uploader",
+                                           help="Turtle, N-Triples or N-Quads, optionally gzipped (e.g. data.nt.gz).")
+        parallel_validation = st.checkbox(
+            "Validate in parallel",
+            help="Splits large project files into shards that are validated on all CPU cores. "
+                 "Only helps on a machine with free cores; on a single core it is slower."
+        )
+        incremental_validation = st.checkbox(
+            "Re-validate only changes since the previous upload",
+            help="Keeps the last validated revision and re-checks only the objects a new revision of it can affect."
+        )
+        profile_validation = st.checkbox("Profile the next validation (cProfile)", key="profile_validation", help=PROFILE_HELP)
 
     if st.button("Validate"):
         if (not otl_file and not sparql_endpoint) or not contractor_file:
             st.warning("Please provide either an Ontology file or a SPARQL endpoint, AND a Project Data file.")
+        elif not incremental_validation:
+            # Full validations run as background jobs; the page follows them below and can be reloaded meanwhile.
+            workers = None if parallel_validation else 1
+            data = contractor_file.getvalue()
+            shapes = otl_file.getvalue() if otl_file else None
+            key = job_key("validation", {
+                "shapes": ShapesCache.content_key(shapes) if otl_file else endpoint_content(sparql_endpoint),
+                "data": GraphCache.key(data),
+                "profile": profile_validation,
+            })
+            get_job_runner().submit("validation", key, validation_job, data, contractor_file.name, shapes=shapes,
+                                    endpoint=None if otl_file else sparql_endpoint, workers=workers, profile=profile_validation)
+            st.query_params["validation_job"] = key
+            st.session_state.pop('validation', None)
+            st.session_state.pop('validation_job_error', None)
         else:
+            # Incremental validation keeps the previous revision in this session, so it runs here.
             with st.spinner("Running validation..."):
                 try:
-                    shacl_graph = Graph()
-                    if otl_file:
-                        shacl_graph.parse(otl_file, format="turtle")
-                    else:
-                        query = "CONSTRUCT {?s ?p ?o} WHERE {?s ?p ?o}"
-                        response = requests.post(
-                            sparql_endpoint,
-                            params={"query": query},
-                            headers={"Accept": "text/turtle"}
-                        )
-                        response.raise_for_status()
-                        shacl_graph.parse(data=response.text, format="turtle")
-
-                    data_graph = Graph()
-                    data_graph.parse(contractor_file, format="turtle")
-
-                    conforms, results_graph, _ = validate_graph(data_graph, shacl_graph)
-
-                    SH = Namespace("http://www.w3.org/ns/shacl#")
-                    report_rows = [{
-                        "Object": str(results_graph.value(r, SH.focusNode)),
-                        "Error detected on": str(results_graph.value(r, SH.resultPath)),
-                        "Message": str(results_graph.value(r, SH.resultMessage)),
-                        "Constraint": str(results_graph.value(r, SH.sourceConstraintComponent)).split("#")[-1]
-                    } for r in results_graph.subjects(RDF.type, SH.ValidationResult)]
-
-                    violating_nodes = {row['Object'] for row in report_rows}
-
-                    if conforms:
-                        st.success("Project data conforms to the Ontology structure.")
-                    else:
-                        st.error("Project data does NOT conform to the Ontology structure. See details in the tabs below.")
-
-                    map_view_tab, table_view_tab = st.tabs(["Map View", "Table View"])
-
-                    with map_view_tab:
-                        display_gis_map(data_graph, violating_nodes)
-
-                    with table_view_tab:
-                        if not conforms and report_rows:
-                            st.write("Detailed Validation Report")
-                            df = pd.DataFrame(report_rows)
-                            st.dataframe(df, use_container_width=True)
-                            csv = df.to_csv(index=False).encode("utf-8")
-                            st.download_button("Download Report", csv, "validation_results.csv", "text/csv")
-                        else:
-                            st.info("The project data is valid. No errors to display.")
+                    trace = Trace("Validation", profile=profile_validation)
+                    with trace.activate():
+                        shapes_cache = get_shapes_cache()
+                        with stage("load shapes"):
+                            if otl_file:
+                                otl_data = otl_file.getvalue()
+                                shacl_graph = shapes_cache.prepare(ShapesCache.content_key(otl_data), lambda: Graph().parse(data=otl_data, format="turtle"))
+                            else:
+                                # Without a published version the endpoint's content cannot be told apart, so it is not cached.
+                                version = ontology_version(sparql_endpoint)
+                                key = ShapesCache.version_key(sparql_endpoint, version) if version else None
+                                shacl_graph = shapes_cache.prepare(key, lambda: fetch_shapes(sparql_endpoint))
+
+                        data_graph = load_rdf(contractor_file.getvalue(), contractor_file.name, cache=get_graph_cache())
+
+                        workers = None if parallel_validation else 1
+                        note = None
+                        # A validator only remembers revisions checked against the same shapes.
+                        incremental = st.session_state.get('incremental_validator')
+                        if incremental is None or incremental.shapes is not shacl_graph:
+                            incremental = st.session_state['incremental_validator'] = IncrementalValidator(shacl_graph, workers)
+                        incremental.workers = workers
+                        conforms, results_graph, _ = incremental.validate(data_graph)
+                        if incremental.incremental:
+                            note = f"Re-validated {incremental.revalidated} changed or affected objects."
+
+                        with stage("report table") as current:
+                            report = report_frame(results_graph)
+                            current.rows = len(report)
+                    store_validation(conforms, report, data_graph, note, trace)
                 except Exception as e:
+                    st.session_state.pop('validation', None)
                     st.error(f"An error occurred during validation: {e}")
 
+    if "validation_job" in st.query_params:
+        follow_job("validation_job", finish_validation)
+    if st.session_state.get('validation_job_error'):
+        st.error(f"An error occurred during validation: {st.session_state['validation_job_error']}")
+
+    validation = st.session_state.get('validation')
+    if validation:
+        report = validation["report"]
+        if validation["note"]:
+            st.caption(validation["note"])
+        if validation["conforms"]:
+            st.success("Project data conforms to the Ontology structure.")
+        else:
+            st.error("Project data does NOT conform to the Ontology structure. See details in the tabs below.")
+
+        map_view_tab, table_view_tab = st.tabs(["Map View", "Table View"])
+
+        with map_view_tab:
+            if validation["data_graph"] is None:
+                st.info("The project data is no longer in the cache. Validate again to see it on the map.")
+            elif validation["map_traced"]:
+                display_gis_map(validation["data_graph"], validation["violating_nodes"])
+            else:
+                # Preparing the map is part of the validation run that produced it.
+                with validation["trace"].activate():
+                    display_gis_map(validation["data_graph"], validation["violating_nodes"])
+                validation["map_traced"] = True
+
+        with table_view_tab:
+            if not validation["conforms"] and len(report):
+                st.write("Validation Summary")
+                for summary_col, (title, summary) in zip(st.columns(3), validation["summary"].items()):
+                    with summary_col:
+                        st.caption(title)
+                        st.dataframe(summary, use_container_width=True, hide_index=True)
+
+                st.write("Detailed Validation Report")
+                page_col, size_col = st.columns(2)
+                page_size = size_col.selectbox("Rows per page", REPORT_PAGE_SIZES, key="report_page_size")
+                pages = max(1, -(-len(report) // page_size))
+                page = page_col.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key="report_page")
+                start = (page - 1) * page_size
+                st.dataframe(report.iloc[start:start + page_size], use_container_width=True, hide_index=True)
+                st.caption(f"Rows {start + 1}-{min(start + page_size, len(report))} of {len(report)}")
+
+                # The files are only built when a download is clicked.
+                csv_col, parquet_col = st.columns(2)
+                csv_col.download_button("Download Report (CSV)", lambda: report_csv(report), "validation_results.csv", "text/csv")
+                if pa is not None:
+                    parquet_col.download_button("Download Report (Parquet)", lambda: report_parquet(report),
+                                                "validation_results.parquet", "application/vnd.apache.parquet")
+            else:
+                st.info("The project data is valid. No errors to display.")
+
+        performance_panel(validation["trace"], "validation")
+
 # ==============================================================================
 # --- VERSION COMPARER TAB ---
 # ==============================================================================
 with compare_tab:
     st.markdown('<div class="section-title">Version Comparison</div>', unsafe_allow_html=True)
-    st.write("Provide the SPARQL endpoints for the two OTL versions you want to compare.")
+    st.write("Provide the SPARQL endpoints for the two OTL versions you want to compare, or for a series of releases.")
 
     st.markdown('<h3>1. Provide Endpoints & Select Queries</h3>', unsafe_allow_html=True)
-    
-    c1, c2 = st.columns(2)
-    with c1:
-        old_endpoint_url = st.text_input("Old Version SPARQL Endpoint")
-    with c2:
-        new_endpoint_url = st.text_input("New Version SPARQL Endpoint")
+
+    chain_mode = st.radio("Compare", ["Two versions", "A chain of versions"], horizontal=True) == "A chain of versions"
+    if chain_mode:
+        chain_endpoints = [line.strip() for line in st.text_area(
+            "SPARQL endpoints, oldest version first, one per line",
+            help="Every version is downloaded once; each version is compared with the next one."
+        ).splitlines() if line.strip()]
+        first_to_last = st.checkbox("Also compare the first version with the last")
+    else:
+        c1, c2 = st.columns(2)
+        with c1:
+            old_endpoint_url = st.text_input("Old Version SPARQL Endpoint")
+        with c2:
+            new_endpoint_url = st.text_input("New Version SPARQL Endpoint")
 
     selected_queries = st.multiselect(
         "Select the aspects (queries) to compare:",
         options=list(QUERY_OPTIONS.keys()),
         default=list(QUERY_OPTIONS.keys())
     )
+    profile_comparison = st.checkbox("Profile the next comparison (cProfile)", key="profile_comparison", help=PROFILE_HELP)
+    # A chain fetches every version once, in full, so it has no fingerprint mode.
+    fingerprint_diff = not chain_mode and st.checkbox(
+        "Only download changed rows (fingerprint diff)",
+        help="Both endpoints first return a hash per row; full rows are fetched only for new, deleted and modified items, "
+             "so UNCHANGED rows show their identifying columns only. Pays off for wide rows with few changes on a slow "
+             "link to the endpoints; on a fast link downloading everything is quicker."
+    )
+    page_col, cap_col = st.columns(2)
+    comparison_page_size = page_col.number_input(
+        "Rows per request (0: one request per query)", min_value=0, value=0, step=1000,
+        help="Fetches large results in LIMIT/OFFSET pages, several at a time, each retried on its own."
+    )
+    max_rows = cap_col.number_input(
+        "Endpoint result cap (0: unknown)", min_value=0, value=0, step=1000,
+        help="The most rows the endpoints return per request. Pages are kept below it; a cap below the page size is also detected."
+    )
+    report_formats = {"Excel (.xlsx)": "xlsx", "Parquet (zip)": "parquet", "Arrow IPC (zip)": "arrow", "CSV (zip)": "csv"}
+    report_format = report_formats[st.selectbox(
+        "Report format:",
+        options=list(report_formats.keys()),
+        help="Columnar formats are written without styling and are much faster for large changelogs."
+    )]
     
     st.markdown('<hr style="margin-top:2em; margin-bottom:2em;">', unsafe_allow_html=True)
     st.markdown('<h3>2. Run Comparison</h3>', unsafe_allow_html=True)
 
     if st.button("Compare Versions"):
-        if not old_endpoint_url or not new_endpoint_url:
+        if chain_mode and len(chain_endpoints) < 2:
+            st.warning("Please provide at least two SPARQL endpoints, one per line.")
+        elif not chain_mode and (not old_endpoint_url or not new_endpoint_url):
             st.warning("Please provide both the old and new SPARQL endpoints.")
         elif not selected_queries:
             st.warning("Please select at least one query to run the comparison.")
         else:
-            progress_bar = st.progress(0, text="Starting comparison...")
-            def update_progress(fraction, text):
-                progress_bar.progress(fraction, text=text)
-
-            try:
-                # Build a simplified config dictionary with only endpoint URLs
-                config = {
-                    "endpoints": {
-                        "old": {"url": old_endpoint_url},
-                        "new": {"url": new_endpoint_url}
-                    },
-                    "queries": {name: QUERY_OPTIONS[name] for name in selected_queries},
-                    "summary": {"query": os.path.join(QUERY_DIR, "summary.sparql")}
+            # Build a simplified config dictionary with only endpoint URLs
+            config = {
+                "queries": {name: QUERY_OPTIONS[name] for name in selected_queries},
+                "summary": {"query": os.path.join(QUERY_DIR, "summary.sparql")},
+                "diff_mode": "fingerprint" if fingerprint_diff else "full",
+                "cache": {"dir": RESULT_CACHE_DIR}
+            }
+            if comparison_page_size:
+                config["page_size"] = int(comparison_page_size)
+            if chain_mode:
+                config["versions"] = [{"url": url} for url in chain_endpoints]
+                config["first_to_last"] = first_to_last
+            else:
+                config["endpoints"] = {
+                    "old": {"url": old_endpoint_url},
+                    "new": {"url": new_endpoint_url}
                 }
-                
-                checker = DeltaChecker(config)
-                excel_data = checker.run(progress_callback=update_progress)
-                
-                if excel_data:
-                    st.session_state['comparison_result'] = excel_data
-                    filename = f"changelog_{datetime.date.today()}.xlsx"
-                    st.session_state['report_filename'] = filename
-                    progress_bar.empty()
-                    st.success("Comparison finished! Your report is ready for download below.")
-                else:
-                    progress_bar.empty()
-                    st.error("Comparison finished, but no data was generated. Check endpoint responses.")
-            
-            except Exception as e:
-                progress_bar.empty()
-                st.error("An error occurred during comparison:")
-                st.code(str(e), language="")
-            
+            endpoints = config["versions"] if chain_mode else config["endpoints"].values()
+            if max_rows:
+                for endpoint in endpoints:
+                    endpoint["max_rows"] = int(max_rows)
+            # The query texts and endpoint versions are part of the inputs, so editing a query file
+            # or publishing a new version starts a new job.
+            query_files = [config["summary"]["query"]] + [query["file"] for query in config["queries"].values()]
+            key = job_key("comparison", {
+                "config": config,
+                "content": [endpoint_content(endpoint["url"]) for endpoint in endpoints],
+                "queries": {path: read_query(path) for path in query_files},
+                "format": report_format,
+                "profile": profile_comparison,
+            })
+            get_job_runner().submit("comparison", key, comparison_job, config, report_format, profile=profile_comparison)
+            st.query_params["comparison_job"] = key
+            for name in ('comparison_result', 'comparison_trace', 'comparison_cache_stats', 'comparison_job_error'):
+                st.session_state.pop(name, None)
+
+    if "comparison_job" in st.query_params:
+        follow_job("comparison_job", finish_comparison)
+    if st.session_state.get('comparison_job_error'):
+        st.error("An error occurred during comparison:")
+        st.code(st.session_state['comparison_job_error'], language="")
+
     # Display download button if a report has been generated
     if 'comparison_result' in st.session_state and st.session_state['comparison_result']:
+        st.success("Comparison finished! Your report is ready for download below.")
+        cache_stats = st.session_state.get('comparison_cache_stats')
+        if cache_stats:
+            st.caption(f"Result cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses.")
         st.download_button(
             label="Download Comparison Report",
             data=st.session_state['comparison_result'],
             file_name=st.session_state.get('report_filename', 'comparison_report.xlsx'),
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            mime=st.session_state.get('report_mime', EXPORT_FORMATS["xlsx"][1])
         )
+    if 'comparison_trace' in st.session_state:
+        performance_panel(st.session_state['comparison_trace'], "comparison")
 
 # ==============================================================================
 # --- Docgen TAB ---
@@ -233,37 +468,34 @@ with docgen_tab:
         endpoint = sc1.text_input("SPARQL Endpoint", value="https://hub.laces.tech/groups/repo/sparql")
         user = sc2.text_input("Username")
         pwd = sc3.text_input("Password", type="password")
-        q_specs = st.text_area("Specifications Query", height=100, value="""PREFIX cm: <http://models.laces.tech/contractmanager/def/>\nPREFIX rdf:  <http://www.w3.org/1999/02/22-rdf-syntax-ns#>\nPREFIX sem:  <http://data.semmtech.com/sem/def/>\nSELECT DISTINCT ?uri ?name ?text\nWHERE {\n    ?uri a cm:IndividualSpecification ;\n        sem:name ?name ;\n        cm:isDescribedIn ?t .\n    ?t sem:value ?text .\n} ORDER BY ?name""")
-        q_subs = st.text_area("Subjects Query", height=100, value="""PREFIX cm: <http://models.laces.tech/contractmanager/def/>\nPREFIX sem:  <http://data.semmtech.com/sem/def/>\nSELECT DISTINCT ?uri ?name ?type\nWHERE {\n    ?role sem:roleFor <{spec_uri}> .\n    ?uri cm:shallBeCompliantWith ?role ;\n        sem:classifiedAs ?classifier ;\n        sem:name ?name .\n    ?classifier sem:name ?type .\n} ORDER BY ?name""")
-        q_plans = st.text_area("Plans Query", height=100, value="""PREFIX cm: <http://models.laces.tech/contractmanager/def/>\nPREFIX sem:  <http://data.semmtech.com/sem/def/>\nSELECT DISTINCT ?plan ?method ?phase\nWHERE {\n    ?role sem:roleFor <{spec_uri}> ;\n        cm:isVerifiedBy ?p .\n    ?p cm:isASpecializationOf ?m ;\n        sem:name ?plan ;\n        cm:occursWithin ?ph .\n    ?ph sem:name ?phase .\n    ?m sem:name ?method .\n}""")
+        q_specs = st.text_area("Specifications Query", height=100, value=read_query(DOCGEN_QUERIES["specs"]))
+        q_subs = st.text_area("Subjects Query", height=100, value=read_query(DOCGEN_QUERIES["subjects"]))
+        q_plans = st.text_area("Plans Query", height=100, value=read_query(DOCGEN_QUERIES["plans"]))
+        batch_specs = st.checkbox("Fetch subjects and plans in batches", value=True, help="Queries many specifications per request instead of two requests per specification.")
+        docgen_page_size = st.number_input("Rows per request (0: one request per query)", min_value=0, value=0, step=1000,
+                                           help="Fetches large results in LIMIT/OFFSET pages, several at a time.")
+        profile_docgen = st.checkbox("Profile the next generation (cProfile)", key="profile_docgen", help=PROFILE_HELP)
         gen_btn = st.button("Generate Document", use_container_width=True)
 
     # --- GENERATION LOGIC ---
     if gen_btn:
         # Template queries remain consistent with frozen logic
-        q_sub_template = """PREFIX cm: <http://models.laces.tech/contractmanager/def/>\nPREFIX sem:  <http://data.semmtech.com/sem/def/>\nSELECT DISTINCT ?uri ?name ?type\nWHERE {\n    ?role sem:roleFor <{spec_uri}> .\n    ?uri cm:shallBeCompliantWith ?role ;\n        sem:classifiedAs ?classifier ;\n        sem:name ?name .\n    ?classifier sem:name ?type .\n} ORDER BY ?name"""
-        q_plan_template = """PREFIX cm: <http://models.laces.tech/contractmanager/def/>\nPREFIX sem:  <http://data.semmtech.com/sem/def/>\nSELECT DISTINCT ?plan ?method ?phase\nWHERE {\n    ?role sem:roleFor <{spec_uri}> ;\n        cm:isVerifiedBy ?p .\n    ?p cm:isASpecializationOf ?m ;\n        sem:name ?plan ;\n        cm:occursWithin ?ph .\n    ?ph sem:name ?phase .\n    ?m sem:name ?method .\n}"""
+        q_sub_template = read_query(DOCGEN_QUERIES["subjects"])
+        q_plan_template = read_query(DOCGEN_QUERIES["plans"])
 
         with st.spinner("Generating Report..."):
-            specs = LacesEngine.retrieve_objects(endpoint, user, pwd, q_specs, ("uri", "name", "text"))
-            if specs:
-                md = "# Requirements Report\n\n"
-                for spec in specs:
-                    subs = LacesEngine.retrieve_objects(endpoint, user, pwd, q_sub_template.replace("{spec_uri}", spec['uri']), ("uri", "name", "type"))
-                    plans = LacesEngine.retrieve_objects(endpoint, user, pwd, q_plan_template.replace("{spec_uri}", spec['uri']), ("plan", "method", "phase"))
-                    md += f"## {spec['name'].capitalize()}\n**Specification:** {spec['text']}\n\n"
-                    if subs:
-                        md += "| **Subject Name** | **Type** |\n|:---|:---|\n"
-                        for s in subs: md += f"| {s['name']} | {s['type']} |\n"
-                        md += "\n"
-                    if plans:
-                        md += "| **Phase** | **Method** | **Plan** |\n|:---|:---|:---|\n"
-                        for p in plans: md += f"| {p['phase']} | {p['method']} | {p['plan']} |\n"
-                        md += "\n"
-                    md += "---\n\n"
+            trace = Trace("Document generation", profile=profile_docgen)
+            with trace.activate():
+                md = LacesEngine.generate_report(endpoint, user, pwd, q_specs, q_sub_template, q_plan_template, batched=batch_specs,
+                                                  page_size=int(docgen_page_size) or None)
+            st.session_state['docgen_trace'] = trace
+            if md:
                 st.session_state.md_report = md
                 st.rerun()
 
+    if 'docgen_trace' in st.session_state:
+        performance_panel(st.session_state['docgen_trace'], "docgen")
+
     # --- EDITOR & PREVIEW ---
     if st.session_state.md_report:
         st.divider()
@@ -0,0 +1,65 @@
+import threading
+
+import pytest
+from rdflib import Graph, Literal, Namespace
+from version_comparator import ChainChecker, DeltaChecker, read_csv_stream
+
+EX = Namespace("http://example.org/")
+QUERY = "SELECT ?key ?value WHERE { ?key <http://example.org/value> ?value }"
+SUMMARY = "SELECT ?version WHERE { <http://example.org/otl> <http://example.org/version> ?version }"
+_lock = threading.Lock()  # rdflib's query parser is not thread-safe
+
+def _version(number, values):
+    g = Graph()
+    g.add((EX.otl, EX.version, Literal(number)))
+    for key, value in values.items():
+        g.add((EX[key], EX.value, Literal(value)))
+    return g
+
+GRAPHS = {
+    "v1": _version("1.0", {"a": 1, "b": 1}),
+    "v2": _version("1.1", {"a": 1, "b": 2}),
+    "v3": _version("1.2-draft", {"a": 1, "b": 2, "c": 3}),
+}
+
+@pytest.fixture
+def endpoints(monkeypatch):
+    """Answers every checker's queries from GRAPHS, keyed by endpoint URL, and records the requests."""
+    requests = []
+    def execute_query(self, query, old=True, page_size=None):
+        url = self.config['endpoints']['old' if old else 'new']['url']
+        with _lock:
+            requests.append((url, old))
+            data = GRAPHS[url].query(query).serialize(format="csv")
+        return read_csv_stream([data])
+    monkeypatch.setattr(DeltaChecker, "execute_query", execute_query)
+    return requests
+
+def _run(tmp_path, sides):
+    (tmp_path / "query.sparql").write_text(QUERY)
+    (tmp_path / "summary.sparql").write_text(SUMMARY)
+    cache = tmp_path / "cache"
+    checker = ChainChecker({
+        "versions": [{"url": url} for url in GRAPHS],
+        "queries": {"Values": {"file": str(tmp_path / "query.sparql"), "columns": ["key"]}},
+        "summary": {"query": str(tmp_path / "summary.sparql")},
+        "cache": {"dir": str(cache), **({"sides": sides} if sides else {})},
+    })
+    assert checker.run() is not None
+    return checker, sorted(path.name for path in cache.iterdir())
+
+def test_the_newest_version_is_only_cached_with_the_new_side(tmp_path, endpoints):
+    checker, entries = _run(tmp_path, None)
+    assert entries == sorted(checker.cache.key(url, QUERY, version) + ".parquet" for url, version in (("v1", "1.0"), ("v2", "1.1")))
+    # The newest version is read as the new side, like in a two-version comparison.
+    assert ("v3", False) in endpoints and ("v3", True) not in endpoints
+    _, entries = _run(tmp_path, ["old", "new"])
+    assert len(entries) == 3
+
+def test_every_version_is_fetched_once_per_query(tmp_path, endpoints):
+    checker, _ = _run(tmp_path, None)
+    # One summary and one query per version.
+    assert sorted(url for url, _ in endpoints) == ["v1", "v1", "v2", "v2", "v3", "v3"]
+    changelog = checker.results["Values"]
+    assert changelog[changelog["changeStatus"] != "UNCHANGED"][["version", "key", "changeStatus"]].values.tolist() == [
+        ["1.0 -> 1.1", "http://example.org/b", "MODIFIED"], ["1.1 -> 1.2-draft", "http://example.org/c", "NEW"]]
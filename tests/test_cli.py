@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+
+import cli
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHAPES = """@prefix ex: <http://example.org/> .
+@prefix sh: <http://www.w3.org/ns/shacl#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+ex:AssetShape a sh:NodeShape ; sh:targetClass ex:Asset ; sh:property [ sh:path rdfs:label ; sh:minCount 1 ] .
+"""
+DATA = """<http://example.org/a1> <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://example.org/Asset> .
+<http://example.org/a2> <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://example.org/Asset> .
+<http://example.org/a2> <http://www.w3.org/2000/01/rdf-schema#label> "Asset 2" .
+"""
+
+@pytest.fixture
+def commands(monkeypatch):
+    # Every subcommand records the arguments it was dispatched with.
+    called = []
+    for name in ("compare", "validate", "docgen", "graphdiff"):
+        monkeypatch.setattr(cli, name, lambda args, name=name: called.append((name, args)) or 0)
+    return called
+
+@pytest.mark.parametrize("argv, command", [
+    (["compare", "config.yaml", "--format", "parquet"], "compare"),
+    (["validate", "data.nt", "--shapes", "otl.ttl"], "validate"),
+    (["docgen", "--endpoint", "http://endpoint", "-o", "report.pdf"], "docgen"),
+    (["graphdiff", "old.nt", "new.nt"], "graphdiff"),
+])
+def test_subcommands_are_dispatched(commands, argv, command):
+    assert cli.main(argv) == 0
+    assert [name for name, _ in commands] == [command]
+
+def test_zero_workers_means_all_cores(commands):
+    cli.main(["validate", "data.nt", "--endpoint", "http://endpoint", "--workers", "0"])
+    args = commands[0][1]
+    assert args.workers is None and args.endpoint == "http://endpoint" and args.shapes is None
+
+@pytest.mark.parametrize("argv", [[], ["validate", "data.nt"], ["validate", "data.nt", "--shapes", "otl.ttl", "--endpoint", "http://endpoint"],
+                                  ["compare", "config.yaml", "--format", "json"]])
+def test_invalid_command_lines_are_rejected(commands, argv):
+    with pytest.raises(SystemExit):
+        cli.main(argv)
+    assert not commands
+
+def test_validate_writes_the_report_and_exits_1_when_data_does_not_conform(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)  # the caches live under the working directory
+    (tmp_path / "otl.ttl").write_text(SHAPES)
+    (tmp_path / "data.nt").write_text(DATA)
+    assert cli.main(["validate", "data.nt", "--shapes", "otl.ttl", "--report", "report.csv", "--no-cache"]) == 1
+    assert "data.nt: does NOT conform (1 violations)" in capsys.readouterr().out
+    assert pd.read_csv(tmp_path / "report.csv")["Object"].tolist() == ["http://example.org/a1"]
+
+def test_importing_the_engine_or_the_cli_loads_no_heavy_modules():
+    heavy = ("streamlit", "pyshacl", "pandas", "pydeck", "fpdf")
+    for module in ("laces_engine", "cli"):
+        code = f"import sys, {module}; print(' '.join(m for m in {heavy!r} if m in sys.modules))"
+        loaded = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        assert loaded == "", f"import {module} loaded {loaded}"
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+from version_comparator import compare_results
+
+def _frame(rows):
+    return pd.DataFrame(rows, columns=["id", "label", "note"])
+
+def test_rows_are_classified_by_key_and_values():
+    old = _frame([("a", "A", "x"), ("b", "B", "x"), ("c", "C", "x")])
+    new = _frame([("a", "A", "x"), ("b", "B2", "x"), ("d", "D", "x")])
+    new_items, old_items, changed, same, old_cols, new_cols, id_cols = compare_results(old, new, ["id"])
+    assert new_items["id"].tolist() == ["d"]
+    assert old_items["id"].tolist() == ["c"]
+    assert changed[["id", "label_old", "label_new"]].values.tolist() == [["b", "B", "B2"]]
+    assert same["id"].tolist() == ["a"]
+    assert (old_cols, new_cols, id_cols) == (["label_old", "note_old"], ["label_new", "note_new"], ["id"])
+
+def test_ignored_columns_do_not_make_rows_modified():
+    old, new = _frame([("a", "A", "x")]), _frame([("a", "A", "y")])
+    assert len(compare_results(old, new, ["id"])[2]) == 1
+    _, _, changed, same, _, _, _ = compare_results(old, new, ["id"], ["note"])
+    assert changed.empty and same["id"].tolist() == ["a"]
+
+def test_duplicate_keys_are_paired_in_order_of_appearance():
+    old = _frame([("a", "1", "x"), ("a", "2", "x"), ("a", "3", "x")])
+    new = _frame([("a", "3", "x"), ("a", "4", "x")])
+    new_items, old_items, changed, same, _, _, _ = compare_results(old, new, ["id"])
+    assert same["label"].tolist() == ["3"]
+    assert changed[["label_old", "label_new"]].values.tolist() == [["1", "4"]]
+    assert old_items["label_old"].tolist() == ["2"] and new_items.empty
+
+def test_numbers_and_missing_values_compare_by_value():
+    old = pd.DataFrame({"id": [1, 2, 3], "value": [1, 2, np.nan]})
+    new = pd.DataFrame({"id": [1.0, 2.0, 3.0], "value": [1.0, 2.5, np.nan]})
+    new_items, old_items, changed, same, _, _, _ = compare_results(old, new, ["id"])
+    assert sorted(same["id"].tolist()) == [1, 3]
+    assert changed["id"].tolist() == [2]
+    assert new_items.empty and old_items.empty
+
+def test_missing_identifying_columns_are_reported():
+    with pytest.raises(ValueError, match="not found in new"):
+        compare_results(_frame([]), pd.DataFrame(columns=["label"]), ["id"])
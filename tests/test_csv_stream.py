@@ -0,0 +1,57 @@
+import io
+
+import pandas as pd
+import pytest
+from version_comparator import normalized_chunks, read_csv_stream
+
+# SPARQL CSV results: CRLF line ends, blank lines, quoted fields with escaped
+# quotes, separators and line breaks, and "[NULL]" placeholders next to empty fields.
+PAYLOAD = (
+    'uri,label,count,date,note\r\n'
+    'http://example.org/a,"Say ""hi""",1,2024-01-01,[NULL]\r\n'
+    '\r\n'
+    'http://example.org/b,"comma, inside",2,,"two\r\nlines"\r\n'
+    'http://example.org/c,[NULL],,2024-02-29,""""\r\n'
+    'http://example.org/d,"[NULL]","3",2024-03-01,"end ""quoted"""\r\n'
+).encode("utf-8")
+
+def _expected(payload):
+    # What the whole payload parses to when it is normalised in one piece.
+    return pd.read_csv(io.StringIO(payload.decode("utf-8").replace("\n\n", "\n").replace("\r\n", "\n")))
+
+def _split(payload, *cuts):
+    bounds = [0, *cuts, len(payload)]
+    return [payload[start:end] for start, end in zip(bounds, bounds[1:])]
+
+MARKERS = [b"[NULL]", b'""', b"\r\n", b"\r\n\r\n"]
+
+@pytest.mark.parametrize("marker", MARKERS, ids=lambda m: repr(m.decode()))
+def test_sequences_split_across_chunks_parse_like_the_whole_payload(marker):
+    expected = _expected(PAYLOAD)
+    start = PAYLOAD.find(marker)
+    while start != -1:
+        for cut in range(start + 1, start + len(marker)):
+            pd.testing.assert_frame_equal(read_csv_stream(_split(PAYLOAD, cut)), expected)
+        start = PAYLOAD.find(marker, start + 1)
+
+def test_every_split_point_normalises_like_the_whole_payload():
+    whole = PAYLOAD.replace(b"\n\n", b"\n").replace(b"\r\n", b"\n")
+    for cut in range(1, len(PAYLOAD)):
+        assert b"".join(normalized_chunks(_split(PAYLOAD, cut))) == whole
+    # One byte per chunk holds back every newline and carriage return.
+    assert b"".join(normalized_chunks(_split(PAYLOAD, *range(1, len(PAYLOAD))))) == whole
+    pd.testing.assert_frame_equal(read_csv_stream(_split(PAYLOAD, *range(1, len(PAYLOAD)))), _expected(PAYLOAD))
+
+def test_runs_of_newlines_collapse_in_pairs_across_chunks():
+    payload = b"a\n\n\nb\n\n\n\nc\r\r\n\n"
+    whole = payload.replace(b"\n\n", b"\n").replace(b"\r\n", b"\n")
+    for cut in range(1, len(payload)):
+        for second in range(cut + 1, len(payload)):
+            assert b"".join(normalized_chunks(_split(payload, cut, second))) == whole
+
+def test_a_spilled_stream_parses_like_the_whole_payload(tmp_path):
+    pd.testing.assert_frame_equal(read_csv_stream(_split(PAYLOAD, 7, 40, 41), spill_dir=tmp_path), _expected(PAYLOAD))
+    assert not list(tmp_path.iterdir())
+
+def test_an_empty_stream_is_an_empty_frame():
+    assert read_csv_stream([b"", b""]).empty
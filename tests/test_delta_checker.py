@@ -0,0 +1,137 @@
+import io
+import threading
+import time
+
+import pytest
+import requests
+import version_comparator
+from rdflib import Graph, Literal, Namespace
+from version_comparator import DeltaChecker, QueryScheduler
+
+EX = Namespace("http://example.org/")
+OLD, NEW = "http://old.example/sparql", "http://new.example/sparql"
+QUERIES = {
+    "Labels": "SELECT ?key ?label WHERE { ?key <http://example.org/label> ?label }",
+    "Counts": "SELECT ?key ?count WHERE { ?key <http://example.org/count> ?count }",
+    "Notes": "SELECT ?key ?note WHERE { ?key <http://example.org/note> ?note }",
+}
+SUMMARY = "SELECT ?version WHERE { <http://example.org/otl> <http://example.org/version> ?version }"
+
+def _graph(version, label):
+    g = Graph()
+    g.add((EX.otl, EX.version, Literal(version)))
+    for i in range(3):
+        g.add((EX[f"k{i}"], EX.label, Literal(label if i == 0 else f"label {i}")))
+        g.add((EX[f"k{i}"], EX["count"], Literal(i)))
+        g.add((EX[f"k{i}"], EX.note, Literal("note")))
+    return g
+
+class Client():
+    """Stands in for the SparqlClient: answers POSTed queries from one graph per endpoint URL.
+
+    Queries to the new endpoint containing a string in `failing` get a 500 response. Every
+    request takes `delay` seconds, so concurrent requests overlap.
+    """
+    def __init__(self, failing=(), delay=0.05) -> None:
+        self.graphs = {OLD: _graph("1.0", "old"), NEW: _graph("1.1", "new")}
+        self.failing = failing
+        self.delay = delay
+        self.active = {OLD: 0, NEW: 0}
+        self.peak = {OLD: 0, NEW: 0}
+        self._lock = threading.Lock()  # rdflib's query parser is not thread-safe
+
+    def send(self, prepared, stream=False):
+        url, query = prepared.url.split("?")[0], prepared.body.decode("utf-8")
+        with self._lock:
+            self.active[url] += 1
+            self.peak[url] = max(self.peak[url], self.active[url])
+        try:
+            time.sleep(self.delay)
+            response = requests.Response()
+            response.url, response.headers["Content-Type"] = url, "text/csv"
+            if url == NEW and any(text in query for text in self.failing):
+                response.status_code, response._content = 500, b"Internal error"
+                return response
+            with self._lock:
+                response.raw = io.BytesIO(self.graphs[url].query(query).serialize(format="csv"))
+            response.status_code = 200
+            return response
+        finally:
+            with self._lock:
+                self.active[url] -= 1
+
+    def iter_content(self, response):
+        return response.iter_content(chunk_size=16)
+
+@pytest.fixture
+def client(monkeypatch):
+    def install(**kwargs):
+        stub = Client(**kwargs)
+        monkeypatch.setattr(version_comparator, "get_client", lambda: stub)
+        return stub
+    return install
+
+def _checker(tmp_path, **config):
+    queries = {}
+    for name, query in QUERIES.items():
+        (tmp_path / f"{name}.sparql").write_text(query)
+        queries[name] = {"file": str(tmp_path / f"{name}.sparql"), "columns": ["key"]}
+    (tmp_path / "summary.sparql").write_text(SUMMARY)
+    return DeltaChecker({"endpoints": {"old": {"url": OLD}, "new": {"url": NEW}}, "queries": queries,
+                         "summary": {"query": str(tmp_path / "summary.sparql")}, **config})
+
+def _run(checker):
+    updates = []
+    assert checker.run(progress_callback=lambda fraction, text: updates.append((fraction, text))) is not None
+    return updates
+
+def test_every_query_is_compared_with_progress_up_to_completion(tmp_path, client):
+    client()
+    checker = _checker(tmp_path)
+    updates = _run(checker)
+    assert list(checker.results) == ["summary", "Labels", "Counts", "Notes"]
+    labels = checker.results["Labels"]
+    assert labels[labels["changeStatus"] == "MODIFIED"][["label_old", "label_new"]].values.tolist() == [["old", "new"]]
+    assert set(checker.results["Counts"]["changeStatus"]) == {"UNCHANGED"}
+    fractions = [fraction for fraction, _ in updates]
+    assert fractions == sorted(fractions) and fractions[-2:] == [1.0, 1.0]
+    texts = [text for _, text in updates]
+    for name in ["summary", *QUERIES]:
+        assert {f"Fetched old version: {name}", f"Fetched new version: {name}", f"Compared: {name}"} <= set(texts)
+    assert texts[-1] == "Comparison complete."
+
+def test_queries_run_concurrently_within_the_endpoint_cap(tmp_path, client):
+    stub = client()
+    _run(_checker(tmp_path))
+    assert stub.peak[OLD] > 1 and stub.peak[NEW] > 1
+    stub = client()
+    _run(_checker(tmp_path, endpoints={"old": {"url": OLD, "max_concurrency": 1}, "new": {"url": NEW, "max_concurrency": 2}}))
+    assert stub.peak == {OLD: 1, NEW: 2}
+
+def test_a_failing_side_reports_an_error_sheet_and_the_rest_completes(tmp_path, client):
+    # Only the new side of Counts fails; its old side is fetched or skipped, depending on which arrives first.
+    client(failing=["example.org/count"])
+    checker = _checker(tmp_path)
+    updates = _run(checker)
+    assert "Could not process query" in checker.results["Counts"]["Error"].iloc[0]
+    assert set(checker.results["Labels"]["changeStatus"]) == {"MODIFIED", "UNCHANGED"}
+    assert list(checker.results) == ["summary", "Labels", "Counts", "Notes"]
+    texts = [text for _, text in updates]
+    assert texts.count("Error on: Counts") == 1 and "Compared: Counts" not in texts
+    assert ("Fetched old version: Counts" in texts) != ("Skipped old version: Counts" in texts)
+    assert updates[-2][0] == 1.0
+
+def test_the_scheduler_caps_concurrency_per_endpoint():
+    active, peak, lock = {"a": 0, "b": 0}, {"a": 0, "b": 0}, threading.Lock()
+    def task(endpoint):
+        with lock:
+            active[endpoint] += 1
+            peak[endpoint] = max(peak[endpoint], active[endpoint])
+        time.sleep(0.02)
+        with lock:
+            active[endpoint] -= 1
+        return endpoint
+    with QueryScheduler(max_workers=6, endpoint_limits={"a": 2}) as scheduler:
+        futures = [scheduler.submit(endpoint, task, endpoint) for endpoint in "ab" * 6]
+        assert [future.result() for future in futures] == list("ab" * 6)
+    assert peak["a"] == 2 and peak["b"] > 2
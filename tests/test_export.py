@@ -0,0 +1,84 @@
+import io
+import zipfile
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+import pytest
+import version_comparator
+from version_comparator import EXPORT_FORMATS, MODIFIED_CELL_COLOR, STATUS_COLORS, DeltaChecker, difference_masks, write_archive, write_excel
+
+CHANGELOG = pd.DataFrame({
+    "key": ["a", "b", "c", "d", "e"],
+    "label_old": ["A", "B", "C", None, "E"],
+    "label_new": ["A2", "B", None, "D", "E"],
+    "count_old": [1.0, 2.0, np.nan, np.nan, 5.0],
+    "count_new": [1.0, 3.0, np.nan, 4.0, 5.0],
+    "changeStatus": ["MODIFIED", "MODIFIED", "DELETED", "NEW", "UNCHANGED"],
+})
+SUMMARY = pd.concat([pd.DataFrame({"version": ["1.0"], "classes": [10]}), pd.DataFrame({"version": ["1.1"], "classes": [12]})])
+SUMMARY.insert(0, "Aspect", ["Old version", "New version"])
+RESULTS = {"summary": SUMMARY.transpose(), "Labels": CHANGELOG}
+
+def test_only_differing_cells_of_modified_rows_are_marked():
+    status, cells = difference_masks(CHANGELOG)
+    assert status.tolist() == CHANGELOG["changeStatus"].tolist()
+    marked = {(CHANGELOG["key"][r], CHANGELOG.columns[c]) for r, c in zip(*np.nonzero(cells))}
+    assert marked == {("a", "label_old"), ("a", "label_new"), ("b", "count_old"), ("b", "count_new")}
+
+def test_a_frame_without_status_marks_nothing():
+    status, cells = difference_masks(CHANGELOG.drop(columns="changeStatus"))
+    assert (status == "").all() and not cells.any()
+
+def _fill(cell):
+    return f"#{cell.fill.fgColor.rgb[-6:].lower()}" if cell.fill.fill_type else None
+
+def test_the_workbook_reads_back_with_status_and_cell_colours():
+    output = io.BytesIO()
+    write_excel(RESULTS, output)
+    output.seek(0)
+    pd.testing.assert_frame_equal(pd.read_excel(output, sheet_name="Labels"), CHANGELOG)
+    output.seek(0)
+    workbook = openpyxl.load_workbook(output)
+    summary = [[cell.value for cell in row] for row in workbook["summary"].iter_rows()]
+    assert summary == [["Aspect", "Old version", "New version"], ["version", "1.0", "1.1"], ["classes", 10, 12]]
+    sheet = workbook["Labels"]
+    _, cells = difference_masks(CHANGELOG)
+    for r, state in enumerate(CHANGELOG["changeStatus"]):
+        for c in range(len(CHANGELOG.columns)):
+            expected = MODIFIED_CELL_COLOR if cells[r, c] else STATUS_COLORS.get(state)
+            assert _fill(sheet.cell(r + 2, c + 1)) == expected
+
+def _read_entry(data, fmt):
+    if fmt == "csv":
+        return pd.read_csv(io.BytesIO(data))
+    if fmt == "parquet":
+        return pd.read_parquet(io.BytesIO(data))
+    return pa.ipc.open_file(pa.BufferReader(data)).read_all().to_pandas()
+
+@pytest.mark.parametrize("fmt", [fmt for fmt, (extension, _) in EXPORT_FORMATS.items() if extension == "zip"])
+def test_archives_read_back_in_chunks(monkeypatch, fmt):
+    monkeypatch.setattr(version_comparator, "EXPORT_CHUNK_ROWS", 2)
+    output = io.BytesIO()
+    write_archive({**RESULTS, "Labels/Counts": CHANGELOG}, output, fmt)
+    with zipfile.ZipFile(output) as archive:
+        assert archive.namelist() == [f"{name}.{fmt}" for name in ("summary", "Labels", "Labels_Counts")]
+        entries = {name: _read_entry(archive.read(name), fmt) for name in archive.namelist()}
+    pd.testing.assert_frame_equal(entries[f"Labels.{fmt}"], CHANGELOG)
+    pd.testing.assert_frame_equal(entries[f"Labels_Counts.{fmt}"], CHANGELOG)
+    summary = entries[f"summary.{fmt}"].astype(str)
+    assert summary.values.tolist() == [["Old version", "1.0", "10"], ["New version", "1.1", "12"]]
+
+@pytest.mark.parametrize("fmt", EXPORT_FORMATS)
+def test_every_export_format_is_a_file_of_its_kind(fmt):
+    checker = DeltaChecker({"endpoints": {}})
+    checker.results = dict(RESULTS)
+    data = checker.export(fmt).getvalue()
+    # Workbooks are zip files too.
+    assert zipfile.is_zipfile(io.BytesIO(data))
+    assert (EXPORT_FORMATS[fmt][0] == "xlsx") == ("xl/workbook.xml" in zipfile.ZipFile(io.BytesIO(data)).namelist())
+
+def test_unknown_archive_formats_are_rejected():
+    with pytest.raises(ValueError):
+        write_archive(RESULTS, io.BytesIO(), "json")
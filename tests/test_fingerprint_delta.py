@@ -0,0 +1,77 @@
+import logging
+import threading
+
+import pytest
+from rdflib import BNode, Graph, Literal, Namespace
+from rdflib.namespace import XSD
+from version_comparator import DeltaChecker, read_csv_stream
+
+EX = Namespace("http://example.org/")
+QUERY = "SELECT ?key ?value WHERE { ?s <http://example.org/key> ?key . ?s <http://example.org/value> ?value }"
+OPTIONAL_KEY_QUERY = "SELECT ?key ?value WHERE { ?s <http://example.org/value> ?value . OPTIONAL { ?s <http://example.org/key> ?key } }"
+
+class GraphChecker(DeltaChecker):
+    """Answers queries from in-memory graphs, through the same CSV parsing as an endpoint."""
+    def __init__(self, config, old, new) -> None:
+        super().__init__(config)
+        self.graphs = {True: old, False: new}
+        self.queries = []
+        self._lock = threading.Lock()  # rdflib's query parser is not thread-safe
+
+    def execute_query(self, query, old=True, page_size=None):
+        with self._lock:
+            self.queries.append(query)
+            data = self.graphs[old].query(query).serialize(format="csv")
+        return read_csv_stream([data])
+
+def _graph(rows):
+    g = Graph()
+    for i, (key, value) in enumerate(rows):
+        s = EX[f"s{i}"]
+        if key is not None:
+            g.add((s, EX.key, key))
+        g.add((s, EX.value, Literal(value)))
+    return g
+
+KEYS = [EX.iri, Literal("5", datatype=XSD.integer), Literal("naam", lang="nl"), Literal("1.50", datatype=XSD.decimal),
+        Literal("true", datatype=XSD.boolean), Literal("2024-01-01", datatype=XSD.date), Literal('say "hi"\nthere')]
+
+def _delta(tmp_path, query, old, new, diff_mode, **config):
+    query_file = tmp_path / "query.sparql"
+    query_file.write_text(query)
+    config = {"endpoints": {"old": {"url": "old"}, "new": {"url": "new"}}, "diff_mode": diff_mode, **config}
+    checker = GraphChecker(config, old, new)
+    changelog = checker._changelog(checker.delta_query({"file": str(query_file), "columns": ["key"]}))
+    return checker, sorted(map(tuple, changelog[["key", "changeStatus"]].fillna("").astype(str).to_numpy()))
+
+def test_typed_and_language_tagged_keys_are_fetched_by_term(tmp_path):
+    old = _graph([(key, "a") for key in KEYS] + [(EX.gone, "a")])
+    new = _graph([(key, "b") for key in KEYS[:3]] + [(key, "a") for key in KEYS[3:]] + [(EX.added, "a")])
+    checker, fingerprinted = _delta(tmp_path, QUERY, old, new, "fingerprint")
+    _, full = _delta(tmp_path, QUERY, old, new, "full")
+    assert fingerprinted == full
+    statuses = [status for _, status in fingerprinted]
+    assert statuses.count("MODIFIED") == 3 and statuses.count("UNCHANGED") == 4
+    assert statuses.count("NEW") == 1 and statuses.count("DELETED") == 1
+    # Fingerprints, then one batch of changed keys per side; no fallback to a full fetch.
+    assert len(checker.queries) == 4
+
+@pytest.mark.parametrize("key", [BNode(), None], ids=["blank node", "unbound"])
+def test_keys_that_cannot_be_bound_fall_back_to_a_full_comparison(tmp_path, caplog, key):
+    old = _graph([(EX.kept, "a"), (key, "a")])
+    new = _graph([(EX.kept, "a"), (key, "b")])
+    with caplog.at_level(logging.WARNING):
+        _, fingerprinted = _delta(tmp_path, OPTIONAL_KEY_QUERY, old, new, "fingerprint")
+    _, full = _delta(tmp_path, OPTIONAL_KEY_QUERY, old, new, "full")
+    assert fingerprinted == full
+    assert "comparing it in full" in caplog.text
+
+def test_only_the_fingerprints_are_cached(tmp_path, monkeypatch):
+    old = _graph([(key, "a") for key in KEYS])
+    new = _graph([(key, "b") for key in KEYS[:2]] + [(key, "a") for key in KEYS[2:]])
+    monkeypatch.setattr(GraphChecker, "version", lambda self, old=True: "1.0" if old else "1.1")
+    cache = {"dir": str(tmp_path / "cache"), "sides": ["old", "new"]}
+    checker, _ = _delta(tmp_path, QUERY, old, new, "fingerprint", cache=cache)
+    # The VALUES batches of changed keys are fetched, but only the two fingerprint results are stored.
+    assert len(checker.queries) == 4
+    assert len(list((tmp_path / "cache").iterdir())) == 2
@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+from gis_visualization import parse_wkt
+
+def test_points_lines_and_polygons():
+    frame = parse_wkt(pd.Series([
+        "POINT (5.1 52.2)",
+        "<http://www.opengis.net/def/crs/EPSG/0/4326> point z (5 52 1)",
+        "LINESTRING (1 2, 3 4, 5 6)",
+        "POLYGON ((0 0, 4 0, 4 4, 0 0), (1 1, 2 1, 2 2, 1 1))",
+        "POINT(-1.5e1 .5)",
+    ]))
+    assert frame["kind"].tolist() == ["POINT", "POINT", "LINESTRING", "POLYGON", "POINT"]
+    assert frame[["lon", "lat"]].values.tolist() == [[5.1, 52.2], [5, 52], [1, 2], [0, 0], [-15, 0.5]]
+    assert frame.loc[2, "coordinates"] == [[1, 2], [3, 4], [5, 6]]
+    assert frame.loc[3, "coordinates"] == [[[0, 0], [4, 0], [4, 4], [0, 0]], [[1, 1], [2, 1], [2, 2], [1, 1]]]
+    assert np.isnan(frame.loc[[0, 1, 4], "coordinates"].astype(float)).all()
+
+def test_unsupported_and_invalid_geometries_are_dropped():
+    frame = parse_wkt(pd.Series(["MULTIPOINT ((1 2))", "POINT (x y)", "", "LINESTRING (1 2, 3 4)"], index=[10, 11, 12, 13]))
+    assert frame.index.tolist() == [13]
+    assert frame.loc[13, "coordinates"] == [[1, 2], [3, 4]]
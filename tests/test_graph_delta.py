@@ -0,0 +1,46 @@
+from rdflib import BNode, Graph, Namespace
+from graph_delta import blank_node_keys, graph_delta, relabel_blank_nodes
+
+EX = Namespace("http://example.org/")
+DATA = """@prefix ex: <http://example.org/> .
+ex:bridge ex:location [ ex:wkt "POINT (5 52)" ; ex:crs [ ex:code "4326" ] ] ;
+    ex:parts ( ex:deck ex:pier ) .
+ex:road ex:location [ ex:wkt "POINT (6 52)" ] .
+"""
+
+def _parse(data=DATA):
+    return Graph().parse(data=data, format="turtle")
+
+def test_keys_do_not_depend_on_blank_node_labels():
+    first, second = _parse(), _parse()
+    assert not {n for n in first.all_nodes() if isinstance(n, BNode)} & set(second.all_nodes())
+    assert sorted(blank_node_keys(first).values()) == sorted(blank_node_keys(second).values())
+
+def test_relabelled_reparse_has_no_delta():
+    previous, current = _parse(), _parse()
+    keys = relabel_blank_nodes(current, blank_node_keys(current), blank_node_keys(previous))
+    assert graph_delta(previous, current) == (set(), set())
+    assert keys == blank_node_keys(current)
+
+def test_a_changed_blank_node_shows_up_in_the_delta():
+    previous, current = _parse(), _parse(DATA.replace("POINT (6 52)", "POINT (7 52)"))
+    relabel_blank_nodes(current, blank_node_keys(current), blank_node_keys(previous))
+    removed, added = graph_delta(previous, current)
+    # The changed blank node is new, with the triple pointing at it; the untouched ones were matched.
+    assert sorted(str(o) for _, _, o in removed if not isinstance(o, BNode)) == ["POINT (6 52)"]
+    assert sorted(str(o) for _, _, o in added if not isinstance(o, BNode)) == ["POINT (7 52)"]
+    assert {s for s, _, o in removed if isinstance(o, BNode)} == {EX.road}
+    assert len(removed) == len(added) == 2
+
+def test_ambiguous_blank_nodes_keep_their_labels():
+    data = "@prefix ex: <http://example.org/> . ex:a ex:p [ ex:v 1 ] , [ ex:v 1 ] ."
+    previous, current = _parse(data), _parse(data)
+    before = set(current)
+    relabel_blank_nodes(current, blank_node_keys(current), blank_node_keys(previous))
+    assert set(current) == before
+
+def test_cycles_have_no_keys():
+    graph, a, b = Graph(), BNode(), BNode()
+    graph.add((a, EX.p, b))
+    graph.add((b, EX.p, a))
+    assert blank_node_keys(graph) is None
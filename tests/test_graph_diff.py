@@ -0,0 +1,59 @@
+import gzip
+import io
+
+import graph_diff
+from graph_diff import graph_diff as diff, write_diff
+
+OLD = """<http://example.org/a> <http://example.org/p> "1" .
+<http://example.org/a> <http://example.org/q> _:x .
+_:x <http://example.org/wkt> "POINT (5 52)" .
+_:x <http://example.org/crs> _:y .
+_:y <http://example.org/code> "4326" .
+<http://example.org/b> <http://example.org/p> "line\\nbreak"@nl .
+<http://example.org/c> <http://example.org/p> "2"^^<http://www.w3.org/2001/XMLSchema#integer> .
+"""
+
+def _write(tmp_path, name, text, gzipped=False):
+    path = tmp_path / name
+    path.write_bytes(gzip.compress(text.encode()) if gzipped else text.encode())
+    return str(path)
+
+def _changes(tmp_path, old, new, **kwargs):
+    return sorted((subject, sorted(removed), sorted(added)) for subject, removed, added in
+                  diff(_write(tmp_path, "old.nt", old), _write(tmp_path, "new.nt", new, **kwargs), str(tmp_path), run_records=2))
+
+def test_relabelled_blank_nodes_are_not_changes(tmp_path):
+    relabelled = OLD.replace("_:x", "_:n1").replace("_:y", "_:n2")
+    assert _changes(tmp_path, OLD, relabelled) == []
+
+def test_a_changed_triple_is_reported_under_its_subject(tmp_path):
+    new = OLD.replace('"2"', '"3"').replace("<http://example.org/b>", "<http://example.org/d>")
+    integer = "<http://www.w3.org/2001/XMLSchema#integer>"
+    assert _changes(tmp_path, OLD, new, gzipped=True) == sorted([
+        ("<http://example.org/b>", ['<http://example.org/b> <http://example.org/p> "line\\nbreak"@nl .'], []),
+        ("<http://example.org/c>", [f'<http://example.org/c> <http://example.org/p> "2"^^{integer} .'],
+                                   [f'<http://example.org/c> <http://example.org/p> "3"^^{integer} .']),
+        ("<http://example.org/d>", [], ['<http://example.org/d> <http://example.org/p> "line\\nbreak"@nl .']),
+    ])
+
+def test_a_change_inside_a_blank_node_relabels_the_nodes_that_reach_it(tmp_path):
+    new = OLD.replace('"4326"', '"28992"').replace("_:x", "_:n1").replace("_:y", "_:n2")
+    changes = _changes(tmp_path, OLD, new)
+    removed = [line for _, lines, _ in changes for line in lines]
+    added = [line for _, _, lines in changes for line in lines]
+    # The changed node, the blank node above it and the IRI subject that points to them.
+    assert len(removed) == len(added) == 4
+    assert any('"4326"' in line for line in removed) and any('"28992"' in line for line in added)
+    assert "<http://example.org/a>" in [subject for subject, _, _ in changes]
+
+def test_sorting_in_several_merge_passes_gives_the_same_diff(tmp_path, monkeypatch):
+    new = OLD.replace('"1"', '"one"')
+    expected = _changes(tmp_path, OLD, new)
+    monkeypatch.setattr(graph_diff, "MERGE_FAN_IN", 2)
+    assert _changes(tmp_path, OLD, new) == expected
+
+def test_write_diff_counts(tmp_path):
+    output = io.StringIO()
+    changes = diff(_write(tmp_path, "old.nt", OLD), _write(tmp_path, "new.nt", OLD.replace('"1"', '"one"')), str(tmp_path))
+    assert write_diff(changes, output) == (1, 1, 1)
+    assert output.getvalue().startswith("# <http://example.org/a>\n- ")
@@ -0,0 +1,82 @@
+import sqlite3
+import subprocess
+import sys
+
+from job_runner import JobStore, job_key
+
+KEY = job_key("comparison", {"config": {"endpoints": ["old", "new"]}})
+
+def _set(store, **values):
+    # Rewrites the job row directly, as another (possibly dead) process would have left it.
+    columns = ", ".join(f"{name} = ?" for name in values)
+    with sqlite3.connect(store.path) as db:
+        db.execute(f"UPDATE jobs SET {columns} WHERE key = ?", (*values.values(), KEY))
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+def test_job_keys_depend_on_the_inputs_not_their_order():
+    assert job_key("comparison", {"a": 1, "b": 2}) == job_key("comparison", {"b": 2, "a": 1})
+    assert job_key("comparison", {"a": 1}) != job_key("validation", {"a": 1})
+
+def test_an_active_job_is_shared_instead_of_queued_again(tmp_path):
+    store = JobStore(tmp_path)
+    assert store.claim(KEY, "comparison")
+    assert not store.claim(KEY, "comparison")
+    store.progress(KEY, 0.5, "Halfway")
+    # Another process opening the same directory sees the running job.
+    assert not JobStore(tmp_path).claim(KEY, "comparison")
+    job = store.get(KEY)
+    assert (job["status"], job["progress"], job["message"]) == ("running", 0.5, "Halfway")
+
+def test_a_finished_job_is_shared_until_its_result_expires(tmp_path):
+    store = JobStore(tmp_path)
+    store.claim(KEY, "comparison")
+    store.finish(KEY, {"report": b"xlsx"})
+    assert not store.claim(KEY, "comparison", ttl=60)
+    assert store.result(KEY) == {"report": b"xlsx"}
+    _set(store, updated=store.get(KEY)["updated"] - 61)
+    assert store.claim(KEY, "comparison", ttl=60)
+    assert store.get(KEY)["status"] == "queued"
+
+def test_a_finished_job_without_its_result_is_run_again(tmp_path):
+    store = JobStore(tmp_path)
+    store.claim(KEY, "comparison")
+    store.finish(KEY, "result")
+    (tmp_path / f"{KEY}.result").unlink()
+    assert store.claim(KEY, "comparison")
+
+def test_a_failed_job_is_replaced(tmp_path):
+    store = JobStore(tmp_path)
+    store.claim(KEY, "comparison")
+    store.fail(KEY, "ValueError: no endpoint")
+    assert store.claim(KEY, "comparison")
+    job = store.get(KEY)
+    assert (job["status"], job["error"]) == ("queued", None)
+
+def test_a_job_whose_owner_died_is_taken_over(tmp_path):
+    store = JobStore(tmp_path)
+    store.claim(KEY, "comparison")
+    store.progress(KEY, 0.3)
+    _set(store, owner=_dead_pid())
+    assert store.claim(KEY, "comparison")
+    assert store.get(KEY)["status"] == "queued"
+
+def test_a_job_whose_owner_died_is_reported_as_failed(tmp_path):
+    store = JobStore(tmp_path)
+    store.claim(KEY, "comparison")
+    _set(store, owner=_dead_pid())
+    assert store.get(KEY)["status"] == "failed"
+    assert "interrupted" in store.get(KEY)["error"]
+
+def test_purge_keeps_active_and_recent_jobs(tmp_path):
+    store = JobStore(tmp_path)
+    store.claim(KEY, "comparison")
+    store.finish(KEY, "result")
+    store.purge(retention=60)
+    assert store.get(KEY) is not None
+    _set(store, updated=0)
+    store.purge(retention=60)
+    assert store.get(KEY) is None and not (tmp_path / f"{KEY}.result").exists()
@@ -0,0 +1,61 @@
+import re
+import pytest
+import requests
+from laces_engine import LacesEngine
+
+TEMPLATE = "SELECT ?name WHERE { <{spec_uri}> <http://example.org/name> ?name }"
+URIS = [f"http://example.org/spec/{i}" for i in range(8)]
+
+def _http_error(status, text=""):
+    response = requests.Response()
+    response.status_code, response._content = status, text.encode()
+    return requests.exceptions.HTTPError(f"{status} error", response=response)
+
+class Endpoint():
+    """Stands in for LacesEngine._bindings: raises `error` for chunks larger than `max_chunk`."""
+    def __init__(self, error, max_chunk=0) -> None:
+        self.error = error
+        self.max_chunk = max_chunk
+        self.chunks = []
+
+    def __call__(self, endpoint, user, password, query, keys, page_size=None):
+        uris = [uri for uri in URIS if f"<{uri}>" in query]
+        self.chunks.append(len(uris))
+        if len(uris) > self.max_chunk:
+            raise self.error
+        return [{"name": uri.rsplit("/", 1)[1], "spec_uri": uri} for uri in uris]
+
+def _grouped(monkeypatch, endpoint):
+    monkeypatch.setattr(LacesEngine, "_bindings", endpoint)
+    return LacesEngine.retrieve_grouped("http://endpoint", "", "", TEMPLATE, ("name",), URIS, batch_size=8)
+
+@pytest.mark.parametrize("error", [_http_error(413), _http_error(414), _http_error(400, "Query too long"),
+                                   requests.exceptions.ReadTimeout("timed out")], ids=["413", "414", "400", "timeout"])
+def test_chunks_rejected_as_too_large_are_halved(monkeypatch, error):
+    endpoint = Endpoint(error, max_chunk=2)
+    grouped = _grouped(monkeypatch, endpoint)
+    assert grouped == {uri: [{"name": uri.rsplit("/", 1)[1]}] for uri in URIS}
+    assert endpoint.chunks == [8, 4, 2, 2, 2, 2]
+
+@pytest.mark.parametrize("error", [_http_error(401), _http_error(400, "Syntax error"),
+                                   requests.exceptions.ConnectionError("refused")], ids=["401", "400", "connection"])
+def test_other_errors_are_raised_at_once(monkeypatch, error):
+    endpoint = Endpoint(error)
+    with pytest.raises(type(error)):
+        _grouped(monkeypatch, endpoint)
+    assert endpoint.chunks == [8]
+
+def test_retrieve_objects_fetches_in_pages_with_a_page_size(monkeypatch):
+    uris = [{"uri": {"value": uri}} for uri in URIS]
+    queries = []
+    def select(endpoint, user, password, query):
+        queries.append(query)
+        if "COUNT(*)" in query:
+            return ["_count"], [{"_count": {"value": str(len(uris))}}]
+        limit, offset = map(int, re.search(r"LIMIT (\d+) OFFSET (\d+)", query).groups())
+        return ["uri"], uris[offset:offset + limit]
+    monkeypatch.setattr(LacesEngine, "_select", select)
+    query = "SELECT ?uri WHERE { ?uri a <http://example.org/Spec> }"
+    objects = LacesEngine.retrieve_objects("http://endpoint", "", "", query, ("uri",), page_size=3)
+    assert objects == [{"uri": uri} for uri in URIS]
+    assert len(queries) == 4  # the first page, the count and two more pages
@@ -0,0 +1,75 @@
+import logging
+import re
+
+import pytest
+from pagination import fetch_paginated
+
+QUERY = "SELECT ?s ?o WHERE { ?s ?p ?o }"
+
+class Endpoint():
+    """Answers page and count queries over `rows` results, returning at most `cap` rows per request."""
+    def __init__(self, rows, cap=None, counted=None) -> None:
+        self.rows = list(range(rows))
+        self.cap = cap
+        self.counted = rows if counted is None else counted
+        self.requests = []
+
+    def run(self, query):
+        self.requests.append(query)
+        match = re.search(r"LIMIT (\d+) OFFSET (\d+)", query)
+        rows = self.rows[int(match.group(2)):int(match.group(2)) + int(match.group(1))] if match else self.rows
+        return rows[:self.cap] if self.cap else rows
+
+    def count(self, query):
+        self.requests.append(query)
+        assert "COUNT(*)" in query
+        return self.counted
+
+def _fetch(endpoint, page_size, **kwargs):
+    pages = fetch_paginated(QUERY, endpoint.run, endpoint.count, page_size, max_workers=2, retries=0, **kwargs)
+    return [row for page in pages for row in page]
+
+def test_without_a_page_size_the_query_is_sent_as_is():
+    endpoint = Endpoint(25)
+    assert _fetch(endpoint, None) == list(range(25))
+    assert endpoint.requests == [QUERY]
+
+def test_full_pages_are_counted_and_fetched_in_order():
+    endpoint = Endpoint(25)
+    assert _fetch(endpoint, 10) == list(range(25))
+    assert len(endpoint.requests) == 4
+
+def test_a_cap_below_the_page_size_is_detected_from_the_count():
+    endpoint = Endpoint(25, cap=7)
+    assert _fetch(endpoint, 10) == list(range(25))
+
+def test_a_short_complete_first_page_needs_one_count():
+    endpoint = Endpoint(5)
+    assert _fetch(endpoint, 10) == list(range(5))
+    assert len(endpoint.requests) == 2
+
+def test_empty_results_are_not_counted():
+    endpoint = Endpoint(0)
+    assert _fetch(endpoint, 10) == []
+    assert len(endpoint.requests) == 1
+
+def test_a_configured_cap_limits_the_page_size_and_skips_the_count_of_short_pages():
+    endpoint = Endpoint(25, cap=7)
+    assert _fetch(endpoint, 10, max_rows=7) == list(range(25))
+    assert all("LIMIT 7 " in query or "LIMIT 4 " in query for query in endpoint.requests if "LIMIT" in query)
+    endpoint = Endpoint(5, cap=7)
+    assert _fetch(endpoint, 10, max_rows=7) == list(range(5))
+    assert len(endpoint.requests) == 1
+
+@pytest.mark.parametrize("rows, counted", [(25, 30), (5, 3)])
+def test_a_count_that_does_not_match_the_rows_is_reported(caplog, rows, counted):
+    endpoint = Endpoint(rows, counted=counted)
+    with caplog.at_level(logging.WARNING):
+        _fetch(endpoint, 10)
+    assert f"endpoint counted {counted}" in caplog.text
+
+def test_unpageable_queries_are_sent_as_is():
+    endpoint = Endpoint(25)
+    query = QUERY + " LIMIT 3"
+    fetch_paginated(query, endpoint.run, endpoint.count, 10)
+    assert endpoint.requests == [query]
@@ -0,0 +1,51 @@
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+from perf_trace import Trace, add_bytes, propagate, stage
+
+def _fetch(name, size):
+    with stage("fetch", name):
+        add_bytes(size)
+        add_bytes(size)
+
+def test_stages_in_worker_threads_join_the_callers_trace_through_propagate():
+    trace = Trace("Comparison")
+    with trace.activate(), stage("compare", "all queries"):
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            for future in [executor.submit(propagate(_fetch), f"query {i}", 10) for i in range(8)]:
+                future.result()
+            # Without propagate the worker thread has no trace.
+            executor.submit(_fetch, "lost", 10).result()
+    rows = trace.rows()
+    fetches = [row for row in rows if row["stage"] == "fetch"]
+    assert sorted(row["detail"] for row in fetches) == [f"query {i}" for i in range(8)]
+    assert all(row["parent"] == "compare" and row["bytes"] == 20 for row in fetches)
+    assert [row for row in rows if row["stage"] == "compare"][0]["bytes"] == 160
+
+def test_add_bytes_accumulates_in_every_open_stage():
+    trace = Trace("Validation")
+    with trace.activate():
+        with stage("load shapes") as outer:
+            add_bytes(5)
+            with stage("construct") as inner:
+                for _ in range(3):
+                    add_bytes(100)
+        with stage("report table") as other:
+            pass
+    assert (outer.bytes, inner.bytes, other.bytes) == (305, 300, 0)
+    assert [row["parent"] for row in trace.rows()] == [None, "load shapes", None]
+
+def test_stages_outside_a_trace_are_not_recorded():
+    with stage("fetch") as current:
+        add_bytes(10)
+        current.rows = 3
+    assert current.bytes == 0
+
+def test_a_pickled_trace_keeps_its_stages_and_profile():
+    trace = Trace("Comparison", profile=True)
+    with trace.activate(), stage("compare") as current:
+        current.rows = 3
+        sum(range(1000))
+    copy = pickle.loads(pickle.dumps(trace))
+    assert copy.rows() == trace.rows() and copy.seconds == trace.seconds
+    assert copy.profile is None and "function calls" in copy.profile_text()
@@ -0,0 +1,64 @@
+import gzip
+
+import pytest
+import rdf_loader
+from rdflib import BNode, Graph, URIRef
+from rdflib.compare import isomorphic
+from rdf_loader import GraphCache, load_rdf, parse_rdf, rdf_format
+
+EX = "http://example.org/"
+
+def _statements(graph=""):
+    # Blank node labels recur far apart, so a chunk boundary separates their uses.
+    lines = []
+    for i in range(60):
+        lines.append(f'<{EX}s{i}> <{EX}value> "{i}" {graph}.')
+        lines.append(f'<{EX}s{i}> <{EX}location> _:loc{i % 7} {graph}.')
+        lines.append(f'_:loc{i % 7} <{EX}wkt> "POINT ({i % 7} 52)" {graph}.')
+    lines.append(f'_:a <{EX}next> _:b {graph}.')
+    lines.append(f'_:b <{EX}next> _:a {graph}.')
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+NT = _statements()
+NQ = _statements(f"<{EX}graph1> ") + _statements(f"<{EX}graph2> ").replace(b"_:loc", b"_:other")
+
+@pytest.fixture
+def chunked(monkeypatch):
+    # Small documents are split into a handful of chunks, parsed by two workers.
+    monkeypatch.setattr(rdf_loader, "PARALLEL_MIN_BYTES", 0)
+    monkeypatch.setattr(rdf_loader, "CHUNK_BYTES", 1024)
+    assert len(list(rdf_loader._chunks(NT, rdf_loader.CHUNK_BYTES))) > 3
+
+def _bnodes(graph):
+    return {term for triple in graph for term in triple if isinstance(term, BNode)}
+
+@pytest.mark.parametrize("data, fmt", [(NT, "nt"), (gzip.compress(NT), "nt"), (NQ, "nquads")], ids=["nt", "nt.gz", "nquads"])
+def test_parallel_parses_match_a_single_threaded_parse(chunked, data, fmt):
+    expected = parse_rdf(data, fmt, workers=1)
+    actual = parse_rdf(data, fmt, workers=2)
+    assert len(actual) == len(expected)
+    assert isomorphic(actual, expected)
+
+def test_blank_node_labels_stay_distinct_across_chunks(chunked):
+    graph = parse_rdf(NT, "nt", workers=2)
+    # Seven location labels and _:a and _:b, each one node in every chunk that uses it.
+    assert len(_bnodes(graph)) == 9
+    for i in range(60):
+        location = graph.value(URIRef(f"{EX}s{i}"), URIRef(f"{EX}location"))
+        assert len(list(graph.objects(location, URIRef(f"{EX}wkt")))) == 1
+
+def test_separate_documents_do_not_share_blank_nodes(chunked):
+    first, second = parse_rdf(NT, "nt", workers=2), parse_rdf(NT, "nt", workers=2)
+    assert not _bnodes(first) & _bnodes(second)
+
+def test_formats_follow_the_file_name():
+    assert [rdf_format(name) for name in ("data.nt", "data.NQ.gz", "data.ttl", "data.rdf")] == ["nt", "nquads", "turtle", "turtle"]
+
+def test_cached_graphs_load_like_the_parsed_graph(tmp_path):
+    cache = GraphCache(tmp_path)
+    turtle = f"@prefix ex: <{EX}> .\nex:s ex:location [ ex:wkt \"POINT (5 52)\" ] .\n".encode("utf-8")
+    parsed = load_rdf(turtle, "data.ttl", cache=cache)
+    cached = load_rdf(turtle, "data.ttl", cache=cache)
+    assert cached is not parsed and isomorphic(cached, parsed)
+    assert dict(cached.namespaces())["ex"] == URIRef(EX)
+    assert isomorphic(parsed, Graph().parse(data=turtle, format="turtle"))
@@ -0,0 +1,56 @@
+import os
+
+import pandas as pd
+from result_cache import ResultCache, normalize_query
+
+QUERY = """# Objects and their labels
+SELECT ?s ?label
+WHERE {
+    ?s <http://www.w3.org/2000/01/rdf-schema#label> ?label .  # every object
+}"""
+
+def _frame(n):
+    return pd.DataFrame({"s": [f"http://example.org/{i}" for i in range(n)], "label": [f"label {i}" for i in range(n)]})
+
+def _age(cache, key, seconds_ago):
+    # The modification time is the LRU clock.
+    path = cache._path(key)
+    os.utime(path, (os.path.getatime(path), os.path.getmtime(path) - seconds_ago))
+
+def test_keys_ignore_comment_lines_and_whitespace():
+    reformatted = "SELECT ?s ?label WHERE {\n  ?s <http://www.w3.org/2000/01/rdf-schema#label> ?label .  # every object\n}"
+    assert normalize_query(QUERY) == normalize_query(reformatted)
+    assert ResultCache.key("http://endpoint", QUERY, "1.0") == ResultCache.key("http://endpoint", reformatted, "1.0")
+
+def test_keys_depend_on_the_endpoint_query_and_version():
+    key = ResultCache.key("http://endpoint", QUERY, "1.0")
+    assert key != ResultCache.key("http://other", QUERY, "1.0")
+    assert key != ResultCache.key("http://endpoint", QUERY.replace("?label", "?name"), "1.0")
+    assert key != ResultCache.key("http://endpoint", QUERY, "1.1")
+
+def test_a_stored_result_is_a_hit_and_another_version_a_miss(tmp_path):
+    cache = ResultCache(tmp_path)
+    cache.put(ResultCache.key("http://endpoint", QUERY, "1.0"), _frame(3))
+    pd.testing.assert_frame_equal(cache.get(ResultCache.key("http://endpoint", QUERY, "1.0")), _frame(3))
+    assert cache.get(ResultCache.key("http://endpoint", QUERY, "1.1")) is None
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+def test_the_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResultCache(tmp_path)
+    keys = [ResultCache.key("http://endpoint", QUERY, f"1.{i}") for i in range(3)]
+    for age, key in zip((30, 20, 10), keys):
+        cache.put(key, _frame(100))
+        _age(cache, key, age)
+    size = os.path.getsize(cache._path(keys[0]))
+    assert cache.get(keys[0]) is not None  # now the most recently used
+    cache.max_bytes = 2 * size + size // 2
+    cache.evict()
+    assert [cache.get(key) is not None for key in keys] == [True, False, True]
+
+def test_an_unreadable_entry_is_discarded(tmp_path):
+    cache = ResultCache(tmp_path)
+    key = ResultCache.key("http://endpoint", QUERY, "1.0")
+    with open(cache._path(key), "wb") as f:
+        f.write(b"not parquet")
+    assert cache.get(key) is None
+    assert not os.path.exists(cache._path(key))
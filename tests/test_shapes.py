@@ -0,0 +1,119 @@
+import io
+import threading
+
+import pytest
+import requests
+import shapes_source
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.compare import isomorphic
+from rdflib.namespace import OWL, RDF, SH
+from shapes_cache import ShapesCache
+from shapes_source import _owned, fetch_shapes, ontology_version
+
+PREFIXES = """@prefix ex: <http://example.org/> .
+@prefix sh: <http://www.w3.org/ns/shacl#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+@prefix owl: <http://www.w3.org/2002/07/owl#> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+"""
+SHAPES = """
+ex:AssetShape a sh:NodeShape ; sh:targetClass ex:Asset ;
+    sh:property [ sh:path ex:location ; sh:node ex:LocationShape ] ;
+    sh:property [ sh:path ( ex:part ex:name ) ; sh:in ( "a" "b" ) ] .
+ex:LocationShape a sh:NodeShape ; sh:property [ sh:path ex:wkt ; sh:datatype xsd:string ] .
+[] a sh:NodeShape ; sh:targetClass ex:Bridge ; sh:property [ sh:path rdfs:label ; sh:minCount 1 ] .
+"""
+HIERARCHY = """
+ex:Asset a owl:Class .
+ex:Bridge rdfs:subClassOf ex:Asset .
+ex:Viaduct rdfs:subClassOf ex:Bridge .
+"""
+# Neither shapes nor classes the shapes need.
+UNRELATED = """
+<http://example.org/otl> a owl:Ontology ; owl:versionInfo "1.0" .
+ex:Tunnel rdfs:subClassOf ex:Structure .
+ex:b1 a ex:Bridge ; rdfs:label "bridge" ; ex:location [ ex:wkt "POINT (5 52)" ] .
+"""
+
+OTL = URIRef("http://example.org/otl")
+
+def _graph(turtle):
+    return Graph().parse(data=PREFIXES + turtle, format="turtle")
+
+class Client():
+    """Stands in for the SparqlClient: answers queries from one rdflib graph, as JSON results or N-Triples."""
+    def __init__(self, store) -> None:
+        self.store = store
+        self.queries = []
+        self._lock = threading.Lock()  # rdflib's query parser is not thread-safe
+
+    def query(self, url, query, accept, stream=False, **kwargs):
+        with self._lock:
+            self.queries.append(query)
+            result = self.store.query(query)
+            body = result.serialize(format="nt" if result.type == "CONSTRUCT" else "json")
+        response = requests.Response()
+        response.status_code, response.url, response.raw = 200, url, io.BytesIO(body)
+        response.headers["Content-Type"] = "application/n-triples" if result.type == "CONSTRUCT" else "application/sparql-results+json"
+        return response
+
+    def iter_content(self, response):
+        return response.iter_content(chunk_size=64)
+
+@pytest.fixture
+def endpoint(monkeypatch):
+    client = Client(_graph(SHAPES + HIERARCHY + UNRELATED))
+    monkeypatch.setattr(shapes_source, "get_client", lambda: client)
+    return client
+
+@pytest.mark.parametrize("batch_size", [1, 200])
+def test_only_shapes_and_their_class_hierarchy_are_fetched(endpoint, batch_size):
+    fetched = fetch_shapes("http://endpoint", batch_size=batch_size, page_size=2, max_workers=2)
+    assert isomorphic(fetched, _graph(SHAPES + HIERARCHY))
+
+def test_a_batch_owns_its_roots_and_unreferenced_blank_nodes():
+    # The CONSTRUCT of ex:AssetShape also returns ex:LocationShape, which sh:node points to.
+    batch = _graph(SHAPES)
+    owned = Graph()
+    for triple in _owned(batch, [URIRef("http://example.org/AssetShape")]):
+        owned.add(triple)
+    assert not any(owned.triples((URIRef("http://example.org/LocationShape"), None, None)))
+    # ex:LocationShape's property shape is referenced, so it is not a root; the targeted blank shape is.
+    assert len(set(owned.objects(None, SH.path))) == 3
+    blank_roots = {s for s in owned.subjects(SH.targetClass) if isinstance(s, BNode)}
+    assert len(blank_roots) == 1
+    assert isomorphic(owned, _graph(SHAPES.replace("ex:LocationShape a sh:NodeShape ; sh:property [ sh:path ex:wkt ; sh:datatype xsd:string ] .", "")))
+
+def test_the_ontology_version_identifies_the_store(endpoint):
+    assert ontology_version("http://endpoint") == "1.0"
+    extension = URIRef("http://example.org/extension")
+    endpoint.store.add((extension, RDF.type, OWL.Ontology))
+    endpoint.store.add((extension, OWL.versionIRI, URIRef("http://example.org/extension/2.0")))
+    # SPARQL orders IRIs before literals.
+    assert ontology_version("http://endpoint") == "http://example.org/extension/2.0 1.0"
+
+def _prepare(cache, endpoint, loads):
+    # How the validation job keys the shapes of an endpoint.
+    version = ontology_version("http://endpoint")
+    key = ShapesCache.version_key("http://endpoint", version) if version else None
+    return cache.prepare(key, lambda: loads.append(version) or _graph(SHAPES))
+
+def test_cached_shapes_are_reloaded_when_the_ontology_version_changes(tmp_path, endpoint):
+    loads = []
+    cache = ShapesCache(tmp_path)
+    first = _prepare(cache, endpoint, loads)
+    assert _prepare(cache, endpoint, loads) is first
+    # A new process reads the prepared shapes back from disk.
+    assert isomorphic(_prepare(ShapesCache(tmp_path), endpoint, loads).graph, first.graph)
+    assert loads == ["1.0"]
+    endpoint.store.set((OTL, OWL.versionInfo, Literal("1.1")))
+    assert _prepare(cache, endpoint, loads) is not first
+    assert loads == ["1.0", "1.1"]
+    assert cache.stats() == {"hits": 1, "misses": 2}
+
+def test_shapes_without_a_version_are_not_cached(tmp_path, endpoint):
+    endpoint.store.remove((OTL, OWL.versionInfo, None))
+    loads, cache = [], ShapesCache(tmp_path)
+    _prepare(cache, endpoint, loads)
+    _prepare(cache, endpoint, loads)
+    assert loads == [None, None] and not list(tmp_path.iterdir())
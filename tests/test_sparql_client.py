@@ -0,0 +1,61 @@
+import contextlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from sparql_client import SparqlClient
+
+BODY = b"x" * 100_000
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def url():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/"
+    httpd.shutdown()
+    httpd.server_close()
+
+@contextlib.contextmanager
+def _second_request_waits(client, url):
+    with ThreadPoolExecutor(1) as executor:
+        future = executor.submit(client.get, url)
+        with pytest.raises(TimeoutError):
+            future.result(timeout=0.3)
+        yield
+        assert future.result(timeout=5).content == BODY
+
+@pytest.mark.parametrize("finish", ["close", "read", "iter_content"])
+def test_a_streamed_response_holds_its_slot_until_read_or_closed(url, finish):
+    client = SparqlClient(max_concurrency=1)
+    response = client.get(url, stream=True)
+    with _second_request_waits(client, url):
+        if finish == "close":
+            response.close()
+        elif finish == "read":
+            assert response.content == BODY
+        else:
+            assert b"".join(client.iter_content(response)) == BODY
+    assert client.stats()["requests"] == 2
+
+def test_unstreamed_responses_release_their_slot(url):
+    client = SparqlClient(max_concurrency=1)
+    assert client.get(url).content == BODY
+    assert client.get(url).content == BODY
+
+def test_failed_requests_release_their_slot():
+    client = SparqlClient(max_concurrency=1, retries=0, timeout=1)
+    for _ in range(2):
+        with pytest.raises(Exception):
+            client.get("http://127.0.0.1:1/", stream=True)
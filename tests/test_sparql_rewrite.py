@@ -0,0 +1,80 @@
+import pytest
+from rdflib import Graph, Literal, Namespace
+from sparql_rewrite import (bind_values, count_query, page_query, pageable, projected_variables, term_expression,
+                            term_from_text, to_term, values_chunks)
+
+EX = Namespace("http://example.org/")
+PREFIX = "PREFIX ex: <http://example.org/>\n"
+
+@pytest.mark.parametrize("query, variables", [
+    ("SELECT ?a ?b WHERE { ?a ?p ?b }", ["a", "b"]),
+    ("SELECT DISTINCT ?a (COUNT(?b) AS ?n) WHERE { ?a ?p ?b } GROUP BY ?a", ["a", "n"]),
+    ("SELECT ?a (CONCAT(STR(?b), STR(?c)) AS ?bc) FROM <http://g> WHERE { ?a ?b ?c }", ["a", "bc"]),
+    (PREFIX + "select $a where { $a ex:p ?b }", ["a"]),
+    ("SELECT * WHERE { ?a ?p ?b }", None),
+])
+def test_projected_variables(query, variables):
+    assert projected_variables(query) == variables
+
+def test_projected_variables_needs_a_where_clause():
+    with pytest.raises(ValueError):
+        projected_variables("ASK { ?a ?p ?b }")
+
+def test_pageable():
+    assert pageable("SELECT ?a WHERE { ?a ?p ?b } ORDER BY ?a")
+    assert not pageable("SELECT ?a WHERE { ?a ?p ?b } LIMIT 10")
+    assert not pageable("SELECT * WHERE { ?a ?p ?b }")
+    assert not pageable("CONSTRUCT { ?a ?p ?b } WHERE { ?a ?p ?b }")
+
+def test_page_query_keeps_the_prologue_and_orders_by_every_projected_variable():
+    query = page_query(PREFIX + "SELECT ?a ?b WHERE { ?a ex:p ?b }", 10, 20)
+    assert query.startswith(PREFIX + "SELECT ?a ?b\n")
+    assert query.endswith("ORDER BY ?a ?b\nLIMIT 10 OFFSET 20")
+
+def test_page_query_repeats_an_order_on_projected_variables():
+    query = page_query("SELECT ?a ?b WHERE { ?a ?p ?b } ORDER BY DESC(?b)", 10, 0)
+    assert "ORDER BY DESC(?b) ?a ?b\n" in query
+
+def test_page_query_drops_an_order_on_unprojected_variables():
+    query = page_query("SELECT ?a WHERE { ?a ?p ?b } ORDER BY ?b", 10, 0)
+    assert query.endswith("ORDER BY ?a\nLIMIT 10 OFFSET 0")
+
+def _graph():
+    g = Graph()
+    for i in range(7):
+        g.add((EX[f"s{i}"], EX.p, Literal(i)))
+    return g
+
+def test_pages_cover_the_results_once():
+    g, query = _graph(), PREFIX + "SELECT ?s ?o WHERE { ?s ex:p ?o } ORDER BY DESC(?o)"
+    rows = [tuple(row) for offset in range(0, 7, 3) for row in g.query(page_query(query, 3, offset))]
+    assert rows == [tuple(row) for row in g.query(query)]
+    assert int(next(iter(g.query(count_query(query))))[0]) == 7
+
+def test_values_chunks_respect_the_batch_size_and_query_length():
+    query = "SELECT ?s WHERE { ?s ?p ?o }"
+    rows = [to_term(f"http://example.org/s{i}") for i in range(10)]
+    chunks = list(values_chunks(query, "s", rows, 10_000, 4))
+    assert [len(chunk) for chunk, _ in chunks] == [4, 4, 2]
+    assert chunks[0][1] == bind_values(query, "s", rows[:4])
+    limit = len(bind_values(query, "s", rows[:3]))
+    chunks = list(values_chunks(query, "s", rows, limit, 100))
+    assert sum(len(chunk) for chunk, _ in chunks) == 10
+    assert all(len(batch) <= limit for _, batch in chunks)
+
+def test_values_chunks_always_send_a_row():
+    rows = [(to_term("a" * 100), to_term("b"))]
+    assert [chunk for chunk, _ in values_chunks("SELECT ?x ?y WHERE { ?x ?p ?y }", ["x", "y"], rows, 10, 5)] == [rows]
+
+@pytest.mark.parametrize("term", [EX.iri, Literal("5", datatype=EX.type), Literal(5), Literal("naam", lang="nl"),
+                                  Literal('a "quoted"\nvalue'), Literal("plain")])
+def test_term_expression_round_trips_through_term_from_text(term):
+    g = Graph()
+    g.add((EX.s, EX.p, term))
+    text, = next(iter(g.query(f"SELECT ({term_expression('o')} AS ?t) WHERE {{ ?s ?p ?o }}")))
+    rendered = term_from_text(str(text))
+    assert list(g.query(f"SELECT ?s WHERE {{ ?s ?p {rendered} }}")) == [(EX.s,)]
+
+@pytest.mark.parametrize("text", [None, float("nan"), "", "_:b0", "<> not an iri"])
+def test_term_from_text_rejects_what_cannot_be_bound(text):
+    assert term_from_text(text) is None
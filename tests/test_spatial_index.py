@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+from spatial_index import MAX_LEVEL, SpatialIndex, tile_codes
+
+def _quadkey(code, level):
+    # The quadkey digits of a tile code: one base-4 digit (y bit, x bit) per level.
+    return "".join(str((int(code) >> (2 * (level - 1 - i))) & 3) for i in range(level))
+
+def test_tile_codes_are_quadkeys():
+    # Amsterdam is in tile 120202 at level 6, in Bing's quadkey numbering.
+    code = tile_codes(np.array([4.9]), np.array([52.37]))[0]
+    assert _quadkey(code >> np.uint64(2 * (MAX_LEVEL - 6)), 6) == "120202"
+
+def test_tile_codes_of_the_world_corners():
+    codes = tile_codes(np.array([-180.0, 179.999999, -180.0, 179.999999]), np.array([85.1, 85.1, -85.1, -85.1]))
+    assert [int(c >> np.uint64(2 * (MAX_LEVEL - 1))) for c in codes] == [0, 1, 2, 3]
+    assert int(codes[0]) == 0 and int(codes[3]) == 4 ** MAX_LEVEL - 1
+
+def _index(n=1000, seed=1):
+    rnd = np.random.default_rng(seed)
+    frame = pd.DataFrame({"lon": rnd.uniform(3, 7, n), "lat": rnd.uniform(50, 54, n), "violation": rnd.random(n) < 0.1})
+    return frame, SpatialIndex(frame)
+
+def test_clusters_add_up_to_the_rows_of_their_tile():
+    frame, index = _index()
+    for level in (0, 5, 10, MAX_LEVEL):
+        clusters = index.clusters(level)
+        assert clusters["count"].sum() == len(frame)
+        assert clusters["violations"].sum() == frame["violation"].sum()
+    tile = tuple(index.clusters(6).iloc[0][["level", "code"]].astype(int))
+    rows = index.rows(tile)
+    assert index.clusters(9, tile)["count"].sum() == len(rows) > 0
+    assert np.isclose(index.clusters(6, tile)["lon"].iloc[0], rows["lon"].mean())
+
+def test_view_shows_rows_or_the_finest_clusters_that_fit():
+    frame, index = _index()
+    kind, rows = index.view(max_points=len(frame))
+    assert kind == "rows" and len(rows) == len(frame)
+    kind, clusters = index.view(max_points=10, max_clusters=50)
+    assert kind == "clusters" and len(clusters) <= 50
+    assert len(index.clusters(clusters["level"].iloc[0] + 1)) > 50
@@ -0,0 +1,69 @@
+import io
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+import validation_report
+from pyshacl import validate
+from rdflib import Graph
+from validation_report import report_csv, report_frame, report_parquet, summarize_report, write_report
+
+SHAPES = """@prefix ex: <http://example.org/> .
+@prefix sh: <http://www.w3.org/ns/shacl#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+ex:AssetShape a sh:NodeShape ; sh:targetClass ex:Asset ;
+    sh:property [ sh:path rdfs:label ; sh:minCount 1 ; sh:datatype xsd:string ] ;
+    sh:property [ sh:path ex:height ; sh:datatype xsd:decimal ] .
+"""
+DATA = """@prefix ex: <http://example.org/> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+ex:a1 a ex:Asset .
+ex:a2 a ex:Asset ; rdfs:label 2 ; ex:height "tall" .
+ex:a3 a ex:Asset ; ex:height "high" .
+ex:a4 a ex:Asset ; rdfs:label "fine" .
+"""
+
+@pytest.fixture(scope="module")
+def report():
+    _, results_graph, _ = validate(Graph().parse(data=DATA, format="turtle"), shacl_graph=Graph().parse(data=SHAPES, format="turtle"))
+    return report_frame(results_graph)
+
+def test_every_result_is_a_row(report):
+    assert list(report.columns) == list(validation_report.REPORT_COLUMNS)
+    rows = sorted(map(tuple, report[["Object", "Error detected on", "Constraint"]].astype(str).to_numpy()))
+    label, height = "http://www.w3.org/2000/01/rdf-schema#label", "http://example.org/height"
+    assert rows == [("http://example.org/a1", label, "MinCountConstraintComponent"),
+                    ("http://example.org/a2", height, "DatatypeConstraintComponent"),
+                    ("http://example.org/a2", label, "DatatypeConstraintComponent"),
+                    ("http://example.org/a3", height, "DatatypeConstraintComponent"),
+                    ("http://example.org/a3", label, "MinCountConstraintComponent")]
+    assert report["Constraint"].dtype == "category"
+
+def test_an_empty_results_graph_is_an_empty_report():
+    assert report_frame(Graph()).empty
+
+def test_the_summary_counts_violations(report):
+    summary = summarize_report(report, top=1)
+    assert summary["By constraint"].values.tolist() == [["DatatypeConstraintComponent", 3], ["MinCountConstraintComponent", 2]]
+    assert sorted(summary["By path"]["Violations"]) == [2, 3]
+    by_object = summary["By object"]
+    assert len(by_object) == 1 and by_object["Violations"].iloc[0] == 2
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_written_reports_read_back_in_chunks(tmp_path, monkeypatch, report, fmt):
+    monkeypatch.setattr(validation_report, "EXPORT_CHUNK_ROWS", 2)
+    path = tmp_path / f"report.{fmt}"
+    write_report(report, path, fmt)
+    if fmt == "csv":
+        actual = pd.read_csv(path)
+        assert path.read_bytes() == report_csv(report)
+    else:
+        actual = pd.read_parquet(path)
+        assert pq.ParquetFile(path).num_row_groups == 3
+        pd.testing.assert_frame_equal(pd.read_parquet(io.BytesIO(report_parquet(report))), actual)
+    pd.testing.assert_frame_equal(actual.astype(str), report.astype(str))
+
+def test_unknown_report_formats_are_rejected(tmp_path, report):
+    with pytest.raises(ValueError):
+        write_report(report, tmp_path / "report.xlsx", "xlsx")
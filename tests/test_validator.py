@@ -0,0 +1,173 @@
+import pytest
+import validator
+from pyshacl import validate
+from rdflib import Graph, Namespace
+from rdflib.compare import isomorphic
+from rdflib.namespace import SH
+from validator import IncrementalValidator, _result_blocks, validate_graph
+
+EX = Namespace("http://example.org/")
+PREFIXES = """@prefix ex: <http://example.org/> .
+@prefix sh: <http://www.w3.org/ns/shacl#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+"""
+# Triples no shape can reach; pruning leaves them out.
+UNREACHABLE = """
+ex:archive ex:note "untouched" ; ex:next [ ex:next [ ex:note 1 ] ] .
+"""
+
+CASES = {
+    "subclass targets": ("""
+ex:AssetShape a sh:NodeShape ; sh:targetClass ex:Asset ;
+    sh:property [ sh:path rdfs:label ; sh:minCount 1 ; sh:datatype xsd:string ] .
+""", """
+ex:Bridge rdfs:subClassOf ex:Asset .
+ex:Viaduct rdfs:subClassOf ex:Bridge .
+ex:v1 a ex:Viaduct .
+ex:b1 a ex:Bridge ; rdfs:label "bridge" .
+ex:b2 a ex:Bridge ; rdfs:label 2 .
+ex:t1 a ex:Thing .
+"""),
+    "inverse and sequence paths": ("""
+ex:PartShape a sh:NodeShape ; sh:targetClass ex:Part ;
+    sh:property [ sh:path [ sh:inversePath ex:hasPart ] ; sh:minCount 1 ] ;
+    sh:property [ sh:path ( ex:location ex:wkt ) ; sh:minCount 1 ; sh:datatype xsd:string ] .
+""", """
+ex:hasMainPart rdfs:subPropertyOf ex:hasPart .
+ex:bridge ex:hasPart ex:p1 .
+ex:viaduct ex:hasMainPart ex:p2 .
+ex:p1 a ex:Part ; ex:location ex:l1 .
+ex:l1 ex:wkt 5 .
+ex:p2 a ex:Part ; ex:location [ ex:wkt "POINT (5 52)" ] .
+ex:p3 a ex:Part .
+"""),
+    "sh:class through range and domain": ("""
+ex:AssetShape a sh:NodeShape ; sh:targetClass ex:Asset ;
+    sh:property [ sh:path ex:location ; sh:class ex:Location ] ;
+    sh:property [ sh:path ex:owner ; sh:class ex:Person ] .
+ex:LocatedShape a sh:NodeShape ; sh:targetClass ex:Located ;
+    sh:property [ sh:path ex:wkt ; sh:datatype xsd:string ] .
+""", """
+ex:location rdfs:range ex:Location .
+ex:wkt rdfs:domain ex:Located .
+ex:name rdfs:domain ex:Person .
+ex:a1 a ex:Asset ; ex:location ex:l1 ; ex:owner ex:o1 .
+ex:l1 ex:wkt 5 .
+ex:a2 a ex:Asset ; ex:location ex:l2 ; ex:owner ex:o2 .
+ex:o2 ex:name "Owner" .
+"""),
+    "blank node values and focus nodes": ("""
+ex:AssetShape a sh:NodeShape ; sh:targetClass ex:Asset ;
+    sh:property [ sh:path rdfs:label ; sh:minCount 1 ] ;
+    sh:property [ sh:path ex:location ; sh:class ex:Location ; sh:node ex:LocationShape ] .
+ex:LocationShape a sh:NodeShape ; sh:property [ sh:path ex:wkt ; sh:datatype xsd:string ] .
+""", """
+ex:Bridge rdfs:subClassOf ex:Asset .
+ex:b1 a ex:Bridge ; ex:location [ ex:wkt 5 ] .
+[] a ex:Bridge ; ex:location [ a ex:Location ; ex:wkt 6 ] .
+ex:b2 a ex:Bridge ; rdfs:label "bridge" ; ex:location [ a ex:Location ; ex:wkt "POINT (5 52)" ] .
+"""),
+    "subjects and objects of target predicates": ("""
+ex:WholeShape a sh:NodeShape ; sh:targetSubjectsOf ex:hasPart ;
+    sh:property [ sh:path ex:hasPart ; sh:minCount 2 ] .
+ex:PartShape a sh:NodeShape ; sh:targetObjectsOf ex:location ;
+    sh:property [ sh:path ex:wkt ; sh:minCount 1 ] .
+""", """
+ex:hasMainPart rdfs:subPropertyOf ex:hasPart .
+ex:site rdfs:subPropertyOf ex:location .
+ex:w1 ex:hasPart ex:p1, ex:p2 .
+ex:w2 ex:hasMainPart ex:p3 .
+ex:p1 ex:location ex:l1 .
+ex:p2 ex:site ex:l2 .
+ex:l1 ex:wkt "POINT (5 52)" .
+ex:p3 ex:location [ ex:crs "4326" ] .
+"""),
+}
+
+def _graph(turtle):
+    return Graph().parse(data=PREFIXES + turtle, format="turtle")
+
+def _pyshacl(data, shapes):
+    return validate(data_graph=data, shacl_graph=shapes, inference='rdfs', abort_on_error=False,
+                    meta_shacl=False, advanced=True, debug=False)
+
+def assert_same_report(actual, expected):
+    # Result order in the text follows graph iteration, so blocks are compared as a multiset.
+    assert actual[0] == expected[0]
+    assert isomorphic(actual[1], expected[1])
+    assert sorted(_result_blocks(actual[2])) == sorted(_result_blocks(expected[2]))
+
+@pytest.mark.parametrize("case", CASES)
+def test_pruned_validation_matches_pyshacl(case):
+    shapes, data = CASES[case]
+    data_graph = _graph(data + UNREACHABLE)
+    expected = _pyshacl(data_graph, _graph(shapes))
+    assert not expected[0]
+    assert_same_report(validate_graph(data_graph, _graph(shapes)), expected)
+
+def test_sharded_validation_matches_a_single_pass(monkeypatch):
+    shapes, data = CASES["blank node values and focus nodes"]
+    # Label-less blank-node bridges print alike, several to a shard.
+    data += "".join(f"ex:b{i} a ex:Bridge .\n[] a ex:Bridge .\n" for i in range(3, 9))
+    data_graph, shapes_graph = _graph(data), _graph(shapes)
+    expected = validate_graph(data_graph, shapes_graph)
+    sharded = []
+    in_shards = validator._validate_in_shards
+    def spy(*args):
+        sharded.append(in_shards(*args))
+        return sharded[-1]
+    monkeypatch.setattr(validator, "MIN_SHARD_SIZE", 2)
+    monkeypatch.setattr(validator, "_validate_in_shards", spy)
+    actual = validate_graph(data_graph, shapes_graph, workers=2)
+    assert sharded[0] is not None
+    assert_same_report(actual, expected)
+    assert actual[2].splitlines()[:3] == expected[2].splitlines()[:3]
+    assert_same_report(actual, _pyshacl(data_graph, shapes_graph))
+
+REVISION = "ex:Bridge rdfs:subClassOf ex:Asset .\n" + "".join(
+    f'ex:a{i} a ex:Bridge ; rdfs:label "Asset {i}" ; ex:location [ a ex:Location ; ex:wkt "POINT ({i} 52)" ] .\n' for i in range(10)
+) + 'ex:a3 rdfs:label "Second label" .\nex:a7 ex:location [ ex:wkt 7 ] .\n'
+
+def _revisions(*edits):
+    # Each edit is (old text, new text) applied to the text of the previous revision.
+    text = REVISION
+    yield text
+    for old, new in edits:
+        assert old in text
+        text = text.replace(old, new)
+        yield text
+
+def _incremental(edits, expect_incremental):
+    shapes = CASES["blank node values and focus nodes"][0]
+    checker = IncrementalValidator(_graph(shapes))
+    for n, text in enumerate(_revisions(*edits)):
+        actual = checker.validate(_graph(text))
+        assert_same_report(actual, validate_graph(_graph(text), _graph(shapes)))
+        assert checker.incremental == (n > 0 and expect_incremental)
+    return checker
+
+def test_incremental_revisions_match_a_full_validation():
+    checker = _incremental([
+        ('"POINT (2 52)"', "2"),  # edits a blank node's value
+        ("ex:a5 a ex:Bridge ;", "ex:a5 a ex:Bridge ; ex:location ex:nowhere ;"),
+        ('ex:a3 rdfs:label "Second label" .\n', ""),
+        ("ex:a7 ex:location [ ex:wkt 7 ] .\n", ""),  # deletes a blank node
+    ], expect_incremental=True)
+    assert 0 < checker.revalidated < 10
+
+def test_a_node_that_stops_being_a_target_loses_its_results():
+    checker = IncrementalValidator(_graph(CASES["blank node values and focus nodes"][0]))
+    assert "Focus Node: ex:a7\n" in checker.validate(_graph(REVISION))[2]
+    revision = REVISION.replace("ex:a7 a ex:Bridge ;", "ex:a7 a ex:Thing ;")
+    actual = checker.validate(_graph(revision))
+    assert checker.incremental
+    assert_same_report(actual, validate_graph(_graph(revision), _graph(CASES["blank node values and focus nodes"][0])))
+    _, report, text = actual
+    assert "Focus Node: ex:a7\n" not in text and not any(report.subjects(SH.focusNode, EX.a7))
+
+def test_widespread_changes_fall_back_to_a_full_validation():
+    _incremental([('rdfs:label "Asset', 'rdfs:comment "Asset')], expect_incremental=False)
+
+def test_schema_changes_fall_back_to_a_full_validation():
+    _incremental([("ex:Bridge rdfs:subClassOf ex:Asset .", "ex:Bridge rdfs:subClassOf ex:Structure .")], expect_incremental=False)
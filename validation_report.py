@@ -0,0 +1,75 @@
+import io
+import pandas as pd
+from rdflib.namespace import RDF, SH
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# Report columns and the result predicate each is read from.
+REPORT_COLUMNS = {
+    "Object": SH.focusNode,
+    "Error detected on": SH.resultPath,
+    "Message": SH.resultMessage,
+    "Constraint": SH.sourceConstraintComponent,
+}
+EXPORT_CHUNK_ROWS = 65536
+
+def report_frame(results_graph) -> pd.DataFrame:
+    """Returns one row per sh:ValidationResult, with the REPORT_COLUMNS as text.
+
+    Each column is read in a single scan of its predicate instead of a lookup per
+    result. Columns with few distinct values are categorical.
+    """
+    results = list(results_graph.subjects(RDF.type, SH.ValidationResult))
+    columns = {}
+    for name, predicate in REPORT_COLUMNS.items():
+        values = dict(results_graph.subject_objects(predicate))
+        columns[name] = [str(values.get(result)) for result in results]
+    frame = pd.DataFrame(columns, columns=list(REPORT_COLUMNS), dtype=object)  # text even without results
+    frame["Constraint"] = frame["Constraint"].str.rsplit("#", n=1).str[-1]
+    for name in ("Error detected on", "Message", "Constraint"):
+        frame[name] = frame[name].astype("category")
+    return frame
+
+def summarize_report(frame: pd.DataFrame, top=20) -> dict:
+    """Counts violations per constraint, per path and (the `top` most violating) per object."""
+    def counts(column, limit=None):
+        counted = frame[column].value_counts(sort=True)
+        counted = counted[counted > 0]
+        if limit is not None: counted = counted.head(limit)
+        return counted.rename("Violations").rename_axis(column).reset_index()
+    return {
+        "By constraint": counts("Constraint"),
+        "By path": counts("Error detected on"),
+        "By object": counts("Object", top),
+    }
+
+def write_report(frame: pd.DataFrame, output, fmt="csv") -> None:
+    """Writes the report table as CSV or Parquet to a path or binary file, EXPORT_CHUNK_ROWS rows at a time.
+
+    Only one chunk is converted at a time, so no second copy of the whole report is built.
+    """
+    if fmt == "csv":
+        frame.to_csv(output, index=False, encoding="utf-8", chunksize=EXPORT_CHUNK_ROWS)
+        return
+    if fmt != "parquet":
+        raise ValueError(f"Unsupported report format: {fmt}")
+    if pa is None:
+        raise ImportError("Parquet export requires pyarrow.")
+    schema = pa.Schema.from_pandas(frame, preserve_index=False)
+    with pq.ParquetWriter(output, schema) as writer:
+        for start in range(0, len(frame), EXPORT_CHUNK_ROWS):
+            writer.write_table(pa.Table.from_pandas(frame.iloc[start:start + EXPORT_CHUNK_ROWS], schema=schema, preserve_index=False))
+
+def report_csv(frame: pd.DataFrame) -> bytes:
+    # Download buttons take the whole payload; files are better written with write_report.
+    buffer = io.BytesIO()
+    write_report(frame, buffer, "csv")
+    return buffer.getvalue()
+
+def report_parquet(frame: pd.DataFrame) -> bytes:
+    buffer = io.BytesIO()
+    write_report(frame, buffer, "parquet")
+    return buffer.getvalue()
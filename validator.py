@@ -1,19 +1,281 @@
+import logging
+import multiprocessing
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pyshacl import validate
-from rdflib import Graph
+from pyshacl.entrypoints import meta_validate
+from pyshacl.errors import ReportableRuntimeError
+from pyshacl.rdfutil import stringify_node
+from rdflib import BNode, Graph, Literal
+from rdflib.namespace import RDF, SH
+from perf_trace import stage
+from graph_delta import blank_node_keys, graph_delta, relabel_blank_nodes
+from rdf_loader import load_rdf
+from shape_analysis import SCHEMA_PREDICATES, GraphCut, ShapesProfile
 
-def load_graph(file_path_or_str, format='turtle'):
+SHARDS_PER_WORKER = 4
+MIN_SHARD_SIZE = 200  # candidate focus nodes; smaller shards cost more in pool overhead than they save
+
+def load_graph(file_path_or_str, format=None):
+    # Files go through rdf_loader, which also reads gzip and parses N-Triples/N-Quads in parallel.
+    if os.path.isfile(file_path_or_str):
+        with open(file_path_or_str, "rb") as f:
+            return load_rdf(f.read(), file_path_or_str, format)
     g = Graph()
-    g.parse(file_path_or_str, format=format)
+    g.parse(file_path_or_str, format=format or 'turtle')
     return g
 
-def validate_graph(data_graph, shacl_graph):
-    conforms, results_graph, results_text = validate(
-        data_graph=data_graph,
-        shacl_graph=shacl_graph,
-        inference='rdfs',
-        abort_on_error=False,
-        meta_shacl=True,
-        advanced=True,
-        debug=False
-    )
-    return conforms, results_graph, results_text
\ No newline at end of file
+class PreparedShapes():
+    """A shapes graph with the work every validation against it would repeat done once.
+
+    Holds the meta-SHACL verdict and the ShapesProfile; pass it to validate_graph
+    in place of the graph. Instances pickle, so they can be cached on disk.
+    """
+    def __init__(self, graph) -> None:
+        self.graph = graph
+        self.meta_conforms, _, self.meta_text = meta_validate(graph, inference='rdfs', abort_on_error=False, debug=False)
+        self.profile = ShapesProfile(graph)
+
+    def check(self):
+        # Mirrors the error pySHACL raises when meta_shacl=True.
+        if not self.meta_conforms:
+            raise ReportableRuntimeError(f"SHACL File does not validate against the SHACL Shapes SHACL (MetaSHACL) file.\n{self.meta_text}")
+
+def validate_graph(data_graph, shacl_graph, workers=1):
+    """Validates with pySHACL; with workers > 1 (None: one per core) large graphs are validated in parallel shards.
+
+    Only the closure of the candidate focus nodes (see GraphCut) is handed to
+    pySHACL, so triples no shape can reach are neither copied nor inferred over.
+    Each shard validates the closure of a slice of the candidates and keeps only
+    their results, so the merged report matches a single pass. The whole graph is
+    validated when the shapes' reach cannot be bounded (see ShapesProfile).
+
+    `shacl_graph` may be a PreparedShapes, which skips meta-SHACL and shape analysis.
+    """
+    if isinstance(shacl_graph, PreparedShapes):
+        prepared = shacl_graph
+    else:
+        with stage("prepare shapes"):
+            prepared = PreparedShapes(shacl_graph)
+    prepared.check()
+    profile = prepared.profile
+    if profile.depth is None:
+        logging.info(f"Validating the whole graph: {profile.unbounded}.")
+        return _validate(data_graph, prepared.graph)
+    with stage("focus node candidates") as current:
+        cut = GraphCut(profile, data_graph)
+        candidates = cut.candidates()
+        current.rows = len(candidates)
+    if workers is None or workers > 1:
+        with stage("pySHACL in shards"):
+            grouped = _validate_in_shards(prepared.graph, data_graph, cut, candidates, workers or os.cpu_count() or 1)
+        if grouped is not None:
+            with stage("merge reports"):
+                return _merge_reports(grouped.values(), prepared.graph)
+    # pySHACL would copy the whole graph for inference; the pruned copy is validated in place instead.
+    with stage("prune data graph") as current:
+        pruned = _graph(cut.closure(candidates), data_graph.namespaces())
+        current.rows = len(pruned)
+    return _validate(pruned, prepared.graph, inplace=True)
+
+def _validate(data_graph, shacl_graph, inplace=False):
+    with stage("pySHACL") as current:
+        current.rows = len(data_graph)
+        conforms, results_graph, results_text = validate(
+            data_graph=data_graph,
+            shacl_graph=shacl_graph,
+            inference='rdfs',
+            abort_on_error=False,
+            meta_shacl=False,
+            advanced=True,
+            inplace=inplace,
+            debug=False
+        )
+    return conforms, results_graph, results_text
+
+class IncrementalValidator():
+    """Validates successive revisions of one data graph, re-validating only what a revision can affect.
+
+    Keeps the previous revision and its results per focus node. A new revision
+    is diffed against it (blank nodes matched by graph_delta's keys), the focus
+    nodes whose closure touches a changed triple are validated on their closure,
+    and their results replace the old ones. Falls back to a full run for
+    unbounded shapes, changes to the RDFS schema in the data, or changes that
+    reach more than MAX_INCREMENTAL_FRACTION of the candidate focus nodes.
+
+    Blank nodes of each validated graph are relabelled in place to match the
+    previous revision. After validate(), `revalidated` and `incremental` say what
+    the call did.
+    """
+    MAX_INCREMENTAL_FRACTION = 0.5
+
+    def __init__(self, shacl_graph, workers=1) -> None:
+        self.shapes = shacl_graph if isinstance(shacl_graph, PreparedShapes) else PreparedShapes(shacl_graph)
+        self.workers = workers
+        self.graph = None
+        self.keys = None
+        self.results = {}
+        self.revalidated = 0
+        self.incremental = False
+
+    def validate(self, data_graph):
+        self.shapes.check()
+        profile = self.shapes.profile
+        self.incremental = False
+        if profile.depth is None:
+            logging.info(f"Validating in full: {profile.unbounded}.")
+            self.graph = None
+            return validate_graph(data_graph, self.shapes, self.workers)
+        keys = blank_node_keys(data_graph)
+        if keys is not None and self.keys is not None:
+            keys = relabel_blank_nodes(data_graph, keys, self.keys)
+        cut = GraphCut(profile, data_graph)
+        candidates = cut.candidates()
+        affected = self._affected(data_graph, keys, cut)
+        if affected is not None and len(affected) <= self.MAX_INCREMENTAL_FRACTION * len(candidates):
+            nodes = affected & set(candidates)
+            for node in affected:
+                self.results.pop(node, None)
+            if nodes:
+                self.results.update(_validate_nodes(self.shapes.graph, _graph(cut.closure(nodes), data_graph.namespaces()), nodes))
+            self.revalidated, self.incremental = len(nodes), True
+        else:
+            self.results = self._validate_all(data_graph, cut, candidates)
+            self.revalidated = len(candidates)
+        self.graph, self.keys = data_graph, keys
+        return _merge_reports(self.results.values(), self.shapes.graph)
+
+    def _affected(self, data_graph, keys, cut):
+        # The focus nodes whose results a change since the previous revision can affect, or None for a full run.
+        if self.graph is None or keys is None or self.keys is None:
+            return None
+        with stage("graph delta") as current:
+            removed, added = graph_delta(self.graph, data_graph)
+            current.rows = len(removed) + len(added)
+        changed = removed | added
+        if any(p in SCHEMA_PREDICATES for _, p, _ in changed):
+            return None
+        return GraphCut(self.shapes.profile, self.graph).reaching(changed) | cut.reaching(changed)
+
+    def _validate_all(self, data_graph, cut, candidates):
+        if self.workers is None or self.workers > 1:
+            grouped = _validate_in_shards(self.shapes.graph, data_graph, cut, candidates, self.workers or os.cpu_count() or 1)
+            if grouped is not None:
+                return grouped
+        return _validate_nodes(self.shapes.graph, _graph(cut.closure(candidates), data_graph.namespaces()))
+
+def _shard_count(workers, candidates):
+    return min(workers * SHARDS_PER_WORKER, len(candidates) // MIN_SHARD_SIZE)
+
+def _validate_in_shards(shacl_graph, data_graph, cut, candidates, workers):
+    """Validates the candidates' closures in a process pool; returns results grouped by focus node, or None if too small.
+
+    Workers are spawned rather than forked, so they do not inherit the threads
+    and sockets of a running server.
+    """
+    shard_count = _shard_count(workers, candidates)
+    if shard_count < 2:
+        return None
+    # Contiguous runs of sorted IRIs keep related nodes together, so closures overlap less.
+    size = -(-len(candidates) // shard_count)
+    shards = [candidates[i:i + size] for i in range(0, len(candidates), size)]
+    grouped = {}
+    with ProcessPoolExecutor(max_workers=min(workers, len(shards)), mp_context=multiprocessing.get_context("spawn"), initializer=_init_shard_worker,
+                             initargs=(list(shacl_graph), list(shacl_graph.namespaces()), list(data_graph.namespaces()))) as pool:
+        futures = [pool.submit(_validate_shard, list(cut.closure(shard)), shard) for shard in shards]
+        for future in futures:
+            grouped.update(future.result())
+    return grouped
+
+_shard_shapes = None
+_shard_namespaces = ()
+
+def _init_shard_worker(shape_triples, shape_namespaces, data_namespaces):
+    global _shard_shapes, _shard_namespaces
+    _shard_shapes = _graph(shape_triples, shape_namespaces)
+    _shard_namespaces = data_namespaces
+
+def _validate_shard(triples, nodes):
+    return _validate_nodes(_shard_shapes, _graph(triples, _shard_namespaces), set(nodes))
+
+def _graph(triples, namespaces):
+    graph = Graph()
+    for prefix, namespace in namespaces:
+        graph.bind(prefix, namespace, replace=True)
+    graph.addN(triple + (graph,) for triple in triples)
+    return graph
+
+def _validate_nodes(shacl_graph, graph, nodes=None):
+    """Validates `graph` in place and groups the results by focus node, keeping only `nodes` (all when None).
+
+    Returns {focus node: (results, report triples, text blocks)} for the nodes with
+    results. When `graph` is a closure, targeted nodes outside `nodes` may lack
+    triples they need, so their results are dropped.
+    """
+    _, results_graph, results_text = _validate(graph, shacl_graph, inplace=True)
+    grouped = {}
+    printed = defaultdict(list)
+    for result in results_graph.objects(None, SH.result):
+        focus = results_graph.value(result, SH.focusNode)
+        if nodes is not None and focus not in nodes: continue
+        results, triples, _ = grouped.setdefault(focus, ([], [], []))
+        results.append(result)
+        triples.extend(_owned_triples(results_graph, result))
+        printed[f"\tFocus Node: {stringify_node(graph, focus)}\n"].append(focus)
+    # Blank nodes with the same description print alike; they get one block per result each.
+    for block in _result_blocks(results_text):
+        focus_line = next((line for line in block.splitlines(keepends=True) if printed.get(line)), None)
+        if focus_line is not None:
+            grouped[printed[focus_line].pop()][2].append(block)
+    return grouped
+
+def _owned_triples(results_graph, result):
+    # A result owns the blank nodes below it: nested sh:detail results, paths and cloned shapes.
+    triples, queue, seen = [], [result], {result}
+    while queue:
+        for triple in results_graph.triples((queue.pop(), None, None)):
+            triples.append(triple)
+            if isinstance(triple[2], BNode) and triple[2] not in seen:
+                seen.add(triple[2])
+                queue.append(triple[2])
+    return triples
+
+def _result_blocks(text):
+    # pySHACL's text report is a header followed by one unindented line plus indented details per result.
+    blocks = []
+    for line in text.splitlines(keepends=True)[2:]:
+        if line.startswith("Results ("): continue
+        if line[:1].isspace() and blocks: blocks[-1] += line
+        else: blocks.append(line)
+    return blocks
+
+def _merge_reports(groups, shacl_graph):
+    """Combines per-node results into one report, the way pySHACL reports a single pass."""
+    groups = list(groups)
+    conforms = not any(kept for kept, _, _ in groups)
+    report_graph = Graph(bind_namespaces='core')
+    for prefix, namespace in shacl_graph.namespaces():
+        report_graph.bind(prefix, namespace)
+    report = BNode()
+    report_graph.add((report, RDF.type, SH.ValidationReport))
+    report_graph.add((report, SH.conforms, Literal(conforms)))
+    blocks = []
+    for kept, report_triples, node_blocks in groups:
+        by_subject = defaultdict(list)
+        for triple in report_triples:
+            by_subject[triple[0]].append(triple)
+        queue = list(kept)
+        for result in kept:
+            report_graph.add((report, SH.result, result))
+        while queue:
+            for triple in by_subject.pop(queue.pop(), ()):
+                report_graph.add(triple)
+                # Cloned shapes keep their blank node id; another group may have added the same clone already.
+                if triple[2] in by_subject and (triple[2], None, None) not in report_graph:
+                    queue.append(triple[2])
+        blocks.extend(node_blocks)
+    text = f"Validation Report\nConforms: {conforms}\n"
+    if blocks:
+        text += f"Results ({len(blocks)}):\n" + "".join(sorted(blocks))
+    return conforms, report_graph, text
@@ -1,10 +1,37 @@
+import io
+import itertools
 import os
+import re
 import requests
 import logging
+import tempfile
+import zipfile
 import pandas as pd
-from io import StringIO, BytesIO
+from io import BytesIO
 from requests.auth import HTTPBasicAuth
 import numpy as np
+import xlsxwriter
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from perf_trace import propagate, stage
+from pagination import DEFAULT_PAGE_SIZE, DEFAULT_PAGE_WORKERS, fetch_paginated
+from result_cache import DEFAULT_MAX_BYTES as DEFAULT_CACHE_BYTES, ResultCache
+from sparql_client import ChunkReader, get_client
+from sparql_rewrite import fingerprint_query, projected_variables, term_from_text, values_batches
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pa_csv = pq = None
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_ENDPOINT_CONCURRENCY = 4
+DEFAULT_MAX_QUERY_LENGTH = 16000
+DEFAULT_VALUES_BATCH_SIZE = 500
+FINGERPRINT_COLUMN = "_fingerprint"
+TERM_SUFFIX = "__term"  # fingerprint columns with the exact RDF term of each key (see term_expression)
 
 def _env_default(key, default=""):
     return os.environ.get(key, default)
@@ -37,7 +64,7 @@ class LacesRequest():
             auth=HTTPBasicAuth(username, password) if username else None
         )
 
-    def run_query(self, query):
+    def run_query(self, query, stream=False):
         self._request.data = query.encode("UTF-8")
         prepared = self._request.prepare()
         
@@ -56,13 +83,111 @@ class LacesRequest():
         
         prepared.url = correct_url
         
-        s = requests.Session()
-        return s.send(prepared)
+        return get_client().send(prepared, stream=stream)
+
+def _collapse_blank_lines(chunks):
+    # Streaming equivalent of .replace('\n\n', '\n'): an unpaired trailing newline
+    # is held back, because it may pair with the first byte of the next chunk.
+    carry = b""
+    for chunk in chunks:
+        data = carry + chunk
+        run = len(data) - len(data.rstrip(b"\n"))
+        cut = len(data) - run % 2
+        carry = data[cut:]
+        if cut: yield data[:cut].replace(b"\n\n", b"\n")
+    if carry: yield carry
+
+def _crlf_to_lf(chunks):
+    # Streaming equivalent of .replace('\r\n', '\n').
+    carry = b""
+    for chunk in chunks:
+        data = carry + chunk
+        carry = b"\r" if data.endswith(b"\r") else b""
+        if len(data) > len(carry): yield data[:len(data) - len(carry)].replace(b"\r\n", b"\n")
+    if carry: yield carry
+
+def normalized_chunks(chunks):
+    """Replaces "\\n\\n" and then "\\r\\n" with "\\n" in a byte stream, chunk by chunk."""
+    return _crlf_to_lf(_collapse_blank_lines(chunks))
+
+def read_csv_stream(chunks, encoding="utf-8", spill_dir=None) -> pd.DataFrame:
+    """Parses a CSV byte stream into a DataFrame without holding the raw text in memory.
 
-def convert_response(output) -> str:
-    return output.text.replace('\n\n', '\n').replace('\r\n', '\n')
+    Uses the multi-threaded pyarrow CSV reader when pyarrow is installed. Column
+    types follow pandas' inference: date/time-looking values stay text and empty
+    columns become float NaN. With `spill_dir` the normalised bytes are first
+    written to a temporary file there, so the response never sits in memory.
+    """
+    chunks = (chunk for chunk in normalized_chunks(chunks) if chunk)
+    first = next(chunks, None)
+    if first is None:
+        return pd.DataFrame()
+    chunks = itertools.chain([first], chunks)
+    if spill_dir is not None:
+        os.makedirs(spill_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=spill_dir, suffix=".csv", delete=False) as spill:
+            for chunk in chunks:
+                spill.write(chunk)
+        try:
+            return _parse_csv(spill.name, encoding)
+        finally:
+            os.remove(spill.name)
+    return _parse_csv(io.BufferedReader(ChunkReader(chunks), buffer_size=1 << 20), encoding)
+
+def _parse_csv(source, encoding):
+    if pa_csv is None:
+        if isinstance(source, str):
+            return pd.read_csv(source, encoding=encoding)
+        return pd.read_csv(io.TextIOWrapper(source, encoding=encoding))
+    table = pa_csv.read_csv(
+        source,
+        read_options=pa_csv.ReadOptions(encoding=encoding),
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        # Empty fields become missing values and timestamps stay text (a format that
+        # never matches), like pd.read_csv.
+        convert_options=pa_csv.ConvertOptions(strings_can_be_null=True, timestamp_parsers=["%Q"]),
+    )
+    for i, field in enumerate(table.schema):
+        if pa.types.is_date(field.type) or pa.types.is_time(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.string()))
+        elif pa.types.is_null(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.float64()))
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+def _hashable_pair(old_col, new_col):
+    # .eq() treats 1 and 1.0, or a float NaN and a missing string, as equal; align
+    # the dtypes of both sides so their fingerprints agree as well.
+    if old_col.dtype == new_col.dtype:
+        return old_col, new_col
+    if pd.api.types.is_numeric_dtype(old_col) and pd.api.types.is_numeric_dtype(new_col):
+        return old_col.astype("float64"), new_col.astype("float64")
+    return tuple(col.astype(str).where(col.notna(), '[NULL]') for col in (old_col, new_col))
+
+def _fingerprints(old_result, new_result, columns):
+    """Fixed-width 64-bit fingerprints of `columns` for every row of both frames."""
+    if not columns:
+        return np.zeros(len(old_result), dtype=np.uint64), np.zeros(len(new_result), dtype=np.uint64)
+    old_part, new_part = {}, {}
+    for col in columns:
+        old_part[col], new_part[col] = _hashable_pair(old_result[col], new_result[col])
+    # Values are mostly distinct, so factorizing them first (categorize=True) only costs time.
+    return tuple(pd.util.hash_pandas_object(pd.DataFrame(part), index=False, categorize=False).to_numpy() for part in (old_part, new_part))
+
+def _combine(keys, rows):
+    # boost::hash_combine on uint64 arrays; overflow wraps around by design.
+    with np.errstate(over="ignore"):
+        return keys ^ (rows + np.uint64(0x9E3779B97F4A7C15) + (keys << np.uint64(6)) + (keys >> np.uint64(2)))
 
 def compare_results(old_result, new_result, identifying_columns, ignored_columns=None):
+    """Classifies rows as new, deleted, modified or unchanged between two query results.
+
+    Both frames are reduced to two fingerprints per row, one over the identifying
+    columns and one over the compared (non-ignored) columns. Rows with the same key
+    and the same compared values are paired as unchanged. The remaining rows are
+    paired per key in order of appearance as modified. Unpaired rows are new or
+    deleted. All pairing happens on integer columns, so the frames themselves are
+    never merged.
+    """
     if ignored_columns is None:
         ignored_columns = []
     
@@ -71,64 +196,188 @@ def compare_results(old_result, new_result, identifying_columns, ignored_columns
         if missing_cols:
             raise ValueError(f"Identifying columns {missing_cols} not found in {name} result.")
 
-    merged = pd.merge(old_result, new_result, on=identifying_columns, how='outer', indicator=True, suffixes=('_old', '_new'))
-    
-    new_items = merged[merged['_merge'] == 'right_only']
-    old_items = merged[merged['_merge'] == 'left_only']
-    potential_changed = merged[merged['_merge'] == 'both']
-
-    original_columns = sorted(list(set(c.replace('_old', '').replace('_new', '') for c in merged.columns if c.endswith(('_old', '_new')))))
-    
+    original_columns = sorted(c for c in old_result.columns if c in new_result.columns and c not in identifying_columns)
     old_suffix_cols = [f"{c}_old" for c in original_columns]
     new_suffix_cols = [f"{c}_new" for c in original_columns]
-    
-    new_items = new_items[identifying_columns + new_suffix_cols]
-    old_items = old_items[identifying_columns + old_suffix_cols]
+    compare_cols_orig = [c for c in original_columns if c not in ignored_columns]
 
-    all_original_cols = identifying_columns + original_columns
-    # Fill NA to ensure 'same' comparison is robust for missing values
-    same = pd.merge(old_result.fillna('[NULL]'), new_result.fillna('[NULL]'), on=all_original_cols, how='inner').replace('[NULL]', np.nan)
+    old_keys, new_keys = _fingerprints(old_result, new_result, identifying_columns)
+    old_rows, new_rows = _fingerprints(old_result, new_result, compare_cols_orig)
+    old_fp = pd.DataFrame({"key": old_keys, "row": _combine(old_keys, old_rows), "pos": np.arange(len(old_result))})
+    new_fp = pd.DataFrame({"key": new_keys, "row": _combine(new_keys, new_rows), "pos": np.arange(len(new_result))})
 
+    # Pair the n-th occurrence of a (key, values) fingerprint on one side with the n-th on the other.
+    old_fp["match"] = _combine(old_fp["row"].to_numpy(), old_fp.groupby("row").cumcount().to_numpy(np.uint64))
+    new_fp["match"] = _combine(new_fp["row"].to_numpy(), new_fp.groupby("row").cumcount().to_numpy(np.uint64))
+    unchanged = old_fp[["match", "pos"]].merge(new_fp[["match", "pos"]], on="match", suffixes=("_old", "_new"))
 
-    changed = pd.DataFrame()
-    if not potential_changed.empty:
-        # To find changed rows, we compare the non-identifying columns
-        compare_cols_orig = [c for c in original_columns if c not in ignored_columns]
-        
-        # Create temporary dataframes for comparison
-        df_old = potential_changed[identifying_columns + [f"{c}_old" for c in compare_cols_orig]].set_index(identifying_columns)
-        df_new = potential_changed[identifying_columns + [f"{c}_new" for c in compare_cols_orig]].set_index(identifying_columns)
+    # Whatever is left is paired per key: pairs are modified, leftovers new or deleted.
+    rest_old = old_fp[~old_fp["pos"].isin(unchanged["pos_old"])].copy()
+    rest_new = new_fp[~new_fp["pos"].isin(unchanged["pos_new"])].copy()
+    rest_old["n"] = rest_old.groupby("key").cumcount()
+    rest_new["n"] = rest_new.groupby("key").cumcount()
+    paired = rest_old.merge(rest_new, on=["key", "n"], how="outer", suffixes=("_old", "_new"))
+    both = paired["pos_old"].notna() & paired["pos_new"].notna()
 
-        # Rename columns to match for a direct comparison
-        df_new.columns = df_old.columns
+    def rows(df, positions, suffix=None):
+        part = df.iloc[np.asarray(positions, dtype=np.int64)][identifying_columns + original_columns]
+        if suffix:
+            part.columns = identifying_columns + [f"{c}{suffix}" for c in original_columns]
+        return part.reset_index(drop=True)
 
-        # Use pandas' built-in comparison, which handles dtypes and NaNs gracefully
-        # We fill NA values to ensure that two null values are considered equal
-        is_different_mask = ~df_old.fillna('[NULL]').eq(df_new.fillna('[NULL]')).all(axis=1)
-        
-        changed_indices = is_different_mask[is_different_mask].index
-        
-        changed = potential_changed.set_index(identifying_columns).loc[changed_indices].reset_index()
+    def in_key_order(df):
+        return df.sort_values(identifying_columns, kind="stable", ignore_index=True) if len(df) > 1 else df
+
+    new_items = in_key_order(rows(new_result, paired.loc[paired["pos_old"].isna(), "pos_new"], "_new"))
+    old_items = in_key_order(rows(old_result, paired.loc[paired["pos_new"].isna(), "pos_old"], "_old"))
+    same = in_key_order(rows(old_result, unchanged["pos_old"]))
+
+    changed = pd.DataFrame()
+    if both.any():
+        changed_old = rows(old_result, paired.loc[both, "pos_old"], "_old")
+        changed_new = rows(new_result, paired.loc[both, "pos_new"], "_new")
+        changed = in_key_order(pd.concat([changed_old, changed_new[new_suffix_cols]], axis=1))
         
     return new_items, old_items, changed, same, old_suffix_cols, new_suffix_cols, identifying_columns
 
-def style_differences(df: pd.DataFrame):
-    def apply_row_style(row):
-        style = [''] * len(row)
-        status_colors = {"NEW": 'background-color: #d4edda;', "DELETED": 'background-color: #f8d7da;', "MODIFIED": 'background-color: #fff3cd;', "UNCHANGED": ''}
-        style = [status_colors.get(row.get('changeStatus', ''), '')] * len(row)
-
-        if row.get('changeStatus') == 'MODIFIED':
-            modified_cell_style = 'background-color: #fbe54e;'
-            for new_col in [c for c in row.index if c.endswith('_new')]:
-                old_col = new_col.replace('_new', '_old')
-                if old_col in row.index:
-                    old_val, new_val = row[old_col], row[new_col]
-                    if str(old_val) != str(new_val) and not (pd.isna(old_val) and pd.isna(new_val)):
-                        style[row.index.get_loc(new_col)] = modified_cell_style
-                        style[row.index.get_loc(old_col)] = modified_cell_style
-        return style
-    return df.style.apply(apply_row_style, axis=1)
+STATUS_COLORS = {"NEW": '#d4edda', "DELETED": '#f8d7da', "MODIFIED": '#fff3cd'}
+MODIFIED_CELL_COLOR = '#fbe54e'
+
+def difference_masks(df: pd.DataFrame):
+    """Returns the changeStatus per row and a boolean array marking the differing cells of MODIFIED rows.
+
+    A cell pair is marked when its _old and _new values differ as strings and are
+    not both missing. The comparison runs column by column over the MODIFIED rows only.
+    """
+    status = df['changeStatus'] if 'changeStatus' in df.columns else pd.Series('', index=df.index)
+    cells = np.zeros(df.shape, dtype=bool)
+    modified = (status == 'MODIFIED').to_numpy()
+    if modified.any():
+        subset = df[modified]
+        for new_col in [c for c in df.columns if c.endswith('_new')]:
+            old_col = new_col.replace('_new', '_old')
+            if old_col in df.columns:
+                old, new = subset[old_col], subset[new_col]
+                differs = ((old.astype(str) != new.astype(str)) & ~(old.isna() & new.isna())).to_numpy()
+                for col in (new_col, old_col):
+                    cells[modified, df.columns.get_loc(col)] |= differs
+    return status, cells
+
+def _excel_values(df: pd.DataFrame):
+    # Missing values become empty cells.
+    return df.astype(object).where(df.notna(), None).to_numpy()
+
+def write_excel(results, output) -> None:
+    """Writes changelog frames to an Excel workbook in xlsxwriter's constant_memory mode.
+
+    Rows are written in order and flushed to disk as they go, so memory stays flat
+    regardless of the number of rows. Row and cell colours come from
+    difference_masks and are written as static cell formats. The "summary" frame
+    is written with its index and without a header.
+    """
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    header = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+    status_formats = {k: workbook.add_format({'bg_color': v}) for k, v in STATUS_COLORS.items()}
+    modified_cell = workbook.add_format({'bg_color': MODIFIED_CELL_COLOR})
+    for key, frame in results.items():
+        sheet = workbook.add_worksheet(key)
+        if key == "summary":
+            for r, (label, row) in enumerate(zip(frame.index, _excel_values(frame))):
+                sheet.write(r, 0, label, header)
+                sheet.write_row(r, 1, row)
+            continue
+        sheet.write_row(0, 0, [str(c) for c in frame.columns], header)
+        with stage("difference_masks", key) as current:
+            current.rows = len(frame)
+            status, cells = difference_masks(frame)
+        marked = cells.any(axis=1)
+        for r, (row, state) in enumerate(zip(_excel_values(frame), status.to_numpy()), start=1):
+            row_format = status_formats.get(state)
+            sheet.write_row(r, 0, row, row_format)
+            if marked[r - 1]:
+                for c in np.flatnonzero(cells[r - 1]):
+                    sheet.write(r, c, row[c], modified_cell)
+    workbook.close()
+
+EXPORT_FORMATS = {
+    "xlsx": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "parquet": ("zip", "application/zip"),
+    "arrow": ("zip", "application/zip"),
+    "csv": ("zip", "application/zip"),
+}
+EXPORT_CHUNK_ROWS = 65536
+
+def _columnar_frame(key, frame: pd.DataFrame) -> pd.DataFrame:
+    # The summary sheet is a transposed frame with mixed-type rows; export it the
+    # other way round (one row per version) with text values.
+    if key == "summary":
+        frame = frame.transpose().reset_index(drop=True).map(lambda v: None if pd.isna(v) else str(v))
+    frame = frame.rename(columns=str)
+    # Arrow needs one type per column; columns that mix numbers and text (e.g. a value
+    # whose type changed between versions) are exported as text.
+    for col in frame.columns:
+        if frame[col].dtype == object and pd.api.types.infer_dtype(frame[col], skipna=True) in ("mixed", "mixed-integer"):
+            frame[col] = frame[col].where(frame[col].isna(), frame[col].astype(str))
+    return frame
+
+def _chunks(frame):
+    for start in range(0, max(len(frame), 1), EXPORT_CHUNK_ROWS):
+        yield frame.iloc[start:start + EXPORT_CHUNK_ROWS]
+
+def write_archive(results, output, fmt) -> None:
+    """Writes every result frame as one Parquet, Arrow IPC or CSV file into a zip archive.
+
+    Frames are written straight into the archive entries in chunks of
+    EXPORT_CHUNK_ROWS rows, without going through Excel or a Styler.
+    """
+    if fmt not in ("parquet", "arrow", "csv"):
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if fmt != "csv" and pa is None:
+        raise ImportError(f"Exporting to {fmt} requires pyarrow.")
+    # Parquet and Arrow files are compressed (or compact) already.
+    compression = zipfile.ZIP_DEFLATED if fmt == "csv" else zipfile.ZIP_STORED
+    with zipfile.ZipFile(output, "w", compression=compression) as archive:
+        for key, frame in results.items():
+            frame = _columnar_frame(key, frame)
+            name = re.sub(r'[\\/:*?"<>|]', "_", key)
+            with archive.open(f"{name}.{fmt}", "w", force_zip64=True) as entry:
+                if fmt == "csv":
+                    text = io.TextIOWrapper(entry, encoding="utf-8", newline="")
+                    for i, chunk in enumerate(_chunks(frame)):
+                        chunk.to_csv(text, header=(i == 0), index=False)
+                    text.flush()
+                    text.detach()
+                    continue
+                schema = pa.Schema.from_pandas(frame, preserve_index=False)
+                writer = pq.ParquetWriter(entry, schema) if fmt == "parquet" else pa.ipc.new_file(entry, schema)
+                with writer:
+                    for chunk in _chunks(frame):
+                        writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+class QueryScheduler():
+    """Bounded worker pool that caps the number of concurrent requests per endpoint."""
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, endpoint_limits=None) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sparql")
+        self._limits = {endpoint: threading.BoundedSemaphore(limit) for endpoint, limit in (endpoint_limits or {}).items()}
+
+    def submit(self, endpoint, fn, *args, **kwargs):
+        limit = self._limits.get(endpoint)
+        fn = propagate(fn)
+        def task():
+            if limit is None:
+                return fn(*args, **kwargs)
+            with limit:
+                return fn(*args, **kwargs)
+        return self._executor.submit(task)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown(wait=exc[0] is None)
 
 class DeltaChecker():
     def __init__(self, config_dict) -> None:
@@ -136,8 +385,13 @@ class DeltaChecker():
         self.results = {}
         # Parameters are no longer used in this simplified flow
         self.params = self.config.get('parameters', {})
+        cache_config = self.config.get('cache')
+        self.cache = ResultCache(cache_config['dir'], cache_config.get('max_bytes', DEFAULT_CACHE_BYTES)) if cache_config else None
+        self._summaries = {}
+        self._summary_locks = {True: threading.Lock(), False: threading.Lock()}
 
-    def execute_query(self, query: str, old=True) -> pd.DataFrame:
+    def execute_query(self, query: str, old=True, page_size=None) -> pd.DataFrame:
+        """Runs a query on one side. Results are only paged when a page_size is configured for the query, its endpoint or globally."""
         endpoint_config = self.config['endpoints']['old'] if old else self.config['endpoints']['new']
         handler = LacesRequest(endpoint_config)
 
@@ -145,8 +399,25 @@ class DeltaChecker():
         # from the SPARQL queries to let them run on the endpoint's default graph.
         query = query.replace("FROM ?DEFAULT_URI", "")
         query = query.replace("FROM NAMED ?NAMED_URI", "")
-        
-        raw = handler.run_query(query)
+
+        def run(q):
+            # The body streams into the CSV parser, so one stage holds the request, the download and the parse.
+            with stage("query + CSV parse", endpoint_config.get('url')) as current:
+                result = self._execute_single(handler, q)
+                current.rows = len(result)
+            return result
+        def count(q):
+            return int(run(q).iloc[0, 0])
+        if page_size is None:
+            page_size = endpoint_config.get('page_size', self.config.get('page_size'))
+        if page_size is True:
+            page_size = DEFAULT_PAGE_SIZE
+        pages = fetch_paginated(query, run, count, page_size, endpoint_config.get('page_workers', DEFAULT_PAGE_WORKERS),
+                                max_rows=endpoint_config.get('max_rows'))
+        return pages[0] if len(pages) == 1 else pd.concat(pages, ignore_index=True)
+
+    def _execute_single(self, handler, query) -> pd.DataFrame:
+        raw = handler.run_query(query, stream=True)
         
         if raw.status_code != 200:
             error_message = f"SPARQL endpoint returned status {raw.status_code} for URL: {raw.url}. "
@@ -156,71 +427,422 @@ class DeltaChecker():
                  error_message += "\n(Could not read response text.)"
             raise requests.exceptions.HTTPError(error_message, response=raw)
 
-        str_raw = convert_response(raw)
-        return pd.read_csv(StringIO(str_raw)) if str_raw else pd.DataFrame()
+        # SPARQL CSV results are UTF-8 unless the endpoint says otherwise.
+        encoding = requests.utils.get_encoding_from_headers(raw.headers) if "charset" in raw.headers.get("Content-Type", "") else "utf-8"
+        with raw:
+            return read_csv_stream(get_client().iter_content(raw), encoding, self.config.get('spill_dir'))
+
+    def summary_result(self, old=True) -> pd.DataFrame:
+        """Runs the summary query for one side once and remembers the result."""
+        with self._summary_locks[old]:
+            if old not in self._summaries:
+                self._summaries[old] = self.execute_query(self._read_query(self.config['summary']['query']), old)
+            return self._summaries[old]
+
+    def version(self, old=True):
+        """Returns the versionIRI (or else the version) the summary query reports for one side, if any."""
+        if "summary" not in self.config or "query" not in self.config["summary"]:
+            return None
+        try:
+            summary = self.summary_result(old)
+        except Exception as e:
+            logging.warning(f"Could not determine the {'old' if old else 'new'} version: {e}")
+            return None
+        for column in ("versionIRI", "version"):
+            if column in summary:
+                values = summary[column].dropna()
+                if len(values): return str(values.iloc[0])
+        return None
+
+    def fetch(self, query: str, old=True, page_size=None) -> pd.DataFrame:
+        """Runs a query, answering it from the result cache for cached sides with a known version."""
+        side = "old" if old else "new"
+        if self.cache is None or side not in self.config['cache'].get('sides', ['old']):
+            return self.execute_query(query, old, page_size)
+        version = self.version(old)
+        if not version:
+            return self.execute_query(query, old, page_size)
+        key = ResultCache.key(self.config['endpoints'][side].get('url'), query, version)
+        result = self.cache.get(key)
+        if result is None:
+            result = self.execute_query(query, old, page_size)
+            self.cache.put(key, result)
+        return result
+
+    def _read_query(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
 
     def delta_query(self, config_query):
-        with open(config_query['file'], "r", encoding="utf-8") as f:
-            query = f.read()
-        old_result = self.execute_query(query, True)
-        new_result = self.execute_query(query, False)
+        query = self._read_query(config_query['file'])
+        first = self._first_phase_query(config_query, query)
+        old_result = self.fetch(first, True, config_query.get('page_size'))
+        new_result = self.fetch(first, False, config_query.get('page_size'))
+        if first is query:
+            return self._compare(config_query, old_result, new_result)
+        with self._scheduler() as scheduler:
+            return self._fingerprint_delta(config_query, query, old_result, new_result, scheduler)
+
+    def _first_phase_query(self, config_query, query):
+        """Returns the query to send first: `query` itself, or its fingerprint form in fingerprint diff mode."""
+        if config_query.get('diff_mode', self.config.get('diff_mode', 'full')) != 'fingerprint':
+            return query
+        variables = projected_variables(query)
+        if variables is None:
+            logging.warning(f"Fingerprint diff needs explicit SELECT variables; running {config_query['file']} in full.")
+            return query
+        ignored = config_query.get('ignored_columns', [])
+        compared = [v for v in variables if v not in config_query['columns'] and v not in ignored]
+        return fingerprint_query(query, config_query['columns'], compared, FINGERPRINT_COLUMN, TERM_SUFFIX)
+
+    def _fingerprint_delta(self, config_query, query, old_fingerprints, new_fingerprints, scheduler):
+        """Second phase of a fingerprint diff: fetches full rows only for keys whose fingerprints differ.
+
+        Keys are bound as the exact terms the fingerprint query reported (typed and
+        language-tagged literals included). Keys that are fully unchanged are
+        reported from their fingerprints alone, so their UNCHANGED rows carry the
+        identifying columns only. When a key cannot be bound (a blank node or an
+        unbound key) or the rows fetched do not add up to the fingerprint rows, the
+        query is compared in full instead.
+
+        Hashing costs the endpoints more than sending rows, so this only pays off
+        when the transfer dominates: wide rows, few changes and a slow link (see
+        the slow_link scenarios in benchmarks/suite.py).
+        """
+        id_cols = config_query['columns']
+        if old_fingerprints.empty and new_fingerprints.empty:
+            return self._compare(config_query, old_fingerprints, new_fingerprints)
+        term_cols = [f"{c}{TERM_SUFFIX}" for c in id_cols]
+        added, removed, modified, unchanged, _, _, _ = compare_results(old_fingerprints, new_fingerprints, id_cols)
+        def keys(frames, suffix):
+            key_cols = id_cols + [f"{c}{suffix}" for c in term_cols]
+            return pd.concat([pd.DataFrame(columns=key_cols)] + [frame[key_cols] for frame in frames if not frame.empty], ignore_index=True)
+        old_keys, new_keys = keys((removed, modified), "_old"), keys((added, modified), "_new")
+
+        columns = projected_variables(query)
+        limit = self.config.get('max_query_length', DEFAULT_MAX_QUERY_LENGTH)
+        batch_size = self.config.get('values_batch_size', DEFAULT_VALUES_BATCH_SIZE)
+        futures = {}
+        for side, old, keys in (("old", True, old_keys), ("new", False, new_keys)):
+            rows = list(dict.fromkeys(tuple(term_from_text(v) for v in row) for row in keys.iloc[:, len(id_cols):].itertuples(index=False, name=None)))
+            if any(term is None for row in rows for term in row):
+                logging.warning(f"Some keys of {config_query['file']} cannot be bound as terms (blank nodes or unbound keys); comparing it in full.")
+                return self._full_delta(config_query, query, scheduler)
+            url = self.config['endpoints'][side].get('url')
+            # Batches depend on which keys changed, so they are not cached: a later run rarely sends the same batch.
+            futures[side] = [scheduler.submit(url, self.execute_query, batch, old) for batch in values_batches(query, id_cols, rows, limit, batch_size)]
+        old_rows, new_rows = (pd.concat([pd.DataFrame(columns=columns)] + [f.result() for f in futures[side]], ignore_index=True) for side in ("old", "new"))
+
+        new, deleted, changed, same, old_cols, new_cols, _ = compare_results(old_rows, new_rows, id_cols, config_query.get('ignored_columns', []))
+        # Rows of keys that were fetched again are already classified above.
+        fetched = pd.concat([old_keys[id_cols], new_keys[id_cols]]).drop_duplicates()
+        unchanged = unchanged[id_cols].merge(fetched, on=id_cols, how="left", indicator=True)
+        unchanged = unchanged[unchanged["_merge"] == "left_only"].drop(columns="_merge")
+        same = pd.concat([same, unchanged.reindex(columns=same.columns)], ignore_index=True)
+        old_count, new_count = len(deleted) + len(changed) + len(same), len(new) + len(changed) + len(same)
+        if (old_count, new_count) != (len(old_fingerprints), len(new_fingerprints)):
+            logging.warning(f"The fingerprint diff of {config_query['file']} accounts for {old_count}/{new_count} of "
+                            f"{len(old_fingerprints)}/{len(new_fingerprints)} old/new rows; comparing it in full.")
+            return self._full_delta(config_query, query, scheduler)
+        return new, deleted, changed, same, old_cols, new_cols, id_cols
+
+    def _full_delta(self, config_query, query, scheduler):
+        futures = [scheduler.submit(self.config['endpoints'][side].get('url'), self.fetch, query, old, config_query.get('page_size'))
+                   for side, old in (("old", True), ("new", False))]
+        return self._compare(config_query, *(future.result() for future in futures))
+
+    def _compare(self, config_query, old_result, new_result):
         if old_result.empty and new_result.empty:
             logging.warning(f"Both queries for {config_query['file']} returned empty results.")
             return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), [], [], config_query['columns']
-        return compare_results(old_result, new_result, config_query['columns'], config_query.get('ignored_columns', []))
+        with stage("compare_results", config_query['file']) as current:
+            current.rows = len(old_result) + len(new_result)
+            return compare_results(old_result, new_result, config_query['columns'], config_query.get('ignored_columns', []))
 
     def generate_summarypage(self) -> pd.DataFrame:
         if "summary" in self.config and "query" in self.config["summary"]:
             try:
-                with open(self.config['summary']['query'], 'r', encoding="utf-8") as f:
-                    query = f.read()
-                results_old = self.execute_query(query, old=True)
-                results_new = self.execute_query(query, old=False)
-                results = pd.concat([results_old, results_new])
-                results.insert(0, "Aspect", ["Old version", "New version"])
-                return results.transpose()
+                return self._summary_frame(self.summary_result(old=True), self.summary_result(old=False))
             except Exception as e:
                 logging.warning(f"Could not generate summary page: {e}")
                 return None
         return None
 
-    def run(self, progress_callback=None):
-        summary_df = self.generate_summarypage()
-        if summary_df is not None:
-            self.results["summary"] = summary_df
-        
-        queries_to_run = self.config['queries'].items()
-        for i, (name, config) in enumerate(queries_to_run):
-            if progress_callback: progress_callback(i / len(queries_to_run), f"Processing: {name}")
-            try:
-                new, deleted, modified, same, _, _, id_cols = self.delta_query(config)
-                combined = pd.concat([new.assign(changeStatus="NEW"), deleted.assign(changeStatus="DELETED"), modified.assign(changeStatus="MODIFIED"), same.assign(changeStatus="UNCHANGED")], ignore_index=True)
-                if not combined.empty:
-                    paired_cols = []
-                    orig_cols = sorted(list(set(c.replace('_old','').replace('_new','') for c in combined.columns if c.endswith(('_old', '_new')))))
-                    for col in orig_cols:
-                        if f"{col}_old" in combined.columns: paired_cols.append(f"{col}_old")
-                        if f"{col}_new" in combined.columns: paired_cols.append(f"{col}_new")
-                    final_cols = id_cols + paired_cols + ['changeStatus']
-                    combined = combined.reindex(columns=final_cols).fillna('')
-                self.results[name] = style_differences(combined)
-            except Exception as e:
+    def _summary_frame(self, results_old, results_new):
+        results = pd.concat([results_old, results_new])
+        results.insert(0, "Aspect", ["Old version", "New version"])
+        return results.transpose()
+
+    def _changelog(self, delta):
+        new, deleted, modified, same, _, _, id_cols = delta
+        combined = pd.concat([new.assign(changeStatus="NEW"), deleted.assign(changeStatus="DELETED"), modified.assign(changeStatus="MODIFIED"), same.assign(changeStatus="UNCHANGED")], ignore_index=True)
+        if not combined.empty:
+            paired_cols = []
+            orig_cols = sorted(list(set(c.replace('_old','').replace('_new','') for c in combined.columns if c.endswith(('_old', '_new')))))
+            for col in orig_cols:
+                if f"{col}_old" in combined.columns: paired_cols.append(f"{col}_old")
+                if f"{col}_new" in combined.columns: paired_cols.append(f"{col}_new")
+            final_cols = id_cols + paired_cols + ['changeStatus']
+            combined = combined.reindex(columns=final_cols)
+        return combined
+
+    def _error_sheet(self, e):
+        return pd.DataFrame([{"Error": f"Could not process query: {e}"}])
+
+    def _endpoint_configs(self):
+        return [self.config['endpoints'][side] for side in ("old", "new")]
+
+    def _scheduler(self):
+        limits = {}
+        for endpoint in self._endpoint_configs():
+            url = endpoint.get('url')
+            limits[url] = min(limits.get(url, DEFAULT_ENDPOINT_CONCURRENCY), endpoint.get('max_concurrency', DEFAULT_ENDPOINT_CONCURRENCY))
+        return QueryScheduler(self.config.get('max_workers', DEFAULT_MAX_WORKERS), limits)
+
+    def run(self, progress_callback=None, output_format="xlsx"):
+        """Runs the summary query and every old/new query pair concurrently.
+
+        Fetches are spread over a bounded worker pool with a concurrency cap per
+        endpoint URL. Each query is compared as soon as both of its sides have
+        arrived. Comparisons and progress updates happen on the calling thread.
+        """
+        endpoints = self.config['endpoints']
+        queries = dict(self.config['queries'])
+        jobs = []
+
+        if "summary" in self.config and "query" in self.config["summary"]:
+            def summary_done(query, first, old, new, scheduler):
+                self.results["summary"] = self._summary_frame(old, new)
+            def summary_failed(e):
+                logging.warning(f"Could not generate summary page: {e}")
+            jobs.append(("summary", self.config['summary']['query'], None, summary_done, summary_failed))
+
+        for name, config in queries.items():
+            def query_done(query, first, old, new, scheduler, name=name, config=config):
+                if first is query:
+                    delta = self._compare(config, old, new)
+                else:
+                    with stage("fingerprint delta", config['file']):
+                        delta = self._fingerprint_delta(config, query, old, new, scheduler)
+                with stage("changelog", name) as current:
+                    self.results[name] = self._changelog(delta)
+                    current.rows = len(self.results[name])
+            def query_failed(e, name=name):
                 logging.error(f"An error occurred while comparing the '{name}' query: {e}")
-                if progress_callback: progress_callback(i / len(queries_to_run), f"Error on: {name}")
-                self.results[name] = pd.DataFrame([{"Error": f"Could not process query: {e}"}]).style
-        
+                self.results[name] = self._error_sheet(e)
+            jobs.append((name, config['file'], config, query_done, query_failed))
+
+        total = 3 * len(jobs)
+        done = 0
+        def report(text):
+            if progress_callback: progress_callback(done / total if total else 1.0, text)
+
+        with self._scheduler() as scheduler:
+            tasks = {}
+            arrived = {}
+            sent = {}
+            for job in jobs:
+                label, path, config, _, on_error = job
+                try:
+                    query = self._read_query(path)
+                    first = query if config is None else self._first_phase_query(config, query)
+                except Exception as e:
+                    on_error(e)
+                    done += 3
+                    report(f"Error on: {label}")
+                    continue
+                arrived[id(job)] = {}
+                sent[id(job)] = (query, first)
+                fetch = self.fetch if config is not None else lambda query, old, page_size: self.summary_result(old)
+                for side, old in (("old", True), ("new", False)):
+                    future = scheduler.submit(endpoints[side].get('url'), fetch, first, old, (config or {}).get('page_size'))
+                    tasks[future] = (job, side)
+
+            for future in as_completed(tasks):
+                job, side = tasks[future]
+                label, _, _, on_done, on_error = job
+                done += 1
+                sides = arrived.get(id(job))
+                if sides is None:
+                    # The other side of this job already failed.
+                    report(f"Skipped {side} version: {label}")
+                    continue
+                try:
+                    sides[side] = future.result()
+                except Exception as e:
+                    del arrived[id(job)]
+                    on_error(e)
+                    done += 1
+                    report(f"Error on: {label}")
+                    continue
+                report(f"Fetched {side} version: {label}")
+                if len(sides) < 2:
+                    continue
+                del arrived[id(job)]
+                try:
+                    on_done(*sent[id(job)], sides["old"], sides["new"], scheduler)
+                except Exception as e:
+                    on_error(e)
+                done += 1
+                report(f"Compared: {label}")
+
+        # Keep the summary sheet first and the query sheets in configured order.
+        order = (["summary"] if "summary" in self.results else []) + [name for name in queries if name in self.results]
+        self.results = {key: self.results[key] for key in order}
         if progress_callback: progress_callback(1.0, "Comparison complete.")
-        return self.save_to_memory()
+        with stage(f"write {output_format}") as current:
+            current.rows = sum(len(frame) for frame in self.results.values())
+            return self.export(output_format)
+
+    def export(self, output_format="xlsx"):
+        """Returns the results as an Excel workbook ("xlsx") or a zip of Parquet/Arrow/CSV files."""
+        if output_format == "xlsx":
+            return self.save_to_memory()
+        if not self.results: return None
+        output_buffer = BytesIO()
+        write_archive(self.results, output_buffer, output_format)
+        output_buffer.seek(0)
+        return output_buffer
 
     def save_to_memory(self):
         if not self.results: return None
         output_buffer = BytesIO()
-        with pd.ExcelWriter(output_buffer, engine='xlsxwriter') as writer:
-            for key, value in self.results.items():
-                if isinstance(value, pd.io.formats.style.Styler):
-                    value.to_excel(writer, sheet_name=key, index=False)
-                else:
-                    value.to_excel(writer, sheet_name=key, index=(key=="summary"), header=(key!="summary"))
+        write_excel(self.results, output_buffer)
         output_buffer.seek(0)
         return output_buffer
 
+class ChainChecker(DeltaChecker):
+    """Changelogs across an ordered list of versions, fetching every version once.
+
+    The config lists the endpoints under "versions", oldest first, instead of
+    "endpoints". Each query runs once per version. Consecutive versions are
+    compared as soon as both have arrived, and with "first_to_last" the first
+    version is also compared with the last. A version's rows are dropped once all
+    of its comparisons are done. The changelogs of a query are combined into one
+    sheet with a "version" column. A fingerprint diff needs a second fetch per
+    pair, so chains always fetch full rows.
+    """
+    def __init__(self, config_dict) -> None:
+        super().__init__(config_dict)
+        endpoints = self.config['versions']
+        if len(endpoints) < 2:
+            raise ValueError("A version chain needs at least two endpoints.")
+        # Each version is one side of its own checker, so its summary is queried once.
+        # The newest version is read as the "new" side, so like in a two-version
+        # comparison it is only cached when the cache config lists that side.
+        self.versions = []
+        last = len(endpoints) - 1
+        self.old = [i < last for i in range(len(endpoints))]
+        for endpoint in endpoints:
+            checker = DeltaChecker({**self.config, 'endpoints': {'old': endpoint, 'new': endpoint}})
+            checker.cache = self.cache
+            self.versions.append(checker)
+        self.pairs = [(i, i + 1) for i in range(last)]
+        if self.config.get('first_to_last') and last > 1:
+            self.pairs.append((0, last))
+
+    def _endpoint_configs(self):
+        return self.config['versions']
+
+    def label(self, i):
+        """Returns the name of version `i`: its configured name, else its reported version, else its URL."""
+        endpoint = self.config['versions'][i]
+        return endpoint.get('name') or self.versions[i].version(self.old[i]) or endpoint.get('url')
+
+    def run(self, progress_callback=None, output_format="xlsx"):
+        """Fetches every query and the summary once per version and compares the configured version pairs."""
+        queries = dict(self.config['queries'])
+        if any(config.get('diff_mode', self.config.get('diff_mode', 'full')) == 'fingerprint' for config in queries.values()):
+            logging.warning("Version chains compare full rows; the fingerprint diff mode is ignored.")
+        has_summary = "summary" in self.config and "query" in self.config["summary"]
+        per_query = len(self.versions) + len(self.pairs)
+        total = (len(self.versions) if has_summary else 0) + len(queries) * per_query
+        done = 0
+        def report(text):
+            if progress_callback: progress_callback(done / total if total else 1.0, text)
+
+        frames, uses, changelogs = {}, {}, {}
+        with self._scheduler() as scheduler:
+            tasks = {}
+            if has_summary:
+                for i, checker in enumerate(self.versions):
+                    tasks[scheduler.submit(self._endpoint_configs()[i].get('url'), checker.summary_result, self.old[i])] = (None, i)
+            for name, config in queries.items():
+                try:
+                    query = self._read_query(config['file'])
+                except Exception as e:
+                    logging.error(f"An error occurred while comparing the '{name}' query: {e}")
+                    self.results[name] = self._error_sheet(e)
+                    done += per_query
+                    report(f"Error on: {name}")
+                    continue
+                frames[name], changelogs[name] = {}, {}
+                # How many comparisons still need each version's rows.
+                uses[name] = [sum(i in pair for pair in self.pairs) for i in range(len(self.versions))]
+                for i, checker in enumerate(self.versions):
+                    tasks[scheduler.submit(self._endpoint_configs()[i].get('url'), checker.fetch, query, self.old[i], config.get('page_size'))] = (name, i)
+
+            for future in as_completed(tasks):
+                name, i = tasks[future]
+                done += 1
+                if name is None:
+                    try:
+                        future.result()
+                        report(f"Fetched summary of version {i + 1}")
+                    except Exception as e:
+                        logging.warning(f"Could not run the summary query on version {i + 1}: {e}")
+                    continue
+                if name not in frames:
+                    # Another version of this query already failed.
+                    report(f"Skipped version {i + 1}: {name}")
+                    continue
+                try:
+                    frames[name][i] = future.result()
+                    report(f"Fetched version {i + 1}: {name}")
+                    for a, b in self.pairs:
+                        if i not in (a, b) or a not in frames[name] or b not in frames[name]: continue
+                        delta = self._compare(queries[name], frames[name][a], frames[name][b])
+                        with stage("changelog", f"{name} {a + 1}-{b + 1}") as current:
+                            changelogs[name][a, b] = self._changelog(delta)
+                            current.rows = len(changelogs[name][a, b])
+                        for version in (a, b):
+                            uses[name][version] -= 1
+                            if not uses[name][version]:
+                                del frames[name][version]
+                        done += 1
+                        report(f"Compared versions {a + 1} and {b + 1}: {name}")
+                except Exception as e:
+                    logging.error(f"An error occurred while comparing the '{name}' query: {e}")
+                    self.results[name] = self._error_sheet(e)
+                    done += len(self.pairs) - len(changelogs[name])
+                    del frames[name], changelogs[name]
+                    report(f"Error on: {name}")
+
+        if has_summary:
+            try:
+                self.results["summary"] = self._chain_summary()
+            except Exception as e:
+                logging.warning(f"Could not generate summary page: {e}")
+        for name, pairs in changelogs.items():
+            self.results[name] = self._chain_changelog(pairs)
+        order = (["summary"] if "summary" in self.results else []) + [name for name in queries if name in self.results]
+        self.results = {key: self.results[key] for key in order}
+        if progress_callback: progress_callback(1.0, "Comparison complete.")
+        with stage(f"write {output_format}") as current:
+            current.rows = sum(len(frame) for frame in self.results.values())
+            return self.export(output_format)
+
+    def _chain_summary(self):
+        results = pd.concat([checker.summary_result(old) for checker, old in zip(self.versions, self.old)])
+        results.insert(0, "Aspect", [self.label(i) for i in range(len(self.versions))])
+        return results.transpose()
+
+    def _chain_changelog(self, changelogs):
+        labels = [self.label(i) for i in range(len(self.versions))]
+        parts = [changelogs[a, b].assign(version=f"{labels[a]} -> {labels[b]}") for a, b in self.pairs if (a, b) in changelogs]
+        combined = pd.concat(parts, ignore_index=True)
+        return combined[["version"] + [c for c in combined.columns if c != "version"]]
+
+def comparison_checker(config_dict) -> DeltaChecker:
+    """Returns a ChainChecker for configs that list "versions", else a DeltaChecker."""
+    return ChainChecker(config_dict) if 'versions' in config_dict else DeltaChecker(config_dict)